@@ -0,0 +1,313 @@
+"""Throughput, latency and memory of the whole request pipeline.
+
+Run with `python benchmarks/asgi.py`. Requests are sent to an `App`
+in-process, calling it as an ASGI app without any server or network, so
+the numbers only account for routing, `IoCContainerMiddleware`, the
+injector, `get_request_handler` and response serialization:
+
+    * tiny: GET returning a small dict
+    * large_list: GET returning 2000 dicts
+    * post_json: POST with a pydantic body echoed back
+    * deep_di: controller with a chain of 6 injected providers
+    * scoped: controller with `@scoped` dependencies disposed per request
+    * dataclass_response / pydantic_response: the same 100 items as
+      dataclasses vs as pydantic models through a response model
+
+For each one it reports requests/sec, p50/p99 latency and, in a second
+pass as tracing slows everything down, the peak memory allocated while
+serving a request and what stays allocated afterwards. Use `--json` to
+save the results and `--compare` to diff them against a previous run:
+
+    python benchmarks/asgi.py --json before.json
+    python benchmarks/asgi.py --compare before.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from wintry.controllers import controller, get, post
+from wintry.entrypoints import App
+from wintry.ioc import provider, scoped
+
+REQUESTS = 5_000
+WARMUP = 200
+
+
+class ItemModel(BaseModel):
+    id: int
+    name: str
+    price: float
+    tags: list[str]
+
+
+@dataclass
+class ItemData:
+    id: int
+    name: str
+    price: float
+    tags: list[str]
+
+
+LARGE = [
+    {"id": i, "name": f"item {i}", "price": i / 4, "active": True} for i in range(2000)
+]
+DATACLASSES = [ItemData(i, f"item {i}", i / 4, ["a", "b"]) for i in range(100)]
+MODELS = [
+    ItemModel(id=i, name=f"item {i}", price=i / 4, tags=["a", "b"]) for i in range(100)
+]
+
+
+@provider
+class Level1:
+    pass
+
+
+@provider
+class Level2:
+    level: Level1
+
+
+@provider
+class Level3:
+    level: Level2
+
+
+@provider
+class Level4:
+    level: Level3
+
+
+@provider
+class Level5:
+    level: Level4
+
+
+@provider
+class Level6:
+    level: Level5
+
+
+@scoped
+class Session:
+    async def dispose(self):
+        pass
+
+
+@scoped
+class Repository:
+    session: Session
+
+
+@controller(prefix="/bench")
+class BenchController:
+    @get("/tiny")
+    async def tiny(self):
+        return {"ok": True}
+
+    @get("/large")
+    async def large(self):
+        return LARGE
+
+    @post("/items")
+    async def create(self, item: ItemModel):
+        return item
+
+    @get("/dataclasses")
+    async def dataclasses(self):
+        return DATACLASSES
+
+    @get("/models", response_model=list[ItemModel])
+    async def models(self):
+        return MODELS
+
+
+@controller(prefix="/deep")
+class DeepController:
+    service: Level6
+
+    @get("")
+    async def deep(self):
+        return {"ok": True}
+
+
+@controller(prefix="/scoped")
+class ScopedController:
+    repository: Repository
+
+    @get("")
+    async def scoped(self):
+        return {"ok": True}
+
+
+@dataclass
+class Scenario:
+    method: str
+    path: str
+    body: bytes = b""
+
+
+SCENARIOS = {
+    "tiny": Scenario("GET", "/bench/tiny"),
+    "large_list": Scenario("GET", "/bench/large"),
+    "post_json": Scenario(
+        "POST",
+        "/bench/items",
+        json.dumps({"id": 1, "name": "item", "price": 1.5, "tags": ["a"]}).encode(),
+    ),
+    "deep_di": Scenario("GET", "/deep"),
+    "scoped": Scenario("GET", "/scoped"),
+    "dataclass_response": Scenario("GET", "/bench/dataclasses"),
+    "pydantic_response": Scenario("GET", "/bench/models"),
+}
+
+
+async def request(app: App, scenario: Scenario) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": scenario.method,
+        "scheme": "http",
+        "path": scenario.path,
+        "raw_path": scenario.path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(scenario.body)).encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    done = asyncio.Event()
+    body_sent = False
+    status = 0
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": scenario.body, "more_body": False}
+        # Only a disconnect is left, once the response is complete
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif not message.get("more_body", False):
+            done.set()
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run(app: App, name: str, scenario: Scenario, requests: int) -> dict[str, float]:
+    for _ in range(WARMUP):
+        status = await request(app, scenario)
+    if status != 200:
+        raise RuntimeError(f"{name} responded with {status}")
+
+    latencies: list[int] = []
+    start = time.perf_counter_ns()
+    for _ in range(requests):
+        before = time.perf_counter_ns()
+        await request(app, scenario)
+        latencies.append(time.perf_counter_ns() - before)
+    elapsed = time.perf_counter_ns() - start
+    latencies.sort()
+
+    traced = max(20, requests // 25)
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    peaks: list[int] = []
+    for _ in range(traced):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await request(app, scenario)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "rps": requests / (elapsed / 1e9),
+        "p50_us": latencies[len(latencies) // 2] / 1e3,
+        "p99_us": latencies[int(len(latencies) * 0.99)] / 1e3,
+        "mean_us": statistics.fmean(latencies) / 1e3,
+        "peak_bytes": statistics.fmean(peaks),
+        "retained_bytes": (retained - baseline) / traced,
+    }
+
+
+def report(results: dict[str, dict[str, float]], baseline: Optional[dict[str, Any]]):
+    header = (
+        f"{'scenario':<20} {'req/s':>9} {'p50 us':>9} {'p99 us':>9}"
+        f" {'peak KiB':>9} {'kept B':>7}"
+    )
+    if baseline is not None:
+        header += f" {'req/s vs base':>14}"
+    print(header)
+    for name, r in results.items():
+        line = (
+            f"{name:<20} {r['rps']:>9.0f} {r['p50_us']:>9.1f} {r['p99_us']:>9.1f}"
+            f" {r['peak_bytes'] / 1024:>9.1f} {r['retained_bytes']:>7.0f}"
+        )
+        if baseline is not None and name in baseline["scenarios"]:
+            ratio = r["rps"] / baseline["scenarios"][name]["rps"]
+            line += f" {(ratio - 1) * 100:>+13.1f}%"
+        print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", help=f"Any of {', '.join(SCENARIOS)}")
+    parser.add_argument("-n", "--requests", type=int, default=REQUESTS)
+    parser.add_argument("--json", help="Save the results to this file")
+    parser.add_argument("--compare", help="Results of a previous run to compare with")
+    args = parser.parse_args()
+    if unknown := set(args.scenarios) - set(SCENARIOS):
+        parser.error(f"unknown scenarios {', '.join(sorted(unknown))}")
+
+    app = App()
+    results = {
+        name: await run(app, name, SCENARIOS[name], args.requests)
+        for name in args.scenarios or SCENARIOS
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "date": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "scenarios": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""Returning a large result set as model instances vs as a `ColumnarResult`.
+
+Run with `python benchmarks/columnar.py`. Both sides start from the same
+ORM-like rows and end with the JSON body of the response. Instances go
+through `prepare_response_content` and `wintry_jsonable_encoder`, like
+an endpoint without response model does. Peak memory is measured in a
+second pass, as tracing slows everything down.
+"""
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from wintry.columnar import ColumnarResult
+from wintry.controllers import prepare_response_content, wintry_jsonable_encoder
+
+ROWS = 100_000
+
+
+@dataclass
+class Reading:
+    id: int
+    sensor: int
+    value: float
+    valid: bool
+    taken_at: datetime
+
+
+def make_rows(n: int) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            id=i,
+            sensor=i % 100,
+            value=i / 7,
+            valid=i % 5 != 0,
+            taken_at=datetime(2024, 1, 1, i % 24, i % 60, i % 60),
+        )
+        for i in range(n)
+    ]
+
+
+def instances(rows: list[SimpleNamespace]) -> bytes:
+    items = [Reading(r.id, r.sensor, r.value, r.valid, r.taken_at) for r in rows]
+    content = prepare_response_content(items, exclude_unset=False)
+    return json.dumps(wintry_jsonable_encoder(content)).encode()
+
+
+def columnar(rows: list[SimpleNamespace]) -> bytes:
+    return ColumnarResult.from_orm(Reading, rows).json()
+
+
+def measure(name: str, fn: Callable[[Any], bytes], rows: list[SimpleNamespace]):
+    start = time.perf_counter()
+    fn(rows)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<12} {elapsed * 1000:>8.1f} ms {peak / 2**20:>8.1f} MiB peak")
+
+
+def main():
+    rows = make_rows(ROWS)
+    assert json.loads(instances(rows[:100])) == json.loads(columnar(rows[:100]))
+    measure("instances", instances, rows)
+    measure("columnar", columnar, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Memory and encoding time of plain dataclasses vs `@dto` classes.
+
+Run with `python benchmarks/dto.py`. Both build the same list of response
+objects from ORM-like rows and encode it with `wintry_jsonable_encoder`,
+as a list endpoint without response model does.
+"""
+import time
+import tracemalloc
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any
+
+from wintry.controllers import wintry_jsonable_encoder
+from wintry.dto import dto
+
+ROWS = 100_000
+
+
+@dataclass
+class ItemRead:
+    id: int
+    name: str
+    price: float
+    stock: int
+    active: bool
+
+
+@dto
+class ItemDto:
+    id: int
+    name: str
+    price: float
+    stock: int
+    active: bool
+
+
+def make_rows(n: int) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            id=i, name=f"item {i}", price=i / 4, stock=i % 10, active=i % 2 == 0
+        )
+        for i in range(n)
+    ]
+
+
+def build(model: Any, rows: list[SimpleNamespace]) -> list[Any]:
+    return [model(r.id, r.name, r.price, r.stock, r.active) for r in rows]
+
+
+def measure(name: str, model: Any, rows: list[SimpleNamespace]):
+    tracemalloc.start()
+    items = build(model, rows)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    wintry_jsonable_encoder(items)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<10} {size / len(items):>6.0f} B/row {elapsed * 1000:>8.1f} ms to encode"
+    )
+
+
+def main():
+    rows = make_rows(ROWS)
+    measure("dataclass", ItemRead, rows)
+    measure("dto", ItemDto, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Per message overhead of the container scope opened by event handlers.
+
+Run with `python benchmarks/event_scope.py`. It dispatches the same payload
+through a `Microservice` with:
+
+    * no scope: the handler is called directly
+    * scope: the scope a transporter opens for each message
+    * scope + dependency: plus a `@scoped` dependency built and disposed
+"""
+import asyncio
+import time
+from typing import Any, Callable, Coroutine
+
+from pydantic import BaseModel
+
+from wintry.controllers import microservice, on
+from wintry.ioc import scoped
+from wintry.ioc.container import IGlooContainer
+from wintry.settings import TransporterSettings, TransporterType
+from wintry.transporters import Microservice
+
+MESSAGES = 100_000
+
+
+class Payload(BaseModel):
+    value: int
+
+
+@scoped
+class Session:
+    async def dispose(self):
+        pass
+
+
+@microservice(TransporterType.none)
+class Service:
+    @on("plain")
+    async def plain(self, payload: Payload):
+        pass
+
+
+@microservice(TransporterType.jsonrpc)
+class ScopedService:
+    session: Session
+
+    @on("scoped")
+    async def with_session(self, payload: Payload):
+        pass
+
+
+class BenchMicroservice(Microservice):
+    async def init(self):
+        pass
+
+    async def run(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def publish(self, event: str, payload: Any, idempotency_key: Any = None):
+        pass
+
+
+async def measure(name: str, fn: Callable[[], Coroutine[Any, Any, Any]]):
+    for _ in range(1000):
+        await fn()
+    start = time.perf_counter_ns()
+    for _ in range(MESSAGES):
+        await fn()
+    elapsed = time.perf_counter_ns() - start
+    print(f"{name:<20} {elapsed / MESSAGES:>8.0f} ns/message")
+
+
+async def main():
+    plain = BenchMicroservice(TransporterSettings(transporter=TransporterType.none))
+    with_deps = BenchMicroservice(
+        TransporterSettings(transporter=TransporterType.jsonrpc)
+    )
+    handler = plain.handlers["plain"]
+    scoped_handler = with_deps.handlers["scoped"]
+    payload = Payload(value=1)
+    container = IGlooContainer()
+
+    await measure("no scope", lambda: plain._call(handler, payload))
+    await measure("scope", lambda: plain.dispatch(handler, payload))
+    await measure(
+        "scope + dependency", lambda: with_deps.dispatch(scoped_handler, payload)
+    )
+
+    async def empty_scope():
+        async with container.scoped():
+            pass
+
+    await measure("empty scope", empty_scope)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""Converting a query result with per row `from_orm` vs batched `from_orm_many`.
+
+Run with `python benchmarks/from_orm_many.py`. Each row is a user with a
+to-one relationship (half of them null), a to-many relationship and a
+list of scalars, mimicking rows loaded by an ORM.
+"""
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Optional
+
+from wintry.generators import CodeCache, CodeGenerator
+
+ROWS = 50_000
+ROUNDS = 5
+
+
+@dataclass
+class Tag:
+    name: str
+
+
+@dataclass
+class Address:
+    street: str
+    number: int
+    city: str
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    email: str
+    age: int
+    active: bool
+    address: Optional[Address] = None
+    tags: list[Tag] = field(default_factory=list)
+    scores: list[int] = field(default_factory=list)
+
+
+gen = CodeGenerator(CodeCache(""))
+for model in (Tag, Address, User):
+    gen.compile_from_orm(model, globals(), locals())
+
+
+def make_rows(n: int) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            id=i,
+            name=f"user {i}",
+            email=f"user{i}@example.com",
+            age=20 + i % 50,
+            active=i % 3 != 0,
+            address=SimpleNamespace(street="Main", number=i, city="Winterfell")
+            if i % 2
+            else None,
+            tags=[SimpleNamespace(name=f"tag {j}") for j in range(i % 4)],
+            scores=[i, i + 1],
+        )
+        for i in range(n)
+    ]
+
+
+def measure(name: str, fn: Callable[[], Any]) -> float:
+    fn()
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<16} {best * 1000:>8.1f} ms {ROWS / best:>12,.0f} rows/s")
+    return best
+
+
+def main():
+    rows = make_rows(ROWS)
+    assert User.from_orm(rows) == User.from_orm_many(rows)  # type: ignore
+
+    per_row = measure("from_orm", lambda: User.from_orm(rows))  # type: ignore
+    batched = measure("from_orm_many", lambda: User.from_orm_many(rows))  # type: ignore
+    print(f"speedup          {per_row / batched:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+import asyncio
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Callable
+
+import pytest
+from pydantic import BaseModel
+
+from wintry.controllers import RetryPolicy, microservice, on
+from wintry.ioc import provider, scoped
+from wintry.settings import ConnectionOptions, TransporterSettings, TransporterType
+from wintry.transporters.amqp import AMQPMicroservice, PublishError
+
+
+# In-process stand-in for the subset of aio_pika used by the transporter.
+# It routes by exact routing key and honors basic.qos prefetch.
+class Message(object):
+    def __init__(
+        self,
+        body: bytes,
+        content_type: str | None = None,
+        headers: dict | None = None,
+        expiration: float | None = None,
+        **kwargs: Any,
+    ):
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.expiration = expiration
+        self.channel: Any = None
+        self.queue: Any = None
+
+    async def ack(self):
+        self.channel.settle(self, acked=True)
+
+    async def nack(self, requeue: bool = True):
+        self.channel.settle(self, acked=False)
+
+
+class Queue(object):
+    def __init__(self, broker: "Broker", name: str, arguments: dict | None = None):
+        self.broker = broker
+        self.name = name
+        self.arguments = arguments or {}
+        self.messages: list[Message] = []
+        self.consumer: tuple[Any, Callable] | None = None
+
+    async def bind(self, exchange: Any, routing_key: str):
+        self.broker.bindings[routing_key].append(self)
+
+    async def consume(self, callback: Callable, consumer_tag: str | None = None):
+        self.consumer = (self.broker.consumer_channel, callback)
+        self.broker.deliver()
+        return consumer_tag or f"ctag.{self.name}"
+
+    async def cancel(self, tag: str):
+        self.consumer = None
+
+
+class Channel(object):
+    def __init__(self, broker: "Broker"):
+        self.broker = broker
+        self.prefetch_count = 0
+        self.unacked = 0
+        self.default_exchange = SimpleNamespace(publish=self.publish_to_queue)
+
+    async def set_qos(self, prefetch_count: int):
+        self.prefetch_count = prefetch_count
+        self.broker.consumer_channel = self
+
+    async def declare_exchange(self, name: str, type_: str, durable: bool = False):
+        return SimpleNamespace(publish=self.publish)
+
+    async def declare_queue(
+        self, name: str, durable: bool = False, arguments: dict | None = None
+    ):
+        return self.broker.queues.setdefault(name, Queue(self.broker, name, arguments))
+
+    async def publish(self, message: Message, routing_key: str):
+        await asyncio.sleep(0)
+        for queue in self.broker.bindings[routing_key]:
+            queue.messages.append(message)
+        self.broker.confirmed += 1
+        self.broker.deliver()
+        return SimpleNamespace(name="Basic.Ack")
+
+    async def publish_to_queue(self, message: Message, routing_key: str):
+        queue = self.broker.queues[routing_key]
+        target = queue.arguments.get("x-dead-letter-routing-key")
+        if target is not None and message.expiration is not None:
+            # Emulate a TTL queue dead-lettering into the target queue
+            def expire():
+                self.broker.queues[target].messages.append(message)
+                self.broker.deliver()
+
+            asyncio.get_event_loop().call_later(message.expiration, expire)
+        else:
+            queue.messages.append(message)
+            self.broker.deliver()
+        return SimpleNamespace(name="Basic.Ack")
+
+    def settle(self, message: Message, acked: bool):
+        self.unacked -= 1
+        (self.broker.acked if acked else self.broker.nacked).append(message)
+        self.broker.deliver()
+
+    async def close(self):
+        pass
+
+
+class Connection(object):
+    def __init__(self, broker: "Broker"):
+        self.broker = broker
+
+    async def channel(self, publisher_confirms: bool = False):
+        self.broker.channels += 1
+        return Channel(self.broker)
+
+    async def close(self):
+        pass
+
+
+class Broker(object):
+    Message = Message
+    ExchangeType = SimpleNamespace(TOPIC="topic")
+    DeliveryMode = SimpleNamespace(PERSISTENT=2)
+
+    def __init__(self):
+        self.queues: dict[str, Queue] = {}
+        self.bindings: dict[str, list[Queue]] = defaultdict(list)
+        self.consumer_channel: Any = None
+        self.connections = 0
+        self.channels = 0
+        self.confirmed = 0
+        self.acked: list[Message] = []
+        self.nacked: list[Message] = []
+
+    async def connect_robust(self, url: str):
+        self.connections += 1
+        return Connection(self)
+
+    def deliver(self):
+        for queue in self.queues.values():
+            if queue.consumer is None:
+                continue
+            channel, callback = queue.consumer
+            while queue.messages and (
+                not channel.prefetch_count or channel.unacked < channel.prefetch_count
+            ):
+                message = queue.messages.pop(0)
+                message.channel = channel
+                channel.unacked += 1
+                asyncio.get_event_loop().create_task(callback(message))
+
+
+class Payload(BaseModel):
+    value: int
+
+
+running: dict[str, int] = defaultdict(int)
+peaks: dict[str, int] = defaultdict(int)
+received: list[int] = []
+attempts: dict[int, int] = defaultdict(int)
+dead: list[int] = []
+
+
+async def track(event: str, payload: Payload):
+    running[event] += 1
+    peaks[event] = max(peaks[event], running[event])
+    await asyncio.sleep(0.01)
+    running[event] -= 1
+    received.append(payload.value)
+
+
+@scoped
+class UnitOfWork:
+    def __post_init__(self):
+        self.disposed = False
+
+    async def dispose(self):
+        self.disposed = True
+
+
+@provider
+class Repository:
+    uow: UnitOfWork
+
+
+units: list[tuple[UnitOfWork, UnitOfWork]] = []
+
+
+@microservice(TransporterType.amqp)
+class AMQPService:
+    uow: UnitOfWork
+    repository: Repository
+
+    @on("scoped")
+    async def scoped(self, payload: Payload):
+        units.append((self.uow, self.repository.uow))
+        assert not self.uow.disposed
+
+    @on("limited", concurrency=2)
+    async def limited(self, payload: Payload):
+        await track("limited", payload)
+
+    @on("unlimited")
+    async def unlimited(self, payload: Payload):
+        await track("unlimited", payload)
+
+    @on("failing")
+    async def failing(self, payload: Payload):
+        raise ValueError(payload.value)
+
+    @on("flaky", retry=RetryPolicy(max_attempts=3, backoff=0.01))
+    async def flaky(self, payload: Payload):
+        attempts[payload.value] += 1
+        if attempts[payload.value] < 3:
+            raise ValueError(payload.value)
+        received.append(payload.value)
+
+    @on("doomed", retry=RetryPolicy(max_attempts=2, backoff=0.01), dead_letter="dead")
+    async def doomed(self, payload: Payload):
+        attempts[payload.value] += 1
+        raise ValueError(payload.value)
+
+    @on("forsaken", retry=RetryPolicy(max_attempts=1), dead_letter="graveyard")
+    async def forsaken(self, payload: Payload):
+        raise ValueError(payload.value)
+
+    @on("dead")
+    async def dead_letters(self, payload: Payload):
+        dead.append(payload.value)
+
+    @on("once", idempotent=True)
+    async def once(self, payload: Payload):
+        received.append(payload.value)
+
+
+def make_service(broker: Broker, **kwargs: Any) -> AMQPMicroservice:
+    settings = TransporterSettings(
+        transporter=TransporterType.amqp,
+        driver="wintry.transporters.amqp",
+        service="AMQPMicroservice",
+        connection_options=ConnectionOptions(
+            extras={"connection_pool_size": 1, "channel_pool_size": 2}
+        ),
+        **kwargs,
+    )
+    return AMQPMicroservice(settings, driver=broker)
+
+
+async def start(service: AMQPMicroservice):
+    await service.init()
+    runner = asyncio.create_task(service.run())
+    await asyncio.sleep(0)
+    return runner
+
+
+async def stop(service: AMQPMicroservice, runner: asyncio.Task):
+    await asyncio.sleep(0.1)
+    await service.close()
+    await runner
+
+
+def reset():
+    running.clear()
+    peaks.clear()
+    received.clear()
+    attempts.clear()
+    dead.clear()
+    units.clear()
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_dispatches_events_and_acks():
+    reset()
+    broker = Broker()
+    service = make_service(broker)
+    runner = await start(service)
+
+    for i in range(5):
+        await service.publish("unlimited", Payload(value=i))
+    await service.flush()
+    await stop(service, runner)
+
+    assert sorted(received) == [0, 1, 2, 3, 4]
+    assert len(broker.acked) == 5
+    stats = service.collect_stats()["unlimited"]
+    assert stats.processed == 5 and stats.failed == 0
+    assert service.collect_stats() == {}
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_honors_handler_concurrency():
+    reset()
+    broker = Broker()
+    service = make_service(broker, prefetch_count=50)
+    runner = await start(service)
+
+    for i in range(10):
+        await service.publish("limited", {"value": i})
+        await service.publish("unlimited", {"value": i})
+    await stop(service, runner)
+
+    assert peaks["limited"] == 2
+    assert peaks["unlimited"] > 2
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_prefetch_bounds_in_flight_messages():
+    reset()
+    broker = Broker()
+    service = make_service(broker, prefetch_count=3)
+    runner = await start(service)
+
+    for i in range(10):
+        await service.publish("unlimited", {"value": i})
+    await stop(service, runner)
+
+    assert peaks["unlimited"] == 3
+    assert len(received) == 10
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_batches_publisher_confirms_over_pooled_channels():
+    reset()
+    broker = Broker()
+    service = make_service(broker, publish_batch_size=4, publish_flush_interval=60)
+    await service.init()
+
+    for i in range(3):
+        await service.publish("nobody", {"value": i})
+    assert len(service._unconfirmed) == 3
+
+    await service.publish("nobody", {"value": 3})
+    assert service._unconfirmed == []
+    assert broker.confirmed == 4
+
+    await service.close()
+    # One consumer channel plus, at most, the channel pool size
+    assert broker.connections == 1
+    assert broker.channels <= 3
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_closes_connections_when_confirms_fail():
+    reset()
+    broker = Broker()
+    service = make_service(broker, publish_flush_interval=60)
+    runner = await start(service)
+
+    async def rejected(message: Message, routing_key: str):
+        return SimpleNamespace(name="Basic.Nack")
+
+    async with service.channel_pool.acquire() as (_, exchange):
+        exchange.publish = rejected
+    await service.publish("nobody", {"value": 1})
+    with pytest.raises(PublishError):
+        await service.close()
+
+    await asyncio.wait_for(runner, 1)
+    assert service._consumer_channel is None
+    assert service.channel_pool.size == service.connection_pool.size == 0
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_negotiates_codec_per_message():
+    reset()
+    broker = Broker()
+    consumer = make_service(broker)
+    compact_producer = make_service(broker, codec="compact")
+    runner = await start(consumer)
+    await compact_producer.init()
+
+    await compact_producer.publish("unlimited", Payload(value=1))
+    await consumer.publish("unlimited", Payload(value=2))
+    await compact_producer.close()
+    await stop(consumer, runner)
+
+    assert sorted(received) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_nacks_failed_messages():
+    reset()
+    broker = Broker()
+    service = make_service(broker)
+    runner = await start(service)
+
+    await service.publish("failing", {"value": 1})
+    await stop(service, runner)
+
+    assert len(broker.nacked) == 1
+    assert broker.acked == []
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_retries_failed_messages_with_backoff():
+    reset()
+    broker = Broker()
+    service = make_service(broker)
+    runner = await start(service)
+
+    await service.publish("flaky", {"value": 7})
+    await stop(service, runner)
+
+    assert attempts[7] == 3
+    assert received == [7]
+    assert broker.nacked == []
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_dead_letters_exhausted_messages():
+    reset()
+    broker = Broker()
+    service = make_service(broker)
+    runner = await start(service)
+
+    await service.publish("doomed", {"value": 3})
+    await stop(service, runner)
+
+    assert attempts[3] == 2
+    assert dead == [3]
+    dead_letter = broker.acked[-1]
+    assert dead_letter.headers["x-wintry-event"] == "doomed"
+    assert "ValueError" in dead_letter.headers["x-wintry-error"]
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_keeps_dead_letters_nobody_consumes():
+    reset()
+    broker = Broker()
+    service = make_service(broker)
+    runner = await start(service)
+
+    await service.publish("forsaken", {"value": 4})
+    await stop(service, runner)
+
+    (dead_letter,) = broker.queues["wintry.graveyard"].messages
+    assert dead_letter.headers["x-wintry-event"] == "forsaken"
+    assert broker.nacked == []
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_skips_duplicated_messages():
+    reset()
+    broker = Broker()
+    service = make_service(broker)
+    runner = await start(service)
+
+    await service.publish("once", {"value": 1}, idempotency_key="key")
+    await asyncio.sleep(0.05)
+    await service.publish("once", {"value": 1}, idempotency_key="key")
+    await service.publish("once", {"value": 2})
+    await stop(service, runner)
+
+    assert sorted(received) == [1, 2]
+    assert service.collect_stats()["once"].duplicates == 1
+
+
+@pytest.mark.asyncio
+async def test_amqp_transporter_opens_a_container_scope_per_message():
+    reset()
+    broker = Broker()
+    service = make_service(broker)
+    runner = await start(service)
+
+    await service.publish("scoped", {"value": 1})
+    await service.publish("scoped", {"value": 2})
+    await stop(service, runner)
+
+    (first, first_in_repo), (second, second_in_repo) = units
+    assert first is first_in_repo and second is second_in_repo
+    assert first is not second
+    assert first.disposed and second.disposed
+
+
+@pytest.mark.asyncio
+async def test_microservice_batches_share_a_container_scope():
+    reset()
+    service = make_service(Broker())
+    encoded = [service.encode(Payload(value=i)) for i in range(3)]
+
+    errors = await service.handle_batch(
+        service.handlers["scoped"],
+        [(e.body, e.content_type, e.headers) for e in encoded],
+    )
+
+    assert errors == [None, None, None]
+    assert len({id(uow) for uow, _ in units}) == 1
+    assert units[0][0].disposed
@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from wintry.backends import Backend, BackendError, BackendRegistry, init_backends
+from wintry.ioc.container import IGlooContainer
+from wintry.settings import BackendOptions, ConnectionOptions, WinterSettings
+from wintry.utils.pool import Pool, PoolTimeoutError
+
+
+class Resource:
+    def __init__(self, n: int) -> None:
+        self.n = n
+        self.alive = True
+
+
+def make_pool(**kwargs):
+    created: list[Resource] = []
+    disposed: list[Resource] = []
+
+    async def factory():
+        created.append(Resource(len(created)))
+        return created[-1]
+
+    async def dispose(item: Resource):
+        disposed.append(item)
+
+    pool = Pool(factory, dispose=dispose, **kwargs)
+    return pool, created, disposed
+
+
+@pytest.mark.asyncio
+async def test_pool_keeps_min_size_and_reaps_idle_items():
+    pool, created, disposed = make_pool(max_size=4, min_size=1, idle_timeout=0.05)
+    await pool.open()
+    assert len(created) == 1
+
+    async def use():
+        async with pool.acquire():
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(use() for _ in range(4)))
+    assert pool.stats().size == 4
+
+    await asyncio.sleep(0.1)
+    await pool.reap()
+    stats = pool.stats()
+    assert stats.size == 1 and stats.expired == 3
+    assert len(disposed) == 3
+    await pool.close()
+    assert len(disposed) == 4
+
+
+@pytest.mark.asyncio
+async def test_pool_replaces_unhealthy_items():
+    async def healthy(item: Resource) -> bool:
+        return item.alive
+
+    pool, created, disposed = make_pool(max_size=2, health_check=healthy)
+    async with pool.acquire() as item:
+        item.alive = False
+    async with pool.acquire() as item:
+        assert item is created[1]
+    assert disposed == [created[0]]
+    assert pool.stats().health_check_failures == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_reports_saturation_and_wait_times():
+    pool, _, _ = make_pool(max_size=2, acquire_timeout=0.05)
+    release = asyncio.Event()
+
+    async def hold():
+        async with pool.acquire():
+            await release.wait()
+
+    holders = [asyncio.create_task(hold()) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert pool.stats().saturation == 1.0
+
+    with pytest.raises(PoolTimeoutError):
+        async with pool.acquire():
+            pass
+
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+    assert pool.stats().waiting == 1
+    release.set()
+    await asyncio.gather(*holders, waiter)
+
+    stats = pool.stats()
+    assert stats.timeouts == 1
+    assert stats.waited == 1 and stats.wait_time_max >= 0.01
+    assert stats.acquired == 3 and stats.in_use == 0
+    assert stats.as_dict()["saturation"] == 0.0
+
+
+def settings(*backends: BackendOptions) -> WinterSettings:
+    return WinterSettings(backends=list(backends), auto_discovery_enabled=False)
+
+
+@pytest.mark.asyncio
+async def test_registry_builds_backends_from_settings(tmp_path):
+    container = IGlooContainer()
+    registry = init_backends(
+        settings(
+            BackendOptions(
+                driver="wintry.backends.memory",
+                connection_options=ConnectionOptions(pool_min_size=2, pool_max_size=3),
+            ),
+            BackendOptions(
+                name="cache",
+                driver="wintry.backends.memory",
+            ),
+            BackendOptions(
+                name="sqlite",
+                driver="wintry.backends.sqlite",
+                connection_options=ConnectionOptions(url=str(tmp_path / "db.sqlite3")),
+            ),
+        ),
+        container,
+    )
+    assert container[BackendRegistry] is registry
+    assert container[Backend] is registry.default
+    assert len(registry._factories) == 2
+
+    await registry.open()
+    assert registry.default.driver.connections == 2  # type: ignore
+
+    async with registry["sqlite"].connection() as connection:
+        await connection.execute("CREATE TABLE t (id INTEGER)")
+        await connection.execute("INSERT INTO t VALUES (1)")
+        await connection.commit()
+    async with registry["sqlite"].connection() as connection:
+        cursor = await connection.execute("SELECT count(*) FROM t")
+        assert await cursor.fetchone() == (1,)
+
+    stats = registry.stats()
+    assert stats["sqlite"].size == 1 and stats["sqlite"].acquired == 2
+    assert stats["default"].idle == 2
+    await registry.close()
+
+
+def test_registry_rejects_bad_configurations():
+    with pytest.raises(BackendError):
+        BackendRegistry.from_settings(
+            settings(
+                BackendOptions(driver="wintry.backends.memory"),
+                BackendOptions(driver="wintry.backends.memory"),
+            )
+        )
+    with pytest.raises(BackendError):
+        BackendRegistry.from_settings(settings(BackendOptions(driver="wintry.settings")))
+    with pytest.raises(BackendError):
+        BackendRegistry()["missing"]
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+CONFIG = """
+settings = {
+    "auto_discovery_enabled": False,
+    "transporters": [{"driver": "shop_driver", "service": "ShopMicroservice"}],
+}
+"""
+
+DRIVER = """
+from pathlib import Path
+
+from wintry.transporters import Microservice
+
+
+class ShopMicroservice(Microservice):
+    async def init(self):
+        pass
+
+    async def run(self):
+        Path("consumed").write_text(self.consumer_name)
+
+    async def close(self):
+        pass
+
+    async def publish(self, event, payload, idempotency_key=None):
+        pass
+"""
+
+
+def test_workers_command_imports_the_project(tmp_path):
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "config.py").write_text(CONFIG)
+    (project / "shop_driver.py").write_text(DRIVER)
+    # Like a console script, whose own directory is the one in sys.path
+    script = tmp_path / "bin" / "wintry"
+    script.parent.mkdir()
+    script.write_text("import sys\nfrom wintry.cli import app\nsys.exit(app())\n")
+
+    result = subprocess.run(
+        [sys.executable, str(script), "workers", "--workers", "1"],
+        cwd=project,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)},
+    )
+    assert result.returncode == 0, result.stderr
+    assert (project / "consumed").read_text().endswith("ShopMicroservice-0")
@@ -0,0 +1,76 @@
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+from wintry.generators import CodeCache, CodeGenerator
+
+
+@dataclass
+class Address:
+    street: str
+
+
+@dataclass
+class Person:
+    name: str
+    addresses: list[Address] = field(default_factory=list)
+
+
+def row():
+    return SimpleNamespace(name="Jon", addresses=[SimpleNamespace(street="Winterfell")])
+
+
+def build(cache_dir: str, generator: type[CodeGenerator] = CodeGenerator):
+    gen = generator(CodeCache(cache_dir))
+    for model in (Address, Person):
+        gen.compile_from_orm(model, globals(), locals())
+    return gen
+
+
+def test_generated_code_is_reused_across_generators(tmp_path):
+    build(str(tmp_path))
+    # from_orm and from_orm_many for each model
+    assert len(list(tmp_path.glob("*.wintry.pyc"))) == 4
+
+    class NoCodegen(CodeGenerator):
+        def model_from_orm(self, *args, **kwargs):
+            raise AssertionError("code should come from the cache")
+
+        model_from_orm_many = model_from_orm
+
+    # Simulate a fresh process: new cache, same directory
+    del Person.from_orm  # type: ignore
+    build(str(tmp_path), NoCodegen)
+
+    person = Person.from_orm(row())  # type: ignore
+    assert person == Person(name="Jon", addresses=[Address(street="Winterfell")])
+
+
+def test_model_changes_invalidate_the_cache(tmp_path):
+    cache = CodeCache(str(tmp_path))
+    key = cache.key("from_orm", Person, globals(), locals())
+
+    @dataclass
+    class Person2:
+        name: str
+        addresses: list[Address] = field(default_factory=list)
+        age: int = 0
+
+    Person2.__qualname__ = Person.__qualname__
+    Person2.__module__ = Person.__module__
+    assert cache.key("from_orm", Person2, globals(), locals()) != key
+
+
+def test_string_annotations_are_keyed_on_what_they_resolve_to(tmp_path):
+    @dataclass
+    class Owner:
+        pet: "Pet"
+
+    cache = CodeCache(str(tmp_path))
+
+    class Pet:
+        pass
+
+    plain = cache.key("from_orm", Owner, globals(), {"Pet": Pet})
+    assert cache.key("from_orm", Owner, globals(), {"Pet": Pet}) == plain
+    # Same annotation text, but now a related model
+    assert cache.key("from_orm", Owner, globals(), {"Pet": dataclass(Pet)}) != plain
@@ -0,0 +1,135 @@
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from enum import Enum
+from types import SimpleNamespace
+from typing import Optional
+from uuid import UUID
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from wintry.columnar import ColumnarResult
+from wintry.controllers import __controllers__, controller, get
+from wintry.utils.type_helpers import ModelError
+
+
+class Color(Enum):
+    red = "red"
+    blue = "blue"
+
+
+@dataclass
+class Point:
+    id: int
+    x: float
+    visible: bool
+    label: str
+    color: Color
+    created: datetime
+    day: date
+    ref: UUID
+    note: Optional[str] = None
+
+
+def points(n: int):
+    return [
+        Point(
+            id=i,
+            x=i / 3,
+            visible=i % 2 == 0,
+            label=f'point "{i}" ñ',
+            color=Color.red if i % 2 else Color.blue,
+            created=datetime(2024, 1, 1, 12, 0, i % 60, (i % 2) * 1500),
+            day=date(2024, 1, 1 + i % 28),
+            ref=UUID(int=i),
+            note=None if i % 3 else f"note {i}",
+        )
+        for i in range(n)
+    ]
+
+
+def expected(items: list[Point]) -> list[dict]:
+    return [
+        {
+            "id": p.id,
+            "x": p.x,
+            "visible": p.visible,
+            "label": p.label,
+            "color": p.color.value,
+            "created": p.created.isoformat(),
+            "day": p.day.isoformat(),
+            "ref": str(p.ref),
+            "note": p.note,
+        }
+        for p in items
+    ]
+
+
+def test_columnar_json_matches_row_encoding():
+    items = points(25)
+    result = ColumnarResult.from_orm(Point, items, chunk_size=7)
+    assert len(result) == 25
+    assert json.loads(result.json()) == expected(items)
+
+
+def test_columnar_ndjson_has_one_row_per_line():
+    items = points(10)
+    result = ColumnarResult.from_orm(Point, items, chunk_size=3)
+    lines = b"".join(result.iter_ndjson()).decode().splitlines()
+    assert [json.loads(line) for line in lines] == expected(items)
+
+
+def test_columnar_from_dicts_and_back_to_models():
+    items = points(5)
+    result = ColumnarResult.from_dicts(Point, (vars(p) for p in items))
+    assert list(result) == items
+
+
+def test_columnar_empty_result():
+    assert ColumnarResult.from_orm(Point, []).json() == b"[]"
+
+
+def test_columnar_accepts_unexpected_nulls():
+    @dataclass
+    class Row:
+        value: int
+
+    result = ColumnarResult.from_orm(
+        Row, [SimpleNamespace(value=1), SimpleNamespace(value=None)]
+    )
+    assert json.loads(result.json()) == [{"value": 1}, {"value": None}]
+
+
+def test_columnar_rejects_non_builtin_fields():
+    @dataclass
+    class Nested:
+        point: Point
+
+    with pytest.raises(ModelError):
+        ColumnarResult.from_orm(Nested, [])
+
+
+@controller(prefix="/points")
+class PointsController:
+    @get("")
+    async def list_points(self):
+        return ColumnarResult.from_orm(Point, points(4), chunk_size=3)
+
+
+router = __controllers__[-1]
+
+
+def test_columnar_endpoint_negotiates_ndjson():
+    api = FastAPI()
+    api.include_router(router)
+    client = TestClient(api)
+
+    response = client.get("/points")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == expected(points(4))
+
+    response = client.get("/points", headers={"accept": "application/x-ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert len(response.text.splitlines()) == 4
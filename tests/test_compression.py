@@ -0,0 +1,127 @@
+import gzip
+
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+from wintry import App
+from wintry.compression import (
+    CompressionMiddleware,
+    accepted_encodings,
+    is_compressible,
+)
+from wintry.controllers import __controllers__, controller, get
+from wintry.settings import Compression, WinterSettings
+
+ITEMS = [{"id": i, "name": f"item {i}"} for i in range(500)]
+
+
+@controller(prefix="/compressed")
+class CompressedController:
+    @get("/items", cacheable=True)
+    async def items(self):
+        return ITEMS
+
+    @get("/fresh")
+    async def fresh(self):
+        return ITEMS
+
+    @get("/small")
+    async def small(self):
+        return {"ok": True}
+
+    @get("/stream")
+    async def stream(self):
+        async def rows():
+            for item in ITEMS:
+                yield f"{item}\n".encode()
+
+        return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+
+router = __controllers__[-1]
+
+
+def client_with(**options) -> TestClient:
+    app = App(
+        settings=WinterSettings(compression=Compression(encodings=["gzip"], **options))
+    )
+    app.include_router(router)
+    return TestClient(app)
+
+
+def compression(client: TestClient) -> CompressionMiddleware:
+    app = client.app.middleware_stack  # type: ignore
+    while not isinstance(app, CompressionMiddleware):
+        app = app.app
+    return app
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, br;q=0.5, zstd;q=0, *;q=0.1") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "zstd": 0.0,
+        "*": 0.1,
+    }
+    assert is_compressible("application/json")
+    assert is_compressible("application/problem+json; charset=utf-8")
+    assert not is_compressible("image/png")
+
+
+def test_negotiates_the_encoding():
+    compression = Compression(encodings=["gzip"])
+    middleware = CompressionMiddleware(None, compression)  # type: ignore
+    assert middleware.select("br, gzip;q=0.8").name == "gzip"  # type: ignore
+    assert middleware.select("*").name == "gzip"  # type: ignore
+    assert middleware.select("gzip;q=0") is None
+    assert middleware.select("identity") is None
+
+
+def test_large_bodies_are_compressed_and_small_ones_not():
+    client = client_with(thread_threshold=1)
+
+    response = client.get("/compressed/fresh", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == ITEMS
+
+    response = client.get("/compressed/small", headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    response = client.get("/compressed/fresh", headers={"accept-encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == ITEMS
+
+
+def test_cacheable_routes_are_compressed_once():
+    client = client_with()
+    for _ in range(3):
+        response = client.get("/compressed/items", headers={"accept-encoding": "gzip"})
+        assert response.json() == ITEMS
+
+    cache = compression(client).cache
+    assert (cache.misses, cache.hits) == (1, 2)
+    assert len(cache.entries) == 1
+
+    client.get("/compressed/fresh", headers={"accept-encoding": "gzip"})
+    assert len(cache.entries) == 1
+
+
+def test_streamed_responses_are_compressed_as_they_go():
+    client = client_with()
+    response = client.get("/compressed/stream", headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == "".join(f"{item}\n" for item in ITEMS)
+
+
+def test_cache_evicts_least_recently_used():
+    middleware = CompressionMiddleware(None, Compression(cache_size=10))  # type: ignore
+    cache = middleware.cache
+    first, second = cache.key("gzip", b"a"), cache.key("gzip", b"b")
+    cache.put(first, b"123456")
+    cache.put(second, b"123456")
+    assert cache.get(first) is None
+    assert cache.get(second) == b"123456"
+    assert cache.size == 6
+    assert gzip.decompress(middleware.encoders[-1].compress(b"x" * 10)) == b"x" * 10
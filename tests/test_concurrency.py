@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from httpx import AsyncClient
+
+from wintry import App
+from wintry.concurrency import Limiter, Overloaded
+from wintry.controllers import __controllers__, controller, get
+from wintry.settings import ConcurrencyLimit, WinterSettings
+
+# Recreated by each test, as events are bound to the loop they are used in
+release: asyncio.Event
+
+
+@controller(
+    prefix="/limited",
+    concurrency=ConcurrencyLimit(algorithm="fixed", initial_limit=1, max_queue=0),
+)
+class LimitedController:
+    @get("/slow")
+    async def slow(self):
+        await release.wait()
+        return {"ok": True}
+
+    @get("/shared")
+    async def shared(self):
+        return {"ok": True}
+
+    @get(
+        "/own",
+        concurrency=ConcurrencyLimit(algorithm="fixed", initial_limit=5, max_queue=0),
+    )
+    async def own(self):
+        return {"ok": True}
+
+
+router = __controllers__[-1]
+
+
+def fixed(**kwargs) -> ConcurrencyLimit:
+    return ConcurrencyLimit(algorithm="fixed", **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_over_the_limit_and_hands_slots_in_order():
+    limiter = Limiter(fixed(initial_limit=1, max_queue=1, queue_timeout=5))
+    await limiter.acquire()
+
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.stats()["queued"] == 1
+
+    # The queue is full
+    with pytest.raises(Overloaded):
+        await limiter.acquire()
+
+    limiter.release(0.01)
+    await waiting
+    assert limiter.stats() == {
+        "limit": 1,
+        "inflight": 1,
+        "queued": 0,
+        "accepted": 2,
+        "rejected": 1,
+    }
+    limiter.release(0.01)
+    assert limiter.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_after_queue_timeout():
+    limiter = Limiter(fixed(initial_limit=1, queue_timeout=0.01))
+    await limiter.acquire()
+    with pytest.raises(Overloaded):
+        await limiter.acquire()
+    assert limiter.stats()["queued"] == 0
+
+    limiter.release(0.01)
+    assert limiter.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_its_slot():
+    limiter = Limiter(fixed(initial_limit=1, queue_timeout=5))
+    await limiter.acquire()
+    waiting = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    # The slot is handed over and the waiter cancelled before it runs
+    limiter.release(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert limiter.inflight == 0
+
+
+def test_aimd_grows_when_saturated_and_backs_off_on_slow_requests():
+    limiter = Limiter(
+        ConcurrencyLimit(algorithm="aimd", initial_limit=4, latency_threshold=0.1)
+    )
+    limiter.inflight = 5
+    limiter.release(0.01)
+    assert limiter.limit == pytest.approx(4.25)
+
+    limiter.release(1.0)
+    assert limiter.limit == pytest.approx(4.25 * 0.9)
+
+    limiter.release(0.01, failed=True)
+    assert limiter.limit == pytest.approx(4.25 * 0.81)
+
+
+def test_gradient_shrinks_when_latency_grows():
+    limiter = Limiter(ConcurrencyLimit(initial_limit=50, max_limit=100))
+    for _ in range(200):
+        limiter.inflight = 50
+        limiter.release(0.01)
+    grown = limiter.limit
+    assert grown > 50
+
+    for _ in range(20):
+        limiter.inflight = int(limiter.limit)
+        limiter.release(0.2)
+    assert limiter.limit < grown / 2
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        Limiter(ConcurrencyLimit(algorithm="vegas"))
+
+
+@pytest.mark.asyncio
+async def test_app_sheds_load_with_503():
+    app = App(
+        settings=WinterSettings(
+            concurrency_limit=fixed(initial_limit=1, max_queue=0, retry_after=3)
+        )
+    )
+    app.include_router(router)
+    global release
+    release = asyncio.Event()
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        slow = asyncio.create_task(client.get("/limited/slow"))
+        await asyncio.sleep(0.05)
+
+        response = await client.get("/limited/own")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+        assert response.json() == {"detail": "Service overloaded, retry later"}
+
+        release.set()
+        assert (await slow).status_code == 200
+        assert (await client.get("/limited/own")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_controller_limit_is_shared_but_routes_keep_their_own():
+    app = App()
+    app.include_router(router)
+    global release
+    release = asyncio.Event()
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        slow = asyncio.create_task(client.get("/limited/slow"))
+        await asyncio.sleep(0.05)
+
+        response = await client.get("/limited/shared")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert (await client.get("/limited/own")).status_code == 200
+
+        release.set()
+        assert (await slow).status_code == 200
+
+    assert TestClient(app).get("/limited/shared").status_code == 200
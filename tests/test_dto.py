@@ -0,0 +1,170 @@
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from wintry.controllers import (
+    __controllers__,
+    controller,
+    get,
+    prepare_response_content,
+    wintry_jsonable_encoder,
+)
+from wintry.dto import dto, is_dto
+
+
+@dto
+class TagRead:
+    name: str
+
+
+@dto
+class AddressRead:
+    street: str
+    number: int = 0
+
+
+@dto
+class UserRead:
+    id: int
+    name: str
+    address: Optional[AddressRead] = None
+    tags: list[TagRead] | None = None
+
+
+@dto
+class EventRead:
+    id: int
+    at: datetime
+
+
+@dto
+class ProductRead:
+    price: Decimal
+    extra: Any
+    meta: Optional[dict]
+    stock: dict[str, int]
+    size: tuple[int, int]
+    labels: set[str]
+
+
+def user_row(id: int = 1):
+    return SimpleNamespace(
+        id=id,
+        name="Jon",
+        address=SimpleNamespace(street="Winterfell", number=1),
+        tags=[SimpleNamespace(name="stark")],
+    )
+
+
+def user_dict(id: int = 1):
+    return {
+        "id": id,
+        "name": "Jon",
+        "address": {"street": "Winterfell", "number": 1},
+        "tags": [{"name": "stark"}],
+    }
+
+
+def test_dto_instances_have_no_dict():
+    user = UserRead(id=1, name="Jon")
+    assert not hasattr(user, "__dict__")
+    assert UserRead.__slots__ == ("id", "name", "address", "tags")  # type: ignore
+    assert is_dto(user) and not is_dto(user_row())
+
+
+def test_dto_from_orm_and_to_dict():
+    user = UserRead.from_orm(user_row())  # type: ignore
+    assert user.to_dict() == user_dict()  # type: ignore
+    users = UserRead.from_orm_many([user_row(1), user_row(2)])  # type: ignore
+    assert [u.to_dict() for u in users] == [user_dict(1), user_dict(2)]
+
+
+def test_dto_build_and_map():
+    user = UserRead.build(user_dict())  # type: ignore
+    assert user.address == AddressRead(street="Winterfell", number=1)
+
+    address = user.address
+    changes = {"name": "Arya", "address": {"number": 2}, "tags": [{"name": "wolf"}]}
+    user.map(changes)  # type: ignore
+    assert user.address is address
+    assert user.to_dict() == {  # type: ignore
+        "id": 1,
+        "name": "Arya",
+        "address": {"street": "Winterfell", "number": 2},
+        "tags": [{"name": "wolf"}],
+    }
+
+
+def test_dto_json_native_flag():
+    assert UserRead.__winter_dto__  # type: ignore
+    assert not EventRead.__winter_dto__  # type: ignore
+
+
+def test_dto_fields_of_other_types_are_used_as_they_are():
+    values = {
+        "price": Decimal("9.99"),
+        "extra": SimpleNamespace(a=1),
+        "meta": {"a": [1]},
+        "stock": {"north": 2},
+        "size": (2, 3),
+        "labels": {"new"},
+    }
+    product = ProductRead.from_orm(SimpleNamespace(**values))  # type: ignore
+    assert product.to_dict() == values  # type: ignore
+    assert ProductRead.build(values).to_dict() == values  # type: ignore
+    assert ProductRead.from_orm_many([product])[0] == product  # type: ignore
+    product = ProductRead(**{**values, "meta": None})
+    assert product.to_dict()["meta"] is None  # type: ignore
+
+
+def test_dto_containers_other_than_lists_are_not_json_native():
+    @dto
+    class Labels:
+        labels: set[str]
+
+    @dto
+    class Stock:
+        stock: dict[str, int]
+
+    assert not Labels.__winter_dto__  # type: ignore
+    assert not Stock.__winter_dto__  # type: ignore
+    labels = Labels(labels={"new"})
+    assert wintry_jsonable_encoder(labels) == {"labels": ["new"]}
+    assert wintry_jsonable_encoder([labels]) == [{"labels": ["new"]}]
+
+
+def test_dto_response_encoding():
+    users = UserRead.from_orm_many([user_row(1), user_row(2)])  # type: ignore
+    assert prepare_response_content(users, exclude_unset=False) == [
+        user_dict(1),
+        user_dict(2),
+    ]
+    assert wintry_jsonable_encoder(users) == [user_dict(1), user_dict(2)]
+
+    event = EventRead(id=1, at=datetime(2024, 1, 1))
+    assert wintry_jsonable_encoder([event]) == [{"id": 1, "at": "2024-01-01T00:00:00"}]
+    assert wintry_jsonable_encoder(UserRead(id=1, name="Jon"), exclude_none=True) == {
+        "id": 1,
+        "name": "Jon",
+    }
+
+
+@controller(prefix="/users")
+class UsersController:
+    @get("")
+    async def list_users(self):
+        return UserRead.from_orm_many([user_row(1), user_row(2)])  # type: ignore
+
+
+router = __controllers__[-1]
+
+
+def test_dto_endpoint():
+    api = FastAPI()
+    api.include_router(router)
+    response = TestClient(api).get("/users")
+    assert response.json() == [user_dict(1), user_dict(2)]
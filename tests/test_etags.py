@@ -0,0 +1,96 @@
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from wintry import App
+from wintry.controllers import __controllers__, controller, get
+from wintry.etags import etag_matches, make_etag
+from wintry.settings import Compression, WinterSettings
+
+calls: list[str] = []
+VERSION = "v1"
+
+
+@controller(prefix="/tagged")
+class TaggedController:
+    @get("/hashed", etag=True)
+    async def hashed(self):
+        calls.append("hashed")
+        return [{"id": i} for i in range(300)]
+
+    async def items_version(self, request: Request):
+        return VERSION if request.query_params.get("versioned") != "no" else None
+
+    @get("/versioned", etag=items_version)
+    async def versioned(self, versioned: str = "yes"):
+        calls.append("versioned")
+        return {"items": []}
+
+    @get("/plain")
+    async def plain(self):
+        return {"ok": True}
+
+
+router = __controllers__[-1]
+
+
+def client(settings: WinterSettings = WinterSettings()) -> TestClient:
+    app = App(settings=settings)
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_etag_matching():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"a"', '"b"')
+    assert make_etag(b"body") == make_etag(b"body") != make_etag(b"other")
+
+
+def test_etag_from_encoded_body():
+    http = client()
+    response = http.get("/tagged/hashed")
+    tag = response.headers["etag"]
+    assert tag == make_etag(response.content)
+
+    response = http.get("/tagged/hashed", headers={"if-none-match": tag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == tag
+    assert "content-type" not in response.headers
+
+    response = http.get("/tagged/hashed", headers={"if-none-match": '"stale"'})
+    assert response.status_code == 200
+    assert "etag" not in http.get("/tagged/plain").headers
+
+
+def test_version_function_skips_the_endpoint():
+    http = client()
+    calls.clear()
+    response = http.get("/tagged/versioned")
+    assert response.headers["etag"] == f'"{VERSION}"'
+
+    response = http.get("/tagged/versioned", headers={"if-none-match": f'"{VERSION}"'})
+    assert response.status_code == 304
+    assert calls == ["versioned"]
+
+    # Without a version, the body is hashed
+    response = http.get(
+        "/tagged/versioned",
+        params={"versioned": "no"},
+        headers={"if-none-match": f'"{VERSION}"'},
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] == make_etag(response.content)
+
+
+def test_compressed_responses_get_weak_etags():
+    http = client(WinterSettings(compression=Compression(encodings=["gzip"])))
+    response = http.get("/tagged/hashed", headers={"accept-encoding": "gzip"})
+    tag = response.headers["etag"]
+    assert response.headers["content-encoding"] == "gzip"
+    assert tag.startswith('W/"')
+
+    response = http.get(
+        "/tagged/hashed", headers={"accept-encoding": "gzip", "if-none-match": tag}
+    )
+    assert response.status_code == 304
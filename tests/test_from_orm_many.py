@@ -0,0 +1,88 @@
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Optional
+
+from wintry.generators import CodeCache, CodeGenerator
+
+
+@dataclass
+class Tag:
+    name: str
+
+
+@dataclass
+class Address:
+    street: str
+    number: int
+
+
+@dataclass
+class Owner:
+    address: Optional[Address] = None
+    tags: list[Tag] = field(default_factory=list)
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    address: Optional[Address] = None
+    tags: list[Tag] = field(default_factory=list)
+    scores: list[int] = field(default_factory=list)
+
+
+gen = CodeGenerator(CodeCache(""))
+for model in (Tag, Address, Owner, User):
+    gen.compile_from_orm(model, globals(), locals())
+
+
+def rows():
+    return [
+        SimpleNamespace(
+            id=1,
+            name="Jon",
+            address=SimpleNamespace(street="Winterfell", number=1),
+            tags=[SimpleNamespace(name="stark"), SimpleNamespace(name="crow")],
+            scores=[1, 2],
+        ),
+        SimpleNamespace(id=2, name="Arya", address=None, tags=[], scores=[]),
+        SimpleNamespace(
+            id=3,
+            name="Sansa",
+            address=SimpleNamespace(street="Eyrie", number=3),
+            tags=[SimpleNamespace(name="lady")],
+            scores=[3],
+        ),
+    ]
+
+
+def test_from_orm_many_matches_per_row_from_orm():
+    expected = [User.from_orm(r) for r in rows()]  # type: ignore
+    assert User.from_orm_many(rows()) == expected  # type: ignore
+
+
+def test_from_orm_many_keeps_children_with_their_rows():
+    users = User.from_orm_many(iter(rows()))  # type: ignore
+    assert [u.address for u in users] == [
+        Address(street="Winterfell", number=1),
+        None,
+        Address(street="Eyrie", number=3),
+    ]
+    assert [[t.name for t in u.tags] for u in users] == [["stark", "crow"], [], ["lady"]]
+
+
+def test_from_orm_many_without_scalar_fields():
+    owners = Owner.from_orm_many(  # type: ignore
+        [
+            SimpleNamespace(address=None, tags=[SimpleNamespace(name="a")]),
+            SimpleNamespace(address=SimpleNamespace(street="b", number=2), tags=[]),
+        ]
+    )
+    assert owners == [
+        Owner(tags=[Tag(name="a")]),
+        Owner(address=Address(street="b", number=2)),
+    ]
+
+
+def test_from_orm_many_of_nothing():
+    assert User.from_orm_many([]) == []  # type: ignore
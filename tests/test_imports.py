@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+import wintry
+from wintry.utils.importtime import parse_importtime
+
+HTTP_STACK = ("fastapi", "starlette", "uvicorn")
+
+
+def loaded_packages(module: str) -> set[str]:
+    code = f"import sys, {module}; print(' '.join(sys.modules))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return {name.split(".")[0] for name in output.split()}
+
+
+def test_consumers_do_not_import_the_http_stack():
+    for module in ("wintry", "wintry.ioc", "wintry.microservices", "wintry.transporters"):
+        assert not loaded_packages(module) & set(HTTP_STACK), module
+
+
+def test_top_level_attributes_are_lazy():
+    assert "controller" in dir(wintry)
+    from wintry.controllers import controller
+    from wintry.microservices import on
+
+    assert wintry.controller is controller
+    assert wintry.on is on
+
+
+def test_parse_importtime():
+    entries = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   typing\n"
+        "import time:        80 |        200 | wintry\n"
+    )
+    assert [(e.module, e.self_us, e.cumulative_us, e.depth) for e in entries] == [
+        ("typing", 120, 120, 1),
+        ("wintry", 80, 200, 0),
+    ]
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+
+from wintry.utils.loaders import LoaderError, autodiscover_modules, to_package_format
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    files = {
+        "shop/__init__.py": "",
+        "shop/app.py": "@controller\nclass App: ...\n",
+        "shop/controllers.py": (
+            "from x import controller\n\n@controller\nclass Users: ...\n"
+        ),
+        "shop/services.py": "@ioc.provider(of=object)\nclass Service: ...\n",
+        "shop/helpers.py": "def helper(): ...\n",
+        "shop/pyhelpers.py": "# mentions @controller only in a comment\n",
+        "shop/tests/test_users.py": "@controller\nclass Fake: ...\n",
+        "shop/migrations/0001.py": "@scoped\nclass Migration: ...\n",
+        "shop/.cache/hidden.py": "@scoped\nclass Hidden: ...\n",
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    imported: list[str] = []
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(
+        "wintry.utils.loaders.importlib.import_module", lambda mod: imported.append(mod)
+    )
+    return imported
+
+
+def test_to_package_format():
+    assert to_package_format(Path("a/b/module.py")) == "a.b.module"
+    assert to_package_format(Path("a/b/__init__.py")) == "a.b"
+    assert to_package_format(Path("a/copy.py/mod.py")) == "a.copy.py.mod"
+
+
+def test_autodiscovery_only_imports_modules_using_markers(project):
+    report = autodiscover_modules(["shop"], "shop.app:app")
+    assert project == ["shop.controllers", "shop.services"]
+    assert report.scanned == 6
+    assert list(report.import_times) == project
+
+
+def test_autodiscovery_honors_include_exclude_and_markers(project):
+    autodiscover_modules(
+        ["shop"],
+        "shop.app:app",
+        include=["migrations/*", ".cache/*"],
+        exclude=[".*"],
+        markers=["scoped"],
+    )
+    assert project == ["shop.migrations.0001"]
+
+    project.clear()
+    report = autodiscover_modules(["."], "shop.main:app", markers=[])
+    assert project == [
+        "shop",
+        "shop.app",
+        "shop.controllers",
+        "shop.helpers",
+        "shop.pyhelpers",
+        "shop.services",
+    ]
+    assert report.slowest(1)[0][0] in project
+
+
+def test_autodiscovery_requires_directories(project):
+    with pytest.raises(LoaderError):
+        autodiscover_modules(["shop/app.py"], "shop.app:app")
@@ -0,0 +1,66 @@
+import io
+import json
+import logging
+from logging.handlers import QueueHandler
+
+import pytest
+
+from wintry.logs import LOGGER_NAME, configure_logging, stop_logging
+
+
+@pytest.fixture
+def stream():
+    stream = io.StringIO()
+    yield stream
+    stop_logging()
+
+
+def queue_handlers() -> list[logging.Handler]:
+    return [
+        h for h in logging.getLogger(LOGGER_NAME).handlers if isinstance(h, QueueHandler)
+    ]
+
+
+def test_configure_logging_is_idempotent(stream):
+    configure_logging("DEBUG", stream=stream)
+    logger = configure_logging("WARNING")
+    assert len(queue_handlers()) == 1
+    assert logger.level == logging.WARNING
+
+    logger.info("hidden")
+    logger.warning("shown")
+    stop_logging()
+    assert queue_handlers() == []
+    assert "hidden" not in stream.getvalue()
+    assert "shown" in stream.getvalue()
+
+
+def test_logs_are_written_by_a_background_thread(stream):
+    writers: list[str] = []
+
+    class Recorder(io.StringIO):
+        def write(self, s: str) -> int:
+            import threading
+
+            writers.append(threading.current_thread().name)
+            return super().write(s)
+
+    logger = configure_logging(stream=Recorder())
+    logger.info("message")
+    stop_logging()
+    assert writers and "MainThread" not in writers
+
+
+def test_json_logs(stream):
+    logger = configure_logging(json_format=True, stream=stream)
+    logger.info("created %s", "order", extra={"order_id": 7})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    stop_logging()
+
+    created, failed = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert created["message"] == "created order"
+    assert created["level"] == "INFO" and created["order_id"] == 7
+    assert failed["level"] == "ERROR" and "ValueError: boom" in failed["exc_info"]
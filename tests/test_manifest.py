@@ -0,0 +1,164 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from wintry.controllers import __controllers__
+from wintry.settings import WinterSettings
+from wintry.utils.manifest import (
+    Manifest,
+    ManifestError,
+    ManifestModule,
+    build_manifest,
+    import_manifest,
+)
+
+CONTROLLER = """
+from wintry.controllers import controller, get
+
+
+@controller(prefix="/{name}")
+class {name}Controller:
+    @get("")
+    async def list(self):
+        return []
+"""
+
+PROVIDER = """
+from wintry.ioc import provider
+
+
+@provider
+class InventoryService:
+    pass
+"""
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    files = {
+        "inventory/__init__.py": "",
+        "inventory/app.py": "",
+        "inventory/a_items.py": CONTROLLER.format(name="Items"),
+        "inventory/b_services.py": PROVIDER,
+        "inventory/c_orders.py": CONTROLLER.format(name="Orders"),
+        "inventory/utils.py": "",
+    }
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    controllers = len(__controllers__)
+    yield WinterSettings(
+        modules=["inventory"],
+        app_path="inventory.app:app",
+        manifest_path=str(tmp_path / "wintry.manifest.json"),
+    )
+    del __controllers__[controllers:]
+    for mod in list(sys.modules):
+        if mod.startswith("inventory"):
+            del sys.modules[mod]
+
+
+def forget_modules():
+    for mod in list(sys.modules):
+        if mod.startswith("inventory."):
+            del sys.modules[mod]
+    __controllers__.clear()
+
+
+def test_manifest_records_modules_and_registrations(project):
+    manifest = build_manifest(project)
+    assert [m.name for m in manifest.modules] == [
+        "inventory.a_items",
+        "inventory.b_services",
+        "inventory.c_orders",
+    ]
+    assert manifest.modules[0].registrations == {"controllers": ["ItemsController"]}
+    assert manifest.modules[1].registrations == {"providers": ["InventoryService"]}
+    assert list(manifest.directories) == ["inventory"]
+
+    manifest.dump(project.manifest_path)
+    assert Manifest.load(project.manifest_path) == manifest
+    assert manifest.stale() == []
+
+
+@pytest.mark.parametrize("threads", [0, 4])
+def test_import_manifest_keeps_registration_order(project, threads):
+    build_manifest(project).dump(project.manifest_path)
+    saved = list(__controllers__)
+    try:
+        forget_modules()
+        report = import_manifest(project.manifest_path, threads=threads)
+        assert list(report.import_times) == [
+            "inventory.a_items",
+            "inventory.b_services",
+            "inventory.c_orders",
+        ]
+        assert [r.routes[0].path for r in __controllers__] == ["/Items", "/Orders"]
+    finally:
+        __controllers__[:] = saved + __controllers__
+
+
+def test_consumer_manifest_does_not_import_controllers(project, tmp_path):
+    path = "inventory/b_services.py"
+    Manifest(
+        app_path=project.app_path,
+        roots=["inventory"],
+        include=[],
+        exclude=[],
+        markers=[],
+        modules=[ManifestModule("inventory.b_services", path, os.stat(path).st_mtime_ns)],
+    ).dump(project.manifest_path)
+
+    code = (
+        "import sys; from wintry.utils.manifest import import_manifest; "
+        f"import_manifest({project.manifest_path!r}, threads=2); "
+        "print('inventory.b_services' in sys.modules, "
+        "'wintry.controllers' in sys.modules)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(p for p in sys.path if p)},
+    ).stdout
+    assert output.split() == ["True", "False"]
+
+
+def test_stale_manifest_falls_back_to_autodiscovery(project, tmp_path):
+    manifest = build_manifest(project)
+    (tmp_path / "inventory" / "d_new.py").write_text("from wintry.ioc import scoped\n")
+    assert manifest.stale() == ["inventory"]
+
+    report = import_manifest(manifest)
+    assert "inventory.d_new" not in report.import_times
+    assert report.scanned == 7
+
+    os.utime(tmp_path / "inventory" / "a_items.py", ns=(0, 0))
+    assert "inventory/a_items.py" in manifest.stale()
+
+
+def test_marker_added_to_a_scanned_module_makes_the_manifest_stale(project, tmp_path):
+    manifest = build_manifest(project)
+    assert "inventory/utils.py" in manifest.files
+    utils = tmp_path / "inventory" / "utils.py"
+    utils.write_text(PROVIDER.replace("InventoryService", "Clock"))
+    os.utime(utils, ns=(0, 0))
+    assert manifest.stale() == ["inventory/utils.py"]
+
+    report = import_manifest(manifest)
+    assert "inventory.utils" in report.import_times
+
+
+def test_manifest_load_errors(tmp_path):
+    with pytest.raises(ManifestError):
+        Manifest.load(tmp_path / "missing.json")
+    (tmp_path / "old.json").write_text('{"version": 0}')
+    with pytest.raises(ManifestError):
+        Manifest.load(tmp_path / "old.json")
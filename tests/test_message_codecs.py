@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+from pydantic import BaseModel
+
+from wintry.transporters.codecs import (
+    SCHEMA_HEADER,
+    CodecError,
+    CodecRegistry,
+    CompactCodec,
+    JsonCodec,
+    MsgPackCodec,
+)
+
+
+class Point(BaseModel):
+    x: int
+    y: float
+    label: str
+
+
+class Event(BaseModel):
+    name: str
+    at: datetime
+    points: list[Point]
+
+
+class PointV2(BaseModel):
+    x: int
+    y: float
+    z: float
+    label: str
+
+
+event = Event(
+    name="moved",
+    at=datetime(2022, 1, 1, 10, 30),
+    points=[Point(x=1, y=2.5, label="a"), Point(x=3, y=4.0, label="b")],
+)
+
+
+@pytest.mark.parametrize("codec", [JsonCodec(), MsgPackCodec(), CompactCodec()])
+def test_codecs_round_trip_models(codec):
+    encoded = codec.encode(event)
+    assert encoded.content_type == codec.content_type
+    assert codec.decode(encoded.body, Event, encoded.headers) == event
+
+
+@pytest.mark.parametrize("codec", [JsonCodec(), MsgPackCodec()])
+def test_codecs_round_trip_plain_payloads(codec):
+    payload = {"name": "moved", "values": [1, 2, 3]}
+    encoded = codec.encode(payload)
+    assert codec.decode(encoded.body, dict, encoded.headers) == payload
+
+
+def test_compact_codec_omits_field_names():
+    point = Point(x=1, y=2.5, label="a")
+    compact = CompactCodec().encode(point)
+    assert b"label" not in compact.body
+    assert len(compact.body) < len(MsgPackCodec().encode(point).body)
+
+
+def test_compact_codec_builds_native_models_without_validation():
+    codec = CompactCodec()
+    point = Point(x=1, y=2.5, label="a")
+    encoded = codec.encode(point)
+    decoded = codec.decode(encoded.body, Point, encoded.headers)
+    assert codec.schema(Point).native
+    assert decoded == point
+
+
+def test_compact_codec_rejects_messages_from_other_schema():
+    codec = CompactCodec()
+    encoded = codec.encode(Point(x=1, y=2.5, label="a"))
+    assert encoded.headers[SCHEMA_HEADER] != codec.schema(PointV2).fingerprint
+
+    with pytest.raises(CodecError):
+        codec.decode(encoded.body, PointV2, encoded.headers)
+
+
+def test_registry_negotiates_codec_from_content_type():
+    registry = CodecRegistry("compact")
+    assert isinstance(registry.default, CompactCodec)
+    assert isinstance(registry.for_content_type("application/msgpack"), MsgPackCodec)
+    assert isinstance(registry.for_content_type(None), JsonCodec)
+    assert registry.for_content_type(CompactCodec.content_type) is registry.default
+
+    with pytest.raises(CodecError):
+        registry.for_content_type("text/plain")
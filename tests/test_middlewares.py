@@ -0,0 +1,102 @@
+import logging
+
+import pytest
+from fastapi.middleware import Middleware as ASGIMiddleware
+from fastapi.testclient import TestClient
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from wintry import App
+from wintry.controllers import __controllers__, controller, get
+from wintry.middlewares import CORSMiddleware
+from wintry.settings import Middleware, WinterSettings
+
+
+@controller(prefix="/cors")
+class CorsController:
+    @get("")
+    async def read(self):
+        return {"ok": True}
+
+
+router = __controllers__[-1]
+
+
+def app_with(*middlewares: Middleware) -> App:
+    app = App(settings=WinterSettings(middlewares=list(middlewares)))
+    app.include_router(router)
+    return app
+
+
+def cors(**args) -> Middleware:
+    return Middleware(module="wintry.middlewares", name="CORSMiddleware", args=args)
+
+
+def test_preflights_are_answered_from_cache():
+    app = app_with(
+        cors(
+            allow_origins=["https://a.com"],
+            allow_methods=["GET", "POST"],
+            allow_headers=["x-token"],
+            allow_credentials=True,
+        )
+    )
+    client = TestClient(app)
+    preflight = {
+        "origin": "https://a.com",
+        "access-control-request-method": "POST",
+        "access-control-request-headers": "X-Token, content-type",
+    }
+    for _ in range(2):
+        response = client.options("/cors", headers=preflight)
+        assert response.status_code == 200
+        assert response.headers["access-control-allow-origin"] == "https://a.com"
+        assert response.headers["access-control-allow-methods"] == "GET, POST"
+        assert response.headers["access-control-allow-credentials"] == "true"
+        assert "x-token" in response.headers["access-control-allow-headers"]
+        assert response.headers["vary"] == "Origin"
+
+    cors_middleware = app.middleware_stack.app  # type: ignore
+    assert isinstance(cors_middleware, CORSMiddleware)
+    assert len(cors_middleware._preflights) == 1
+
+    response = client.options(
+        "/cors",
+        headers={
+            **preflight,
+            "origin": "https://b.com",
+            "access-control-request-method": "PUT",
+        },
+    )
+    assert response.status_code == 400
+    assert response.text == "Disallowed CORS origin, method"
+    assert "access-control-allow-origin" not in response.headers
+
+
+def test_simple_requests_get_cors_headers():
+    client = TestClient(app_with(cors(allow_origins=["*"], expose_headers=["x-total"])))
+
+    response = client.get("/cors", headers={"origin": "https://a.com"})
+    assert response.json() == {"ok": True}
+    assert response.headers["access-control-allow-origin"] == "*"
+    assert response.headers["access-control-expose-headers"] == "x-total"
+
+    response = client.get("/cors")
+    assert "access-control-allow-origin" not in response.headers
+
+
+def test_settings_middlewares_wrap_app_middlewares(caplog: pytest.LogCaptureFixture):
+    class Slow(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            return await call_next(request)
+
+    caplog.set_level(logging.WARNING, logger="logger")
+    app = App(
+        settings=WinterSettings(middlewares=[cors(allow_origins=["*"])]),
+        middleware=[ASGIMiddleware(Slow)],
+    )
+    assert [m.cls.__name__ for m in app.user_middleware] == [
+        "CORSMiddleware",
+        "IoCContainerMiddleware",
+        "Slow",
+    ]
+    assert "is a BaseHTTPMiddleware" in caplog.text
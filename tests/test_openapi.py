@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from wintry import App
+from wintry.controllers import __controllers__, controller, get
+from wintry.openapi import build_schema
+from wintry.settings import WinterSettings
+
+
+@controller(prefix="/documented")
+class DocumentedController:
+    @get("/items")
+    async def items(self):
+        return []
+
+
+router = __controllers__[-1]
+
+
+def app_with(**settings) -> App:
+    app = App(settings=WinterSettings(**settings))
+    app.include_router(router)
+    return app
+
+
+def test_schema_is_built_on_startup_and_served_with_etag():
+    app = app_with()
+    with TestClient(app) as client:
+        app.openapi_document.start().result(timeout=10)
+        assert app.openapi_document.body is not None
+
+        response = client.get("/openapi.json")
+        assert response.status_code == 200
+        assert "/documented/items" in response.json()["paths"]
+        assert response.content == app.openapi_document.body
+
+        tag = response.headers["etag"]
+        response = client.get("/openapi.json", headers={"if-none-match": tag})
+        assert response.status_code == 304
+
+    assert [r.path for r in app.routes].count("/openapi.json") == 1
+
+
+def test_schema_is_built_by_the_first_request_without_prebuild():
+    app = app_with(openapi_prebuild=False)
+    client = TestClient(app)
+    assert app.openapi_document.body is None
+    assert "/documented/items" in client.get("/openapi.json").json()["paths"]
+
+
+def test_schema_is_loaded_from_the_artifact(tmp_path: Path):
+    artifact = tmp_path / "openapi.json"
+    artifact.write_bytes(build_schema(app_with()))
+    schema = json.loads(artifact.read_bytes())
+    schema["info"]["title"] = "From artifact"
+    artifact.write_text(json.dumps(schema))
+
+    app = app_with(openapi_path=str(artifact))
+    with TestClient(app) as client:
+        assert client.get("/openapi.json").json()["info"]["title"] == "From artifact"
+    assert app.openapi()["info"]["title"] == "From artifact"
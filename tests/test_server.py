@@ -0,0 +1,176 @@
+import http.client
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from pathlib import Path
+
+import pytest
+
+from wintry.server import (
+    REUSE_PORT_BALANCES,
+    ServerOptions,
+    ServerSupervisor,
+    available_cpus,
+    bind_socket,
+    resolve_http,
+    resolve_loop,
+)
+from wintry.settings import WinterSettings
+
+EVENTS = "WINTRY_TEST_SERVER_EVENTS"
+
+
+def record(event: str):
+    with open(os.environ[EVENTS], "a") as f:
+        f.write(f"{event} {os.getpid()}\n")
+
+
+async def app(scope, receive, send):
+    """Records when each process starts and stops, and answers its pid"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                record("start")
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                record("stop")
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": str(os.getpid()).encode()})
+
+
+def test_options_resolve_auto_values():
+    options = ServerOptions.from_settings(
+        WinterSettings(app_path="main:api", port=9000, auto_discovery_enabled=False)
+    )
+    assert options.workers == available_cpus()
+    assert options.loop in ("uvloop", "asyncio") and options.loop == resolve_loop("auto")
+    assert options.http in ("httptools", "h11") and options.http == resolve_http("auto")
+    assert options.reuse_port is REUSE_PORT_BALANCES
+
+    config = options.config()
+    assert (config.app, config.port, config.backlog) == ("main:api", 9000, 2048)
+    assert config.timeout_graceful_shutdown == 30
+
+
+def test_options_overrides_skip_none():
+    options = ServerOptions.from_settings(
+        WinterSettings(workers=3, keep_alive=10),
+        workers=None,
+        loop="asyncio",
+        http="h11",
+        keep_alive=None,
+        graceful_timeout=2.5,
+        reuse_port=False,
+    )
+    assert (options.workers, options.keep_alive) == (3, 10)
+    assert (options.loop, options.http, options.reuse_port) == ("asyncio", "h11", False)
+    assert options.config().timeout_graceful_shutdown == 3
+
+
+@pytest.mark.skipif(
+    not REUSE_PORT_BALANCES, reason="SO_REUSEPORT balancing is Linux only"
+)
+def test_reuse_port_sockets_share_the_port():
+    first = bind_socket("127.0.0.1", 0, backlog=16, reuse_port=True)
+    port = first.getsockname()[1]
+    second = bind_socket("127.0.0.1", port, backlog=16, reuse_port=True)
+    try:
+        assert second.getsockname()[1] == port
+        with pytest.raises(OSError):
+            bind_socket("127.0.0.1", port, backlog=16, reuse_port=False)
+    finally:
+        first.close()
+        second.close()
+
+    exclusive = bind_socket("127.0.0.1", 0, backlog=16, reuse_port=False)
+    try:
+        assert exclusive.get_inheritable()
+        assert not exclusive.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT)
+    finally:
+        exclusive.close()
+
+
+def events(path: Path) -> list[tuple[str, int]]:
+    if not path.exists():
+        return []
+    return [
+        (e, int(pid))
+        for e, pid in (line.split() for line in path.read_text().splitlines())
+    ]
+
+
+def served_by(port: int) -> int:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        connection.request("GET", "/")
+        response = connection.getresponse()
+        assert response.status == 200
+        return int(response.read())
+    finally:
+        connection.close()
+
+
+def wait_until(condition, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="SIGHUP is POSIX only")
+def test_sighup_replaces_processes_one_at_a_time(tmp_path: Path, monkeypatch):
+    log = tmp_path / "events"
+    monkeypatch.setenv(EVENTS, str(log))
+    probe = bind_socket("127.0.0.1", 0, backlog=1, reuse_port=False)
+    port = probe.getsockname()[1]
+    probe.close()
+
+    options = ServerOptions.from_settings(
+        WinterSettings(app_path=f"{__name__}:app", port=port),
+        host="127.0.0.1",
+        workers=2,
+        loop="asyncio",
+        http="h11",
+        graceful_timeout=2,
+        reuse_port=False,
+    )
+    supervisor = multiprocessing.get_context("fork").Process(
+        target=ServerSupervisor(options).run
+    )
+    supervisor.start()
+    try:
+        wait_until(lambda: len(events(log)) == 2)
+        old = {pid for _, pid in events(log)}
+        served_by(port)
+
+        os.kill(supervisor.pid, signal.SIGHUP)  # type: ignore
+        # Every connection is accepted while the processes are replaced
+        served = closed = 0
+        deadline = time.monotonic() + 30
+        while len(events(log)) < 6:
+            assert time.monotonic() < deadline
+            try:
+                served_by(port)
+                served += 1
+            except ConnectionResetError:
+                # A draining process closes the connections it accepted
+                # but did not read a request from yet, which clients retry.
+                # One at most per process, as requests are sequential
+                closed += 1
+        assert served > 0 and closed <= 2
+
+        restart = events(log)[2:]
+        assert [e for e, _ in restart] == ["start", "stop", "start", "stop"]
+        (_, new_first), (_, old_first), (_, new_second), (_, old_second) = restart
+        assert {old_first, old_second} == old
+        assert not {new_first, new_second} & old
+        assert served_by(port) in {new_first, new_second}
+    finally:
+        os.kill(supervisor.pid, signal.SIGTERM)  # type: ignore
+        supervisor.join(30)
+    assert supervisor.exitcode == 0
@@ -0,0 +1,66 @@
+import json
+import os
+
+import pytest
+
+from wintry.ioc.container import igloo
+from wintry.settings import SettingsProvider, WinterSettings, settings_provider
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"server_title": "First"}))
+    monkeypatch.setenv("WINTRY_SETTINGS_FILE", str(path))
+    return path
+
+
+def write(path, **values):
+    stat = path.stat()
+    path.write_text(json.dumps(values))
+    # Make sure the change is visible even on filesystems with coarse mtimes
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_settings_are_parsed_once(config):
+    loads = []
+
+    def factory():
+        loads.append(1)
+        return WinterSettings()
+
+    provider = SettingsProvider(factory)
+    settings = provider.get()
+    assert settings.server_title == "First"
+    assert provider() is settings and provider.reload() is settings
+    assert len(loads) == 1
+
+
+def test_settings_reload_when_files_change(config):
+    provider = SettingsProvider()
+    first = provider.get()
+
+    write(config, server_title="Second")
+    assert provider.changed() == [config]
+    assert provider.get() is first
+    assert provider.reload().server_title == "Second"
+    assert provider.changed() == []
+
+    config.unlink()
+    current = provider.reload()
+    assert current.server_title == "Wintry Server"
+    assert provider.reload(force=True) is not current
+
+
+def test_igloo_resolves_the_process_settings(config):
+    settings_provider.clear()
+    try:
+        settings = igloo[WinterSettings]
+        assert settings is settings_provider.get()
+        assert settings.server_title == "First"
+
+        write(config, server_title="Reloaded")
+        settings_provider.reload()
+        assert igloo[WinterSettings].server_title == "Reloaded"
+    finally:
+        settings_provider.clear()
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from contextvars import ContextVar
+
+import pytest
+from fastapi.testclient import TestClient
+
+from wintry import App
+from wintry.controllers import __controllers__, controller, get
+from wintry.ioc.container import IGlooContainer
+from wintry.settings import WinterSettings
+from wintry.threadpools import (
+    ThreadPool,
+    configure_threadpools,
+    get_threadpool,
+    threadpool_stats,
+)
+
+
+@controller(prefix="/reports", threadpool="reports")
+class ReportsController:
+    @get("")
+    def build(self):
+        return {"thread": threading.current_thread().name}
+
+
+router = __controllers__[-1]
+
+
+class Session(object):
+    disposed_in: str = ""
+
+    def dispose(self):
+        Session.disposed_in = threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_pool_keeps_count_of_queued_and_running_tasks():
+    pool = ThreadPool("test", 1)
+    gate = threading.Event()
+    first = asyncio.ensure_future(pool.run(gate.wait))
+    second = asyncio.ensure_future(pool.run(lambda: 7))
+    await asyncio.sleep(0.05)
+
+    stats = pool.stats()
+    assert stats["active"] == 1 and stats["queued"] == 1
+    assert stats["utilization"] == 1
+
+    gate.set()
+    assert await second == 7
+    await first
+    stats = pool.stats()
+    assert stats["active"] == 0 and stats["queued"] == 0
+    assert stats["completed"] == 2 and stats["wait_seconds"] > 0
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pool_runs_with_the_caller_context():
+    var: ContextVar[str] = ContextVar("var", default="")
+    var.set("request")
+    assert await ThreadPool("test", 1).run(var.get) == "request"
+
+
+def test_configure_replaces_pools_with_another_size():
+    pool = get_threadpool("resized")
+    configure_threadpools({"resized": pool.max_workers + 1})
+    resized = get_threadpool("resized")
+    assert resized is not pool
+    assert resized.max_workers == pool.max_workers + 1
+    assert "resized" in [s["name"] for s in threadpool_stats()]
+
+
+def test_controller_runs_sync_endpoints_in_its_pool():
+    app = App(settings=WinterSettings(threadpools={"default": 4, "reports": 2}))
+    app.include_router(router)
+
+    response = TestClient(app).get("/reports")
+    assert response.json()["thread"].startswith("wintry-reports")
+    assert get_threadpool("reports").max_workers == 2
+
+
+@pytest.mark.asyncio
+async def test_sync_dispose_runs_in_its_own_pool():
+    container = IGlooContainer()
+    container.add_scoped(Session, Session)
+    async with container.scoped():
+        assert isinstance(container[Session], Session)
+    assert Session.disposed_in.startswith("wintry-dispose")
@@ -0,0 +1,115 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pytest
+
+from wintry.dto import dto
+from wintry.generators import code_gen
+from wintry.tracking import (
+    diff,
+    dirty_fields,
+    is_tracked,
+    mark_clean,
+    original_values,
+    track,
+)
+from wintry.utils.type_helpers import ModelError
+
+
+@track
+@dto
+class Address:
+    street: str
+    number: int = 0
+
+
+@track
+@dto
+class Tag:
+    name: str
+
+
+@track
+@dataclass
+class User:
+    id: int
+    name: str
+    address: Optional[Address] = None
+    tags: list[Tag] = field(default_factory=list)
+
+
+code_gen.compile_dto(User, globals(), {"User": User})
+
+
+def make_user() -> User:
+    return User(id=1, name="Jon", address=Address(street="Winterfell", number=1))
+
+
+def test_new_instances_are_clean():
+    user = make_user()
+    assert is_tracked(user) and is_tracked(user.address)
+    assert dirty_fields(user) == set()
+    assert diff(user) == {}
+
+
+def test_assignments_are_tracked():
+    user = make_user()
+    user.name = "Arya"
+    user.id = 1
+    assert dirty_fields(user) == {"name"}
+    assert diff(user) == {"name": "Arya"}
+    assert original_values(user) == {"name": "Jon"}
+
+    # Going back to the original value is not a change
+    user.name = "Jon"
+    assert diff(user) == {}
+
+
+def test_map_only_tracks_modified_fields():
+    user = make_user()
+    user.map({"id": 1, "name": "Jon", "address": {"number": 2}})  # type: ignore
+    assert dirty_fields(user) == {"address"}
+    assert diff(user) == {"address": {"number": 2}}
+    assert diff(user.address) == {"number": 2}
+
+
+def test_replaced_related_models_and_lists():
+    user = make_user()
+    user.tags = [Tag(name="stark")]
+    assert diff(user) == {"tags": [Tag(name="stark")]}
+    mark_clean(user)
+
+    user.tags[0].name = "wolf"
+    assert diff(user) == {"tags": [Tag(name="wolf")]}
+
+    user.address = None
+    assert diff(user)["address"] is None
+
+
+def test_mark_clean_resets_related_models():
+    user = make_user()
+    user.name = "Arya"
+    user.address.number = 3  # type: ignore
+    mark_clean(user)
+    assert diff(user) == {} and diff(user.address) == {}
+
+
+def test_slotted_models_stay_slotted():
+    address = Address(street="Eyrie")
+    assert not hasattr(address, "__dict__")
+    address.street = "Riverrun"
+    assert diff(address) == {"street": "Riverrun"}
+
+
+def test_only_mutable_dataclasses_can_be_tracked():
+    class Plain:
+        pass
+
+    @dataclass(frozen=True)
+    class Frozen:
+        id: int
+
+    with pytest.raises(ModelError):
+        track(Plain)
+    with pytest.raises(ModelError):
+        track(Frozen)
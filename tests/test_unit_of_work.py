@@ -0,0 +1,234 @@
+import asyncio
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pytest
+
+from wintry.dto import dto
+from wintry.ioc.container import igloo
+from wintry.threadpools import get_threadpool
+from wintry.tracking import track
+from wintry.unit_of_work import (
+    InMemoryBackend,
+    SQLiteBackend,
+    TableChanges,
+    THREADPOOL,
+    UnitOfWork,
+    UnitOfWorkError,
+    __backends__,
+    register_backend,
+)
+
+
+@track
+@dataclass
+class Hero:
+    id: int
+    name: str
+    power: int = 0
+
+
+@dataclass
+class Team:
+    __winter_model_collection_name__ = "teams"
+    __winter_backend_identifier_key__ = "sql"
+
+    id: int
+    name: str
+
+
+@track
+@dto
+class Address:
+    street: str
+    city: str
+
+
+@track
+@dto
+class Tag:
+    name: str
+
+
+@track
+@dataclass
+class Member:
+    __winter_model_collection_name__ = "members"
+
+    id: int
+    address: Optional[Address] = None
+    tags: list[Tag] = field(default_factory=list)
+
+
+@pytest.fixture
+def backends():
+    memory, sql = InMemoryBackend(), SQLiteBackend()
+    sql.connection.execute("CREATE TABLE teams (id INTEGER PRIMARY KEY, name TEXT)")
+    register_backend("default", memory)
+    register_backend("sql", sql)
+    yield memory, sql
+    sql.close()
+    __backends__.clear()
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_is_scoped():
+    async with igloo.scoped():
+        uow = igloo[UnitOfWork]
+        assert igloo[UnitOfWork] is uow
+        uow.add(Hero(id=1, name="Jon"))
+
+    # Uncommitted changes were discarded on dispose
+    assert not uow.new
+
+
+@pytest.mark.asyncio
+async def test_commit_groups_writes_per_backend_and_table(backends):
+    memory, sql = backends
+    pool = get_threadpool(THREADPOOL)
+    flushed = pool.completed
+    uow = UnitOfWork()
+    uow.add_all(Hero(id=i, name=f"hero {i}") for i in range(100))
+    uow.add_all(Team(id=i, name=f"team {i}") for i in range(100))
+    await uow.commit()
+
+    assert memory.flushes == 1
+    assert len(memory.tables["hero"]) == 100
+    # One insert for the whole table
+    assert sql.statements == 1
+    assert sql.connection.execute("SELECT count(*) FROM teams").fetchone() == (100,)
+    # The blocking SQLite flush runs in its own pool
+    assert pool.completed == flushed + 1
+
+
+@pytest.mark.asyncio
+async def test_only_changed_fields_of_tracked_models_are_written(backends):
+    memory, _ = backends
+    uow = UnitOfWork()
+    heroes = [Hero(id=i, name=f"hero {i}") for i in range(3)]
+    uow.add_all(heroes)
+    await uow.commit()
+
+    # Committed models stay attached
+    heroes[0].power = 9
+    heroes[1].name = "hero 1"
+    assert uow.has_changes
+    updates = uow._collect()[("default", "hero")].updates
+    assert updates == [((0,), {"power": 9})]
+
+    await uow.commit()
+    assert memory.tables["hero"][(0,)]["power"] == 9
+    assert not uow.has_changes
+
+
+@pytest.mark.asyncio
+async def test_untracked_updates_and_deletes(backends):
+    _, sql = backends
+    uow = UnitOfWork()
+    teams = [Team(id=i, name=f"team {i}") for i in range(5)]
+    uow.add_all(teams)
+    await uow.commit()
+
+    with pytest.raises(UnitOfWorkError):
+        uow.attach(teams[0])
+
+    teams[0].name = "winners"
+    uow.update(teams[0])
+    uow.delete(teams[3])
+    uow.delete(teams[4])
+    sql.statements = 0
+    await uow.commit()
+
+    assert sql.statements == 2
+    assert sql.connection.execute("SELECT id, name FROM teams").fetchall() == [
+        (0, "winners"),
+        (1, "team 1"),
+        (2, "team 2"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_writes_nothing(backends):
+    memory, sql = backends
+    uow = UnitOfWork()
+    uow.add(Team(id=1, name="a"))
+    await uow.commit()
+
+    uow.add(Team(id=2, name="b"))
+    uow.add(Team(id=1, name="again"))
+    with pytest.raises(sqlite3.IntegrityError):
+        await uow.commit()
+    assert sql.connection.execute("SELECT count(*) FROM teams").fetchone() == (1,)
+
+    uow.rollback()
+    jon = Hero(id=1, name="Jon")
+    uow.add(jon)
+    uow.add(jon)
+    uow.add(Hero(id=2, name="Arya"))
+    # Same object added twice is inserted once, but a different one with
+    # the same key fails the whole flush
+    await uow.commit()
+    uow.add(Hero(id=3, name="Sansa"))
+    uow.add(Hero(id=1, name="Jon"))
+    with pytest.raises(UnitOfWorkError):
+        await uow.commit()
+    assert set(memory.tables["hero"]) == {(1,), (2,)}
+
+
+@pytest.mark.asyncio
+async def test_missing_backend(backends):
+    __backends__.clear()
+    uow = UnitOfWork()
+    uow.add(Hero(id=1, name="Jon"))
+    with pytest.raises(UnitOfWorkError):
+        await uow.commit()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_flushes_keep_their_own_transaction(backends):
+    _, sql = backends
+    rows = [{"id": i, "name": f"team {i}"} for i in range(20000)]
+    failing = asyncio.ensure_future(
+        sql.flush([TableChanges("teams", ("id",), inserts=[*rows, rows[0]])])
+    )
+    # Small flushes commit while the failing one is still inserting
+    flushed = 0
+    while not failing.done() or flushed < 50:
+        flushed += 1
+        inserts = [{"id": -flushed, "name": "other"}]
+        await sql.flush([TableChanges("teams", ("id",), inserts=inserts)])
+
+    assert isinstance(failing.exception(), sqlite3.IntegrityError)
+    count = sql.connection.execute("SELECT count(*) FROM teams").fetchone()
+    assert count == (flushed,)
+
+
+@pytest.mark.parametrize("backend", ["default", "sql"])
+@pytest.mark.asyncio
+async def test_related_models_are_written_whole(backends, backend):
+    memory, sql = backends
+    sql.connection.execute(
+        "CREATE TABLE members (id INTEGER PRIMARY KEY, address TEXT, tags TEXT)"
+    )
+    model = type("Member", (Member,), {"__winter_backend_identifier_key__": backend})
+    member = track(model)(
+        id=1, address=Address(street="Main", city="Old"), tags=[Tag(name="a")]
+    )
+    uow = UnitOfWork()
+    uow.add(member)
+    await uow.commit()
+
+    member.address.city = "New"  # type: ignore
+    member.tags[0].name = "b"
+    await uow.commit()
+
+    if backend == "default":
+        row = memory.tables["members"][(1,)]
+        address, tags = row["address"], row["tags"]
+    else:
+        row = sql.connection.execute("SELECT address, tags FROM members").fetchone()
+        address, tags = map(json.loads, row)
+    assert address == {"street": "Main", "city": "New"}
+    assert tags == [{"name": "b"}]
@@ -0,0 +1,120 @@
+import time
+from typing import Any, Optional
+
+import pytest
+
+from wintry.settings import TransporterSettings, WinterSettings
+from wintry.transporters import EventStats, Microservice
+from wintry.workers import Supervisor, WorkerSlot
+
+
+class FakeMicroservice(Microservice):
+    """Consumes nothing, `run()` returns as soon as it is called"""
+
+    async def init(self) -> None:
+        pass
+
+    async def run(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def publish(
+        self, event: str, payload: Any, idempotency_key: Optional[str] = None
+    ) -> None:
+        pass
+
+
+class CrashingMicroservice(FakeMicroservice):
+    async def run(self) -> None:
+        raise RuntimeError("Broker went away")
+
+
+class ReportingMicroservice(FakeMicroservice):
+    async def run(self) -> None:
+        self.stats = {
+            "created": EventStats(processed=3, lag_total=0.3, lag_max=0.2),
+            "deleted": EventStats(processed=1, failed=1),
+        }
+
+
+def supervisor(service: str, workers: int = 1) -> Supervisor:
+    return Supervisor(
+        WinterSettings(auto_discovery_enabled=False),
+        workers=workers,
+        transporters=[TransporterSettings(driver=__name__, service=service)],
+        report_interval=60,
+        backoff=0.05,
+        max_backoff=1,
+    )
+
+
+def wait_for_exit(slot: WorkerSlot):
+    assert slot.process is not None
+    slot.process.join(timeout=10)
+    assert slot.process.exitcode is not None
+
+
+def test_crashed_workers_are_restarted_with_growing_delays():
+    sup = supervisor("CrashingMicroservice")
+    (slot,) = sup.slots
+    sup.start_worker(slot)
+
+    delays = []
+    pids = []
+    for _ in range(3):
+        assert slot.process is not None
+        pids.append(slot.process.pid)
+        wait_for_exit(slot)
+        assert slot.process.exitcode != 0
+
+        now = time.monotonic()
+        sup.check_worker(slot)
+        assert slot.restart_at is not None
+        delays.append(slot.restart_at - now)
+
+        # Not restarted before its delay
+        sup.check_worker(slot)
+        assert slot.process.pid == pids[-1]
+
+        time.sleep(max(0.0, slot.restart_at - time.monotonic()))
+        sup.check_worker(slot)
+        assert slot.restart_at is None
+
+    wait_for_exit(slot)
+    assert len(set(pids)) == 3
+    assert slot.restarts == 3
+    assert delays[0] < delays[1] < delays[2] <= sup.max_backoff
+
+
+def test_clean_exits_are_not_restarted():
+    sup = supervisor("FakeMicroservice")
+    (slot,) = sup.slots
+    sup.start_worker(slot)
+    process = slot.process
+    wait_for_exit(slot)
+    assert slot.process.exitcode == 0  # type: ignore
+
+    sup.check_worker(slot)
+    assert slot.restart_at is None and slot.restarts == 0
+    assert slot.process is process
+    assert not sup.alive()
+
+
+def test_reports_of_all_workers_are_merged():
+    sup = supervisor("ReportingMicroservice", workers=2)
+    for slot in sup.slots:
+        sup.start_worker(slot)
+    for slot in sup.slots:
+        wait_for_exit(slot)
+
+    deadline = time.monotonic() + 10
+    while sup.report.events.get("created", EventStats()).processed < 6:
+        assert time.monotonic() < deadline
+        sup.collect_reports(timeout=0.1)
+
+    created, deleted = sup.report.events["created"], sup.report.events["deleted"]
+    assert (created.processed, created.lag_max) == (6, 0.2)
+    assert created.lag_avg == pytest.approx(0.1)
+    assert (deleted.processed, deleted.failed) == (2, 2)
@@ -1,24 +1,74 @@
-from fastapi import Body as Body
-from fastapi import Depends as Depends
-from fastapi import FastAPI
-from fastapi import Header as Header
-from fastapi import Query as Query
-from fastapi import Path as Path
+# Attributes are imported on first access (PEP 562), so `wintry.ioc`,
+# `wintry.settings` or the microservices can be used without loading
+# FastAPI, Starlette and uvicorn. `wintry import-profile` shows the cost.
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
 
-from fastapi.middleware import Middleware as Middleware
-from starlette.requests import Request as Request
-from starlette.responses import JSONResponse as JSONResponse, Response as Response
+if TYPE_CHECKING:  # pragma: no cover
+    from fastapi import Body as Body
+    from fastapi import Depends as Depends
+    from fastapi import Header as Header
+    from fastapi import Query as Query
+    from fastapi import Path as Path
 
-from .controllers import controller as controller
-from .controllers import get as get
-from .controllers import patch as patch
-from .controllers import put as put
-from .controllers import post as post
-from .controllers import delete as delete
+    from fastapi.middleware import Middleware as Middleware
+    from starlette.requests import Request as Request
+    from starlette.responses import JSONResponse as JSONResponse, Response as Response
 
-from .ioc import inject as inject, provider as provider, scoped as scoped
+    from .controllers import controller as controller
+    from .controllers import get as get
+    from .controllers import patch as patch
+    from .controllers import put as put
+    from .controllers import post as post
+    from .controllers import delete as delete
 
-from .entrypoints import App as App
-from .entrypoints import AppBuilder as AppBuilder
+    from .ioc import inject as inject, provider as provider, scoped as scoped
+
+    from .microservices import microservice as microservice, on as on
+
+    from .entrypoints import App as App
+    from .entrypoints import AppBuilder as AppBuilder
 
 __version__ = "0.1.5"
+
+_lazy_attributes = {
+    "Body": "fastapi",
+    "Depends": "fastapi",
+    "Header": "fastapi",
+    "Query": "fastapi",
+    "Path": "fastapi",
+    "Middleware": "fastapi.middleware",
+    "Request": "starlette.requests",
+    "JSONResponse": "starlette.responses",
+    "Response": "starlette.responses",
+    "controller": "wintry.controllers",
+    "get": "wintry.controllers",
+    "patch": "wintry.controllers",
+    "put": "wintry.controllers",
+    "post": "wintry.controllers",
+    "delete": "wintry.controllers",
+    "inject": "wintry.ioc",
+    "provider": "wintry.ioc",
+    "scoped": "wintry.ioc",
+    "microservice": "wintry.microservices",
+    "on": "wintry.microservices",
+    "App": "wintry.entrypoints",
+    "AppBuilder": "wintry.entrypoints",
+}
+
+__all__ = [*_lazy_attributes, "__version__"]
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module = _lazy_attributes[name]
+    except KeyError:
+        raise AttributeError(f"module 'wintry' has no attribute '{name}'") from None
+    value = getattr(import_module(module), name)
+    # Cached, so later accesses do not come back here
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_lazy_attributes})
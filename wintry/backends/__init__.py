@@ -0,0 +1,144 @@
+import logging
+from abc import ABC, abstractmethod
+from importlib import import_module
+from typing import Any, AsyncContextManager, Callable, Optional
+
+from wintry.ioc.container import IGlooContainer, igloo
+from wintry.settings import BackendOptions, WinterSettings
+from wintry.utils.pool import Pool, PoolStats
+
+logger = logging.getLogger("logger")
+
+
+class BackendError(Exception):
+    pass
+
+
+class Driver(ABC):
+    """Opens connections to a backend. Driver modules expose it through a
+    top level `factory(settings: BackendOptions) -> Driver`."""
+
+    def __init__(self, settings: BackendOptions) -> None:
+        self.settings = settings
+
+    @abstractmethod
+    async def connect(self) -> Any:
+        ...
+
+    async def disconnect(self, connection: Any) -> None:
+        await connection.close()
+
+    async def ping(self, connection: Any) -> bool:
+        """Whether a pooled connection is still usable"""
+        return True
+
+
+class Backend(object):
+    """A configured driver and its connection pool"""
+
+    def __init__(self, settings: BackendOptions, driver: Driver) -> None:
+        options = settings.connection_options
+        self.name = settings.name
+        self.settings = settings
+        self.driver = driver
+        self.pool: Pool[Any] = Pool(
+            driver.connect,
+            min_size=options.pool_min_size,
+            max_size=options.pool_max_size,
+            dispose=driver.disconnect,
+            idle_timeout=options.pool_idle_timeout,
+            health_check=driver.ping,
+            health_check_after=options.pool_health_check_after,
+            acquire_timeout=options.pool_acquire_timeout,
+        )
+
+    def connection(self) -> AsyncContextManager[Any]:
+        """
+        >>> async with backend.connection() as connection:
+        >>>     ...
+        """
+        return self.pool.acquire()
+
+    def stats(self) -> PoolStats:
+        return self.pool.stats()
+
+    async def open(self):
+        await self.pool.open()
+
+    async def close(self):
+        await self.pool.close()
+
+
+class BackendRegistry(object):
+    """Backends configured in `WinterSettings.backends`, by name.
+
+    Each driver module is imported, and its `factory` looked up, only once
+    even when several backends use it.
+    """
+
+    def __init__(self) -> None:
+        self.backends: dict[str, Backend] = {}
+        self._factories: dict[str, Callable[[BackendOptions], Driver]] = {}
+
+    @classmethod
+    def from_settings(cls, settings: WinterSettings) -> "BackendRegistry":
+        registry = cls()
+        for options in settings.backends:
+            registry.add(options)
+        return registry
+
+    def _factory(self, driver: str) -> Callable[[BackendOptions], Driver]:
+        if (factory := self._factories.get(driver)) is None:
+            module = import_module(driver)
+            factory = getattr(module, "factory", None)
+            if factory is None:
+                raise BackendError(f"Driver module {driver} has no factory(settings)")
+            self._factories[driver] = factory
+        return factory
+
+    def add(self, settings: BackendOptions) -> Backend:
+        if settings.name in self.backends:
+            raise BackendError(f"There is already a backend named {settings.name}")
+        backend = Backend(settings, self._factory(settings.driver)(settings))
+        self.backends[settings.name] = backend
+        return backend
+
+    def __getitem__(self, name: str) -> Backend:
+        try:
+            return self.backends[name]
+        except KeyError:
+            raise BackendError(f"There is no backend named {name}") from None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.backends
+
+    @property
+    def default(self) -> Backend:
+        return self["default"]
+
+    async def open(self):
+        for backend in self.backends.values():
+            await backend.open()
+            logger.info(f"Backend {backend.name} ready ({backend.settings.driver})")
+
+    async def close(self):
+        for backend in self.backends.values():
+            await backend.close()
+
+    def stats(self) -> dict[str, PoolStats]:
+        """Pool usage of every backend, e.g. to serve from a metrics endpoint"""
+        return {name: backend.stats() for name, backend in self.backends.items()}
+
+
+def init_backends(
+    settings: WinterSettings, container: IGlooContainer = igloo
+) -> BackendRegistry:
+    """Build the backends of `settings` and register them in the container,
+    the registry as a `BackendRegistry` singleton and the `default` one, if
+    configured, as a `Backend` singleton. Pools still need `open()`."""
+    registry = BackendRegistry.from_settings(settings)
+    container[BackendRegistry] = lambda: registry
+    default: Optional[Backend] = registry.backends.get("default")
+    if default is not None:
+        container[Backend] = lambda: default
+    return registry
@@ -0,0 +1,36 @@
+from typing import Any
+
+from wintry.backends import Driver
+from wintry.settings import BackendOptions
+
+
+class InMemoryConnection(object):
+    """Connection to a dict shared by every connection of the driver"""
+
+    def __init__(self, data: dict[str, Any]) -> None:
+        self.data = data
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class InMemoryDriver(Driver):
+    """Driver without an actual server, handy to test pooling and code
+    that only needs somewhere to keep data"""
+
+    def __init__(self, settings: BackendOptions) -> None:
+        super().__init__(settings)
+        self.data: dict[str, Any] = {}
+        self.connections = 0
+
+    async def connect(self) -> InMemoryConnection:
+        self.connections += 1
+        return InMemoryConnection(self.data)
+
+    async def ping(self, connection: InMemoryConnection) -> bool:
+        return not connection.closed
+
+
+def factory(settings: BackendOptions) -> InMemoryDriver:
+    return InMemoryDriver(settings)
@@ -0,0 +1,38 @@
+from typing import Any
+
+from wintry.backends import BackendError, Driver
+from wintry.settings import BackendOptions
+
+
+def _import_driver():
+    try:
+        import aiosqlite
+    except ImportError as e:  # pragma: no cover
+        raise BackendError(
+            "SQLite backend requires `aiosqlite`. "
+            "Install it with `pip install wintry[sqlite]`"
+        ) from e
+    return aiosqlite
+
+
+class SQLiteDriver(Driver):
+    """`aiosqlite` connections to the database file at `connection_options.url`
+    (or `database_name`, when no url is given)"""
+
+    def __init__(self, settings: BackendOptions) -> None:
+        super().__init__(settings)
+        self.driver = _import_driver()
+        options = settings.connection_options
+        self.database = options.url or options.database_name
+
+    async def connect(self) -> Any:
+        extras = self.settings.connection_options.extras or {}
+        return await self.driver.connect(self.database, **extras)
+
+    async def ping(self, connection: Any) -> bool:
+        await connection.execute("SELECT 1")
+        return True
+
+
+def factory(settings: BackendOptions) -> SQLiteDriver:
+    return SQLiteDriver(settings)
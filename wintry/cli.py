@@ -0,0 +1,201 @@
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+from wintry.settings import get_settings
+
+app = typer.Typer(help="Wintry command line tools")
+
+
+@app.callback()
+def main():
+    """Wintry command line tools"""
+
+
+@app.command()
+def workers(
+    count: int = typer.Option(
+        os.cpu_count() or 1, "--workers", "-w", help="Consumer processes per transporter"
+    ),
+    transporter: Optional[List[str]] = typer.Option(
+        None,
+        "--transporter",
+        "-t",
+        help="Only run transporters with this service name. Can be repeated",
+    ),
+    report_interval: float = typer.Option(
+        10.0, help="Seconds between throughput and lag reports"
+    ),
+    drain_timeout: float = typer.Option(
+        30.0, help="Seconds workers have to finish in-flight messages on shutdown"
+    ),
+):
+    """Run the configured microservice consumers in multiple processes"""
+    from wintry.workers import Supervisor
+
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    settings = get_settings()
+    transporters = [
+        t for t in settings.transporters if not transporter or t.service in transporter
+    ]
+    if not transporters:
+        typer.echo("No transporters configured, nothing to run", err=True)
+        raise typer.Exit(1)
+
+    Supervisor(
+        settings,
+        workers=count,
+        transporters=transporters,
+        report_interval=report_interval,
+        drain_timeout=drain_timeout,
+    ).run()
+
+
+@app.command("build-manifest")
+def build_manifest(
+    output: Optional[Path] = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="Where to write the manifest. Defaults to the configured "
+        "manifest_path or wintry.manifest.json",
+    ),
+):
+    """Run autodiscovery and record the imported modules, so workers can boot
+    from the manifest without scanning the project"""
+    from wintry.utils.manifest import build_manifest as _build_manifest
+
+    # Console scripts do not have the project in their path
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    settings = get_settings()
+    path = output or Path(settings.manifest_path or "wintry.manifest.json")
+    manifest = _build_manifest(settings)
+    manifest.dump(path)
+    typer.echo(f"Recorded {len(manifest.modules)} modules in {path}")
+
+
+@app.command("build-openapi")
+def build_openapi(
+    output: Optional[Path] = typer.Option(
+        None,
+        "--output",
+        "-o",
+        help="Where to write the schema. Defaults to the configured "
+        "openapi_path or openapi.json",
+    ),
+):
+    """Import the configured app_path and write its OpenAPI schema, so the
+    app serves it from openapi_path instead of generating it"""
+    from uvicorn.importer import import_from_string
+
+    from wintry.openapi import build_schema
+
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    settings = get_settings()
+    path = output or Path(settings.openapi_path or "openapi.json")
+    body = build_schema(import_from_string(settings.app_path))
+    path.write_bytes(body)
+    typer.echo(f"Wrote the OpenAPI schema of {settings.app_path} to {path}")
+
+
+@app.command("import-profile")
+def import_profile(
+    modules: Optional[List[str]] = typer.Argument(
+        None, help="Modules to import, wintry by default"
+    ),
+    top: int = typer.Option(15, help="Modules listed by their own import time"),
+):
+    """Import modules in a fresh interpreter, like `python -X importtime`, and
+    report what their cold start spends time on"""
+    from wintry.utils.importtime import profile_import
+
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    # Imported by the interpreter itself, whatever the module
+    startup = {entry.module for entry in profile_import("sys")}
+    for module in modules or ["wintry"]:
+        entries = [e for e in profile_import(module) if e.module not in startup]
+        roots = sorted(
+            (e for e in entries if e.depth <= 1),
+            key=lambda e: e.cumulative_us,
+            reverse=True,
+        )
+        total = sum(e.cumulative_us for e in entries if e.depth == 0)
+        typer.echo(f"{module}: {total / 1000:.1f} ms, {len(entries)} modules")
+        typer.echo(f"{'cumulative ms':>14}  top level imports")
+        for entry in roots[:top]:
+            typer.echo(f"{entry.cumulative_us / 1000:>14.1f}  {entry.module}")
+        typer.echo(f"{'self ms':>14}  slowest modules")
+        for entry in sorted(entries, key=lambda e: e.self_us, reverse=True)[:top]:
+            typer.echo(f"{entry.self_us / 1000:>14.1f}  {entry.module}")
+        typer.echo("")
+
+
+@app.command()
+def serve(
+    host: Optional[str] = typer.Option(None, help="Defaults to the configured host"),
+    port: Optional[int] = typer.Option(None, help="Defaults to the configured port"),
+    workers: Optional[int] = typer.Option(
+        None, "--workers", "-w", help="Server processes, 0 starts one per available CPU"
+    ),
+    loop: Optional[str] = typer.Option(None, help="auto, uvloop or asyncio"),
+    http: Optional[str] = typer.Option(None, help="auto, httptools or h11"),
+    backlog: Optional[int] = typer.Option(None, help="Listen backlog of each socket"),
+    keep_alive: Optional[int] = typer.Option(
+        None, help="Seconds an idle connection is kept open"
+    ),
+    graceful_timeout: Optional[float] = typer.Option(
+        None, help="Seconds to finish in-flight requests on shutdown"
+    ),
+    reuse_port: Optional[bool] = typer.Option(
+        None, help="One SO_REUSEPORT socket per process instead of a shared one"
+    ),
+    reload: bool = typer.Option(
+        False, help="Restart on code changes, for development. Runs a single process"
+    ),
+):
+    """Serve the configured app_path. Send SIGHUP to restart the processes
+    one at a time without dropping connections"""
+    from wintry.server import serve as _serve
+
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    settings = get_settings()
+    if reload:
+        import uvicorn
+
+        uvicorn.run(
+            settings.app_path,
+            host=host or settings.host,
+            port=port or settings.port,
+            reload=True,
+        )
+        return
+
+    _serve(
+        settings,
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=backlog,
+        keep_alive=keep_alive,
+        graceful_timeout=graceful_timeout,
+        reuse_port=reuse_port,
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,309 @@
+import json
+import math
+from array import array
+from dataclasses import fields
+from datetime import date, datetime
+from enum import Enum
+from json.encoder import encode_basestring  # type: ignore
+from operator import attrgetter, itemgetter
+from types import NoneType
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Union,
+    get_args,
+    get_type_hints,
+)
+from uuid import UUID
+
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+
+from wintry.generators import builtin_types
+from wintry.utils.type_helpers import ModelError
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+# Kind of a column, which decides how it is stored and encoded.
+# `nullable` columns hold any builtin type or None, in a list.
+_INT, _FLOAT, _BOOL, _DATETIME, _DATE, _STR, _UUID, _ENUM, _NULLABLE = range(9)
+
+# Kinds whose encoded values are always wrapped in quotes, which are put
+# in the row template instead of around every value
+_QUOTED = {_DATETIME, _DATE, _UUID}
+
+
+def _column_kind(field_type: Any) -> int:
+    args = get_args(field_type)
+    if args:
+        if NoneType in args and len(args) == 2:
+            inner = args[0] if args[1] is NoneType else args[1]
+            if inner in builtin_types or (
+                isinstance(inner, type) and issubclass(inner, tuple(builtin_types))
+            ):
+                return _NULLABLE
+        raise ModelError(f"Columnar results only hold builtin types, got {field_type}")
+
+    # Order matters, bool is an int and datetime is a date
+    for type_, kind in (
+        (bool, _BOOL),
+        (int, _INT),
+        (float, _FLOAT),
+        (datetime, _DATETIME),
+        (date, _DATE),
+        (Enum, _ENUM),
+        (str, _STR),
+        (UUID, _UUID),
+    ):
+        if isinstance(field_type, type) and issubclass(field_type, type_):
+            return kind
+    raise ModelError(f"Columnar results only hold builtin types, got {field_type}")
+
+
+def _to_column(kind: int, values: list[Any]) -> Any:
+    """Pack a list of values in a compact array, when its kind has one"""
+    if kind in (_INT, _FLOAT, _BOOL):
+        if np is not None:
+            dtype = {_INT: np.int64, _FLOAT: np.float64, _BOOL: np.bool_}[kind]
+            try:
+                return np.array(values, dtype=dtype)
+            except OverflowError:
+                # Ints that do not fit in 64 bits
+                return values
+        typecode = {_INT: "q", _FLOAT: "d", _BOOL: "b"}[kind]
+        try:
+            return array(typecode, values)
+        except OverflowError:
+            return values
+    if np is not None and kind in (_DATETIME, _DATE):
+        # Timezone aware datetimes cannot go in a datetime64
+        if kind == _DATETIME and any(v.tzinfo is not None for v in values):
+            return values
+        try:
+            dtype = "datetime64[us]" if kind == _DATETIME else "datetime64[D]"
+            return np.array(values, dtype=dtype)
+        except (TypeError, ValueError):
+            return values
+    return values
+
+
+def _encode_value(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return repr(value) if math.isfinite(value) else "null"
+    if isinstance(value, Enum):
+        return json.dumps(value.value, ensure_ascii=False)
+    if isinstance(value, (date, datetime)):
+        return f'"{value.isoformat()}"'
+    if isinstance(value, UUID):
+        return f'"{value}"'
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _encode_column(kind: int, column: Any) -> Iterable[str]:
+    """JSON encode a slice of a column. Quoted kinds are returned without
+    their quotes."""
+    if np is not None and isinstance(column, np.ndarray):
+        # int and float reprs are cheaper than numpy string conversions,
+        # which only pay off for booleans and datetimes
+        if kind == _INT:
+            return map(int.__repr__, column.tolist())
+        if kind == _FLOAT:
+            if np.isfinite(column).all():
+                return map(float.__repr__, column.tolist())
+            return map(_encode_value, column.tolist())
+        if kind == _BOOL:
+            return np.where(column, "true", "false").tolist()
+        if kind == _DATE:
+            return np.datetime_as_string(column, unit="D").tolist()
+        if kind == _DATETIME:
+            # Match datetime.isoformat(), which omits zero microseconds
+            seconds = column.astype("datetime64[s]")
+            whole = column == seconds
+            if whole.all():
+                return np.datetime_as_string(seconds, unit="s").tolist()
+            if not whole.any():
+                return np.datetime_as_string(column, unit="us").tolist()
+            return np.where(
+                whole,
+                np.datetime_as_string(seconds, unit="s"),
+                np.datetime_as_string(column, unit="us"),
+            ).tolist()
+
+    if kind == _INT and isinstance(column, array):
+        return map(int.__repr__, column)
+    if kind == _BOOL:
+        return ["true" if v else "false" for v in column]
+    if kind == _STR:
+        return map(encode_basestring, column)
+    if kind in (_DATETIME, _DATE):
+        return [v.isoformat() for v in column]
+    if kind == _UUID:
+        return map(str, column)
+    return map(_encode_value, column)
+
+
+class ColumnarResult(object):
+    """A homogeneous result set stored column by column.
+
+    Each field of `model` (a dataclass of builtin typed fields) is held in
+    a single NumPy array (or `array.array` when NumPy is not installed),
+    instead of one Python object per row and field. Strings, UUIDs, enums and
+    optional fields are kept in plain lists.
+
+    Returning it from an endpoint streams it as a JSON array, or as NDJSON
+    when the request accepts `application/x-ndjson`, encoding `chunk_size`
+    rows at a time. The response model of the route is not applied to it.
+
+    >>> @get("/points")
+    >>> async def points(self):
+    >>>     rows = await self.repository.find()
+    >>>     return ColumnarResult.from_orm(Point, rows)
+    """
+
+    __slots__ = ("model", "kinds", "columns", "length", "chunk_size")
+
+    def __init__(
+        self,
+        model: type,
+        columns: dict[str, Any],
+        kinds: dict[str, int],
+        length: int,
+        chunk_size: int = 1000,
+    ) -> None:
+        self.model = model
+        self.columns = columns
+        self.kinds = kinds
+        self.length = length
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def _build(
+        cls,
+        model: type,
+        rows: Iterable[Any],
+        getter: Callable[[str], Callable[[Any], Any]],
+        chunk_size: int,
+    ) -> "ColumnarResult":
+        if not isinstance(rows, (list, tuple)):
+            rows = list(rows)
+        hints = get_type_hints(model)
+        kinds = {f.name: _column_kind(hints[f.name]) for f in fields(model)}
+        # Column by column, so only one field of the rows is ever
+        # materialized as Python objects
+        columns = {}
+        for name, kind in kinds.items():
+            values = list(map(getter(name), rows))
+            if kind != _NULLABLE and None in values:
+                kinds[name] = kind = _NULLABLE
+            columns[name] = _to_column(kind, values)
+        return cls(model, columns, kinds, len(rows), chunk_size)
+
+    @classmethod
+    def from_orm(
+        cls, model: type, rows: Iterable[Any], chunk_size: int = 1000
+    ) -> "ColumnarResult":
+        """Build the columns from objects with an attribute per `model` field"""
+        return cls._build(model, rows, attrgetter, chunk_size)
+
+    @classmethod
+    def from_dicts(
+        cls, model: type, rows: Iterable[dict[str, Any]], chunk_size: int = 1000
+    ) -> "ColumnarResult":
+        """Build the columns from mappings with a key per `model` field"""
+        return cls._build(model, rows, itemgetter, chunk_size)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, name: str) -> Any:
+        return self.columns[name]
+
+    def __iter__(self) -> Iterator[Any]:
+        """Materialize the rows as `model` instances, one at a time"""
+        names = list(self.columns)
+        for values in zip(*(self._python_column(name) for name in names)):
+            yield self.model(**dict(zip(names, values)))
+
+    def _python_column(self, name: str) -> Iterable[Any]:
+        column = self.columns[name]
+        if np is not None and isinstance(column, np.ndarray):
+            if self.kinds[name] == _DATETIME:
+                return column.astype(datetime).tolist()
+            if self.kinds[name] == _DATE:
+                return column.astype(date).tolist()
+            return column.tolist()
+        if isinstance(column, array) and self.kinds[name] == _BOOL:
+            return map(bool, column)
+        return column
+
+    def _template(self) -> str:
+        parts = []
+        for name, kind in self.kinds.items():
+            value = '"%s"' if kind in _QUOTED else "%s"
+            parts.append(f"{encode_basestring(name)}:{value}")
+        return "{" + ",".join(parts) + "}"
+
+    def _encoded_chunks(self) -> Iterator[list[str]]:
+        template = self._template()
+        for start in range(0, self.length, self.chunk_size):
+            end = start + self.chunk_size
+            encoded = [
+                _encode_column(kind, self.columns[name][start:end])
+                for name, kind in self.kinds.items()
+            ]
+            yield [template % row for row in zip(*encoded)]
+
+    def iter_json(self) -> Iterator[bytes]:
+        """Encode as a JSON array, `chunk_size` rows per yielded chunk"""
+        yield b"["
+        separator = ""
+        for rows in self._encoded_chunks():
+            yield (separator + ",".join(rows)).encode()
+            separator = ","
+        yield b"]"
+
+    def iter_ndjson(self) -> Iterator[bytes]:
+        """Encode as newline delimited JSON, `chunk_size` rows per yielded chunk"""
+        for rows in self._encoded_chunks():
+            rows.append("")
+            yield "\n".join(rows).encode()
+
+    def json(self) -> bytes:
+        return b"".join(self.iter_json())
+
+
+class ColumnarResponse(StreamingResponse):
+    """Streams a `ColumnarResult` as JSON, or NDJSON when `ndjson=True`"""
+
+    def __init__(
+        self,
+        content: ColumnarResult,
+        status_code: int = 200,
+        headers: Optional[dict[str, str]] = None,
+        ndjson: bool = False,
+        background: Optional[BackgroundTask] = None,
+    ) -> None:
+        super().__init__(
+            content.iter_ndjson() if ndjson else content.iter_json(),
+            status_code=status_code,
+            headers=headers,
+            media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json",
+            background=background,
+        )
+
+
+def wants_ndjson(accept: Union[str, None]) -> bool:
+    return accept is not None and NDJSON_MEDIA_TYPE in accept
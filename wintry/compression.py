@@ -0,0 +1,333 @@
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from wintry.settings import Compression
+from wintry.threadpools import get_threadpool
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None  # type: ignore
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+CACHEABLE = "wintry.cacheable"
+"""Scope key set by `cacheable` routes"""
+
+THREADPOOL = "compression"
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson")
+COMPRESSIBLE_SUFFIXES = ("+json", "+xml", "/xml", "/javascript")
+
+
+class Encoder(object):
+    """Compresses whole bodies with `compress`, and streamed ones with the
+    object returned by `stream`, through its `compress(chunk)` and `finish()`"""
+
+    name: str
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError()
+
+    def stream(self) -> Any:
+        raise NotImplementedError()
+
+
+class _GzipStream(object):
+    def __init__(self, level: int) -> None:
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        # Flushed on every chunk, so streamed rows reach clients as they come
+        compressed = self.compressor.compress(chunk)
+        return compressed + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+class GzipEncoder(Encoder):
+    name = "gzip"
+
+    def __init__(self, options: Compression) -> None:
+        self.level = options.gzip_level
+
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, self.level, mtime=0)
+
+    def stream(self) -> _GzipStream:
+        return _GzipStream(self.level)
+
+
+class _BrotliStream(object):
+    def __init__(self, quality: int) -> None:
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self.compressor.process(chunk) + self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+class BrotliEncoder(Encoder):
+    name = "br"
+
+    def __init__(self, options: Compression) -> None:
+        self.quality = options.brotli_quality
+
+    def compress(self, data: bytes) -> bytes:
+        return brotli.compress(data, quality=self.quality)
+
+    def stream(self) -> _BrotliStream:
+        return _BrotliStream(self.quality)
+
+
+class _ZstdStream(object):
+    def __init__(self, level: int) -> None:
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self.compressor.compress(chunk) + self.compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+class ZstdEncoder(Encoder):
+    name = "zstd"
+
+    def __init__(self, options: Compression) -> None:
+        self.level = options.zstd_level
+
+    def compress(self, data: bytes) -> bytes:
+        # Compressors are not safe to share between threads
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def stream(self) -> _ZstdStream:
+        return _ZstdStream(self.level)
+
+
+def available_encoders(options: Compression) -> list[Encoder]:
+    """Encoders of `options.encodings` whose library is installed, in order"""
+    encoders: dict[str, Callable[[Compression], Encoder]] = {"gzip": GzipEncoder}
+    if brotli is not None:
+        encoders["br"] = BrotliEncoder
+    if zstandard is not None:
+        encoders["zstd"] = ZstdEncoder
+    return [encoders[name](options) for name in options.encodings if name in encoders]
+
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    """Weight of each coding in an `Accept-Encoding` header"""
+    accepted: dict[str, float] = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    return media_type.startswith(COMPRESSIBLE_TYPES) or media_type.endswith(
+        COMPRESSIBLE_SUFFIXES
+    )
+
+
+class CompressedCache(object):
+    """Compressed bodies by encoding and digest of the original body, least
+    recently used first out once they take more than `max_size` bytes"""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self.entries: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(encoding: str, body: bytes) -> tuple[str, bytes]:
+        return encoding, hashlib.blake2b(body, digest_size=16).digest()
+
+    def get(self, key: tuple[str, bytes]) -> Optional[bytes]:
+        compressed = self.entries.get(key)
+        if compressed is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return compressed
+
+    def put(self, key: tuple[str, bytes], compressed: bytes):
+        if len(compressed) > self.max_size or key in self.entries:
+            return
+        self.entries[key] = compressed
+        self.size += len(compressed)
+        while self.size > self.max_size:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class CompressionMiddleware(object):
+    """Compresses responses with the best encoding both the client and the
+    server support. Bodies under `minimum_size`, already encoded ones and
+    media types that do not compress well are sent as they are.
+
+    Large bodies are compressed in the `compression` thread pool, so the event
+    loop keeps serving other requests meanwhile. Bodies of `cacheable` routes
+    are compressed once and then served from a cache, keyed by their digest.
+    """
+
+    def __init__(self, app: ASGIApp, options: Optional[Compression] = None) -> None:
+        self.app = app
+        self.options = options = options or Compression()
+        self.encoders = available_encoders(options)
+        self.cache = CompressedCache(options.cache_size)
+
+    def select(self, accept_encoding: str) -> Optional[Encoder]:
+        accepted = accepted_encodings(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best: Optional[Encoder] = None
+        best_quality = 0.0
+        # Server preference breaks ties between equally weighted encodings
+        for encoder in self.encoders:
+            quality = accepted.get(encoder.name, wildcard)
+            if quality > best_quality:
+                best, best_quality = encoder, quality
+        return best
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoder = self.select(Headers(scope=scope).get("accept-encoding", ""))
+        if encoder is None:
+            return await self.app(scope, receive, send)
+
+        responder = _CompressedResponder(self, encoder, scope, send)
+        await self.app(scope, receive, responder.send)
+
+    async def compress(self, encoder: Encoder, body: bytes, cacheable: bool) -> bytes:
+        key = None
+        if cacheable:
+            key = self.cache.key(encoder.name, body)
+            if (compressed := self.cache.get(key)) is not None:
+                return compressed
+
+        if len(body) >= self.options.thread_threshold:
+            compressed = await get_threadpool(THREADPOOL).run(encoder.compress, body)
+        else:
+            compressed = encoder.compress(body)
+
+        if key is not None:
+            self.cache.put(key, compressed)
+        return compressed
+
+
+class _CompressedResponder(object):
+    __slots__ = ("middleware", "encoder", "scope", "downstream", "start", "stream")
+
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        encoder: Encoder,
+        scope: Scope,
+        send: Send,
+    ) -> None:
+        self.middleware = middleware
+        self.encoder = encoder
+        self.scope = scope
+        self.downstream = send
+        self.start: Optional[Message] = None
+        self.stream: Any = None
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Held until the first body chunk tells how big the body is
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            return await self.downstream(message)
+
+        if self.start is None:
+            # Not compressing, or already streaming
+            if self.stream is None:
+                return await self.downstream(message)
+            return await self._send_chunk(message)
+
+        start, self.start = self.start, None
+        headers = MutableHeaders(raw=list(start.get("headers", ())))
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if (
+            "content-encoding" in headers
+            or not is_compressible(headers.get("content-type", ""))
+            or (not more_body and len(body) < self.middleware.options.minimum_size)
+        ):
+            await self.downstream(start)
+            return await self.downstream(message)
+
+        headers["content-encoding"] = self.encoder.name
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag is not None and not etag.startswith("W/"):
+            # Same content, but not the same bytes as the uncompressed one
+            headers["etag"] = f"W/{etag}"
+        if more_body:
+            del headers["content-length"]
+            self.stream = self.encoder.stream()
+            await self.downstream({**start, "headers": headers.raw})
+            return await self._send_chunk(message)
+
+        compressed = await self.middleware.compress(
+            self.encoder, body, bool(self.scope.get(CACHEABLE))
+        )
+        headers["content-length"] = str(len(compressed))
+        await self.downstream({**start, "headers": headers.raw})
+        await self.downstream({"type": "http.response.body", "body": compressed})
+
+    async def _send_chunk(self, message: Message):
+        chunk = self.stream.compress(message.get("body", b""))
+        if message.get("more_body", False):
+            if chunk:
+                await self.downstream(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+            return
+        await self.downstream(
+            {"type": "http.response.body", "body": chunk + self.stream.finish()}
+        )
+
+
+def cacheable_handler(
+    handler: Callable[[Request], Coroutine[Any, Any, Response]]
+) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+    """Marks the requests of a `cacheable` route for `CompressionMiddleware`"""
+
+    async def app(request: Request) -> Response:
+        request.scope[CACHEABLE] = True
+        return await handler(request)
+
+    return app
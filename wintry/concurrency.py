@@ -0,0 +1,248 @@
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Coroutine, Union
+
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from wintry.settings import ConcurrencyLimit
+
+
+class Overloaded(Exception):
+    pass
+
+
+class FixedLimit(object):
+    def __init__(self, options: ConcurrencyLimit) -> None:
+        self.options = options
+
+    def update(self, limit: float, rtt: float, inflight: int, failed: bool) -> float:
+        return limit
+
+
+class AIMDLimit(object):
+    """Additive increase, multiplicative decrease"""
+
+    def __init__(self, options: ConcurrencyLimit) -> None:
+        self.options = options
+
+    def update(self, limit: float, rtt: float, inflight: int, failed: bool) -> float:
+        if failed or rtt > self.options.latency_threshold:
+            return limit * self.options.backoff_ratio
+        if inflight >= limit:
+            # About 1 more for each `limit` requests, i.e. per round
+            return limit + 1 / limit
+        return limit
+
+
+class GradientLimit(object):
+    """Grows the limit while recent latency stays close to the long term one,
+    and shrinks it in proportion when requests start taking longer, which
+    happens as soon as they queue somewhere downstream"""
+
+    def __init__(self, options: ConcurrencyLimit) -> None:
+        self.options = options
+        self.short_rtt = 0.0
+        self.long_rtt = 0.0
+
+    def update(self, limit: float, rtt: float, inflight: int, failed: bool) -> float:
+        if self.long_rtt == 0.0:
+            self.short_rtt = self.long_rtt = rtt
+            return limit
+        self.short_rtt += (rtt - self.short_rtt) * 0.5
+        self.long_rtt += (rtt - self.long_rtt) * 0.01
+        if self.long_rtt > 2 * self.short_rtt:
+            # Latency went down for good, forget the slow past faster
+            self.long_rtt *= 0.95
+
+        # Without using half of the limit, latency says nothing about it
+        if inflight < limit / 2 and not failed:
+            return limit
+
+        ratio = self.options.tolerance * self.long_rtt / self.short_rtt
+        gradient = max(0.5, min(1.0, ratio))
+        if failed:
+            gradient = 0.5
+        estimate = limit * gradient + math.sqrt(limit)
+        return limit + (estimate - limit) * self.options.smoothing
+
+
+_algorithms = {"fixed": FixedLimit, "aimd": AIMDLimit, "gradient": GradientLimit}
+
+
+class Limiter(object):
+    """Bounds concurrent work to an adaptive limit.
+
+    >>> await limiter.acquire()
+    >>> start = time.perf_counter()
+    >>> try:
+    >>>     ...
+    >>> finally:
+    >>>     limiter.release(time.perf_counter() - start)
+
+    Over the limit, `acquire` waits in a FIFO queue and raises `Overloaded`
+    when the queue is full or after `queue_timeout` seconds.
+    """
+
+    def __init__(self, options: ConcurrencyLimit) -> None:
+        try:
+            self.algorithm = _algorithms[options.algorithm](options)
+        except KeyError:
+            raise ValueError(
+                f"Unknown concurrency algorithm {options.algorithm}, "
+                f"use one of {', '.join(_algorithms)}"
+            ) from None
+        self.options = options
+        self.limit = float(options.initial_limit)
+        self.inflight = 0
+        self.waiters: deque[asyncio.Future[None]] = deque()
+        self.accepted = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        if self.inflight < self.limit and not self.waiters:
+            self.inflight += 1
+            self.accepted += 1
+            return
+
+        if len(self.waiters) >= self.options.max_queue:
+            self.rejected += 1
+            raise Overloaded()
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            # Not wait_for, which would swallow a cancellation arriving right
+            # after the slot is handed over
+            async with asyncio.timeout(self.options.queue_timeout):
+                await waiter
+        except TimeoutError:
+            # The slot may have been handed over right as the wait expired
+            if not waiter.done() or waiter.cancelled():
+                self.rejected += 1
+                raise Overloaded() from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._free_slot()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+            try:
+                self.waiters.remove(waiter)
+            except ValueError:
+                pass
+        self.accepted += 1
+
+    def release(self, rtt: float, failed: bool = False):
+        options = self.options
+        limit = self.algorithm.update(self.limit, rtt, self.inflight, failed)
+        self.limit = max(options.min_limit, min(options.max_limit, limit))
+        self._free_slot()
+
+    def _free_slot(self):
+        # Hand the slot over to the oldest waiter, if the limit still allows it
+        while self.waiters and self.inflight - 1 < self.limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.inflight -= 1
+
+    def stats(self) -> dict[str, Union[int, float]]:
+        return {
+            "limit": self.limit,
+            "inflight": self.inflight,
+            "queued": len(self.waiters),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+        }
+
+
+_rejection_body = json.dumps({"detail": "Service overloaded, retry later"}).encode()
+
+
+class ConcurrencyLimitMiddleware(object):
+    """Serves requests through a `Limiter`, answering with a 503 and a
+    `Retry-After` header the ones it rejects. Server errors count as failed
+    requests for the limit."""
+
+    def __init__(self, app: ASGIApp, limit: Union[ConcurrencyLimit, Limiter]) -> None:
+        self.app = app
+        self.limiter = limit if isinstance(limit, Limiter) else Limiter(limit)
+        body = _rejection_body
+        self.rejection_start = {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.limiter.options.retry_after).encode()),
+            ],
+        }
+        self.rejection_body = body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        limiter = self.limiter
+        try:
+            await limiter.acquire()
+        except Overloaded:
+            headers = list(self.rejection_start["headers"])
+            await send({**self.rejection_start, "headers": headers})
+            await send({"type": "http.response.body", "body": self.rejection_body})
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            limiter.release(time.perf_counter() - start, failed=status >= 500)
+
+
+RequestHandler = Callable[[Request], Coroutine[Any, Any, Response]]
+
+
+def limit_handler(handler: RequestHandler, limiter: Limiter) -> RequestHandler:
+    """Like `ConcurrencyLimitMiddleware`, for a single route handler"""
+    retry_after = {"Retry-After": str(limiter.options.retry_after)}
+
+    async def app(request: Request) -> Response:
+        try:
+            await limiter.acquire()
+        except Overloaded:
+            return Response(
+                _rejection_body,
+                status_code=503,
+                headers=retry_after,
+                media_type="application/json",
+            )
+
+        failed = True
+        start = time.perf_counter()
+        try:
+            response = await handler(request)
+            failed = response.status_code >= 500
+            return response
+        except HTTPException as e:
+            failed = e.status_code >= 500
+            raise
+        finally:
+            limiter.release(time.perf_counter() - start, failed=failed)
+
+    return app
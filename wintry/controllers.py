@@ -5,7 +5,7 @@ import json
 from enum import Enum
 import inspect
 from pathlib import PurePath
-from types import MethodType, GeneratorType
+from types import GeneratorType
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -35,18 +35,39 @@ from pydantic import ValidationError, BaseModel
 from pydantic.error_wrappers import ErrorWrapper
 from pydantic.fields import ModelField, Undefined
 from pydantic.json import ENCODERS_BY_TYPE
-from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 from starlette.routing import Route, BaseRoute
 from starlette.types import ASGIApp
 from fastapi.routing import APIRoute
 from dataclasses import dataclass
-from wintry.settings import TransporterType
-from wintry.utils.keys import __winter_transporter_name__, __winter_microservice_event__
+from wintry.columnar import ColumnarResponse, ColumnarResult, wants_ndjson
+from wintry.dto import is_dto
+from wintry.compression import cacheable_handler
+from wintry.concurrency import Limiter, limit_handler
+from wintry.etags import etag_matches, make_etag, not_modified, quote_etag
+from wintry.settings import ConcurrencyLimit
+from wintry.threadpools import DEFAULT, get_threadpool
+from wintry.utils.keys import (
+    __winter_dto__,
+    __winter_limiter__,
+    __winter_threadpool__,
+    __winter_cacheable__,
+    __winter_etag__,
+)
 from wintry.ioc import inject
 from wintry.ioc.container import IGlooContainer, SnowFactory, igloo
 from pydantic.typing import is_classvar
 
+# Microservices live on their own module, so consumers do not need the HTTP
+# stack. Kept importable from here
+from wintry.microservices import (
+    EventHandlerOptions as EventHandlerOptions,
+    RetryPolicy as RetryPolicy,
+    TransportControllerRegistry as TransportControllerRegistry,
+    microservice as microservice,
+    on as on,
+)
+
 
 ROUTER_KEY = "__api_router__"
 ENDPOINT_KEY = "__endpoint_api_key__"
@@ -75,6 +96,19 @@ def prepare_response_content(
             exclude_none=exclude_none,
         )
     elif isinstance(res, list):
+        if res and is_dto(res[0]):
+            dto_type = type(res[0])
+            return [
+                item.to_dict()
+                if type(item) is dto_type
+                else prepare_response_content(
+                    item,
+                    exclude_unset=exclude_unset,
+                    exclude_defaults=exclude_defaults,
+                    exclude_none=exclude_none,
+                )
+                for item in res
+            ]
         return [
             prepare_response_content(
                 item,
@@ -94,6 +128,8 @@ def prepare_response_content(
             )
             for k, v in res.items()
         }
+    elif is_dto(res):
+        return res.to_dict()
     elif dataclasses.is_dataclass(res):
         return dataclasses.asdict(res)
     return res
@@ -146,6 +182,21 @@ def wintry_jsonable_encoder(
             custom_encoder=encoder,
             sqlalchemy_safe=sqlalchemy_safe,
         )
+    json_native = getattr(type(obj), __winter_dto__, None)
+    if json_native is not None:
+        if json_native and include is None and exclude is None and not exclude_none:
+            return obj.to_dict()
+        return wintry_jsonable_encoder(
+            obj.to_dict(),
+            include=include,
+            exclude=exclude,
+            by_alias=by_alias,
+            exclude_unset=exclude_unset,
+            exclude_defaults=exclude_defaults,
+            exclude_none=exclude_none,
+            custom_encoder=custom_encoder,
+            sqlalchemy_safe=sqlalchemy_safe,
+        )
     if dataclasses.is_dataclass(obj):
         return dataclasses.asdict(obj)
     if isinstance(obj, Enum):
@@ -185,6 +236,19 @@ def wintry_jsonable_encoder(
                 encoded_dict[encoded_key] = encoded_value
         return encoded_dict
     if isinstance(obj, (list, set, frozenset, GeneratorType, tuple)):
+        if (
+            isinstance(obj, list)
+            and obj
+            and getattr(type(obj[0]), __winter_dto__, False)
+            and include is None
+            and exclude is None
+            and not exclude_none
+            and not custom_encoder
+        ):
+            # Lists of JSON native DTOs, skip encoding their dicts again
+            dto_type = type(obj[0])
+            if all(type(item) is dto_type for item in obj):
+                return [item.to_dict() for item in obj]
         encoded_list = []
         for item in obj:
             encoded_list.append(
@@ -240,6 +304,7 @@ async def serialize_response(
     exclude_defaults: bool = False,
     exclude_none: bool = False,
     is_coroutine: bool = True,
+    threadpool: str = DEFAULT,
 ):
     # Replicate FastAPI serialize_response() to include wintry.Models
     # serialization. Right now, if FastAPI encounters a dataclass, it
@@ -259,7 +324,7 @@ async def serialize_response(
         if is_coroutine:
             value, errors_ = field.validate(response_content, {}, loc=("response",))
         else:
-            value, errors_ = await run_in_threadpool(
+            value, errors_ = await get_threadpool(threadpool).run(
                 field.validate, response_content, {}, loc=("response",)
             )
         if isinstance(errors_, ErrorWrapper):
@@ -283,7 +348,11 @@ async def serialize_response(
 
 
 async def run_endpoint_function(
-    *, dependant: Dependant, values: Dict[str, Any], is_coroutine: bool
+    *,
+    dependant: Dependant,
+    values: Dict[str, Any],
+    is_coroutine: bool,
+    threadpool: str = DEFAULT,
 ) -> Any:
     # Only called by get_request_handler. Has been split into its own function to
     # facilitate profiling endpoints, since inner functions are harder to profile.
@@ -292,7 +361,7 @@ async def run_endpoint_function(
     if is_coroutine:
         return await dependant.call(**values)
     else:
-        return await run_in_threadpool(dependant.call, **values)
+        return await get_threadpool(threadpool).run(dependant.call, **values)
 
 
 def get_request_handler(
@@ -308,9 +377,14 @@ def get_request_handler(
     response_model_exclude_defaults: bool = False,
     response_model_exclude_none: bool = False,
     dependency_overrides_provider: Optional[Any] = None,
+    threadpool: str = DEFAULT,
+    etag: Union[bool, Callable[..., Any]] = False,
 ) -> Callable[[Request], Coroutine[Any, Any, Response]]:
     assert dependant.call is not None, "dependant.call must be a function"
     is_coroutine = asyncio.iscoroutinefunction(dependant.call)
+    # The version function takes the controller, injected as the first parameter
+    etag_version = etag if callable(etag) else None
+    controller_parameter = next(iter(inspect.signature(dependant.call).parameters), "")
     is_body_form = body_field and isinstance(body_field.field_info, params.Form)
     if isinstance(response_class, DefaultPlaceholder):
         actual_response_class: Type[Response] = response_class.value
@@ -357,14 +431,58 @@ def get_request_handler(
         if errors:
             raise RequestValidationError(errors, body=body)
         else:
+            if_none_match = request.headers.get("if-none-match") if etag else None
+            version_etag: Optional[str] = None
+            if etag_version is not None:
+                # Tells whether the client is up to date before doing any work
+                version = etag_version(values[controller_parameter], request)
+                if inspect.isawaitable(version):
+                    version = await version
+                if version is not None:
+                    version_etag = quote_etag(str(version))
+                    if if_none_match and etag_matches(if_none_match, version_etag):
+                        response = Response(background=background_tasks)
+                        response.raw_headers = list(sub_response.headers.raw)
+                        return not_modified(response, version_etag)
+
+            def conditional(response: Response) -> Response:
+                if not etag or response.status_code != 200:
+                    return response
+                tag = version_etag or response.headers.get("etag")
+                if tag is None:
+                    # Streamed bodies are not known before sending them
+                    if not isinstance(getattr(response, "body", None), bytes):
+                        return response
+                    tag = make_etag(response.body)
+                response.headers["etag"] = tag
+                if if_none_match and etag_matches(if_none_match, tag):
+                    return not_modified(response, tag)
+                return response
+
             raw_response = await run_endpoint_function(
-                dependant=dependant, values=values, is_coroutine=is_coroutine
+                dependant=dependant,
+                values=values,
+                is_coroutine=is_coroutine,
+                threadpool=threadpool,
             )
 
             if isinstance(raw_response, Response):
                 if raw_response.background is None:
                     raw_response.background = background_tasks
-                return raw_response
+                return conditional(raw_response)
+            if isinstance(raw_response, ColumnarResult):
+                # Columnar results encode themselves in chunks, skipping
+                # the response model and the per row encoding below
+                response = ColumnarResponse(
+                    raw_response,
+                    status_code=status_code or 200,
+                    ndjson=wants_ndjson(request.headers.get("accept")),
+                    background=background_tasks,
+                )
+                response.headers.raw.extend(sub_response.headers.raw)
+                if sub_response.status_code:
+                    response.status_code = sub_response.status_code
+                return response
             response_data = await serialize_response(
                 field=response_field,
                 response_content=raw_response,
@@ -375,6 +493,7 @@ def get_request_handler(
                 exclude_defaults=response_model_exclude_defaults,
                 exclude_none=response_model_exclude_none,
                 is_coroutine=is_coroutine,
+                threadpool=threadpool,
             )
             response_args: Dict[str, Any] = {"background": background_tasks}
             # If status_code was set, use it, otherwise use the default from the
@@ -385,7 +504,7 @@ def get_request_handler(
             response.headers.raw.extend(sub_response.headers.raw)
             if sub_response.status_code:
                 response.status_code = sub_response.status_code
-            return response
+            return conditional(response)
 
     return app
 
@@ -397,7 +516,7 @@ class WintryAPIRoute(APIRoute):
     """
 
     def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
-        return get_request_handler(
+        handler = get_request_handler(
             dependant=self.dependant,
             body_field=self.body_field,
             status_code=self.status_code,
@@ -410,7 +529,17 @@ class WintryAPIRoute(APIRoute):
             response_model_exclude_defaults=self.response_model_exclude_defaults,
             response_model_exclude_none=self.response_model_exclude_none,
             dependency_overrides_provider=self.dependency_overrides_provider,
+            threadpool=getattr(self.endpoint, __winter_threadpool__, DEFAULT),
+            etag=getattr(self.endpoint, __winter_etag__, False),
         )
+        # Set on the endpoint itself, so routes copied by `include_router`
+        # share it
+        limiter: Optional[Limiter] = getattr(self.endpoint, __winter_limiter__, None)
+        if limiter is not None:
+            handler = limit_handler(handler, limiter)
+        if getattr(self.endpoint, __winter_cacheable__, False):
+            handler = cacheable_handler(handler)
+        return handler
 
 
 class ApiController(APIRouter):
@@ -542,6 +671,10 @@ class RouteArgs(object):
     route_class_override: Optional[Type[APIRoute]] = None
     callbacks: Optional[List[Route]] = None
     openapi_extra: Optional[Dict[str, Any]] = None
+    # Wintry only, removed before reaching FastAPI
+    concurrency: Optional[ConcurrencyLimit] = None
+    cacheable: bool = False
+    etag: Union[bool, Callable[..., Any]] = False
 
     class Config(object):
         arbitrary_types_allowed = True
@@ -571,6 +704,7 @@ def post(
     route_class_override: Optional[Type[APIRoute]] = None,
     callbacks: Optional[List[Route]] = None,
     openapi_extra: Optional[Dict[str, Any]] = None,
+    concurrency: Optional[ConcurrencyLimit] = None,
 ):
     def decorator(fn: Callable[..., Any]):
         endpoint = RouteArgs(
@@ -598,6 +732,7 @@ def post(
             route_class_override=route_class_override,
             callbacks=callbacks,
             openapi_extra=openapi_extra,
+            concurrency=concurrency,
         )
         setattr(fn, ENDPOINT_KEY, endpoint)
         return fn
@@ -629,6 +764,9 @@ def get(
     route_class_override: Optional[Type[APIRoute]] = None,
     callbacks: Optional[List[Route]] = None,
     openapi_extra: Optional[Dict[str, Any]] = None,
+    concurrency: Optional[ConcurrencyLimit] = None,
+    cacheable: bool = False,
+    etag: Union[bool, Callable[..., Any]] = False,
 ):
     def decorator(fn: Callable[..., Any]):
         endpoint = RouteArgs(
@@ -656,6 +794,9 @@ def get(
             route_class_override=route_class_override,
             callbacks=callbacks,
             openapi_extra=openapi_extra,
+            concurrency=concurrency,
+            cacheable=cacheable,
+            etag=etag,
         )
         setattr(fn, ENDPOINT_KEY, endpoint)
         return fn
@@ -687,6 +828,7 @@ def delete(
     route_class_override: Optional[Type[APIRoute]] = None,
     callbacks: Optional[List[Route]] = None,
     openapi_extra: Optional[Dict[str, Any]] = None,
+    concurrency: Optional[ConcurrencyLimit] = None,
 ):
     def decorator(fn: Callable[..., Any]):
         endpoint = RouteArgs(
@@ -714,6 +856,7 @@ def delete(
             route_class_override=route_class_override,
             callbacks=callbacks,
             openapi_extra=openapi_extra,
+            concurrency=concurrency,
         )
         setattr(fn, ENDPOINT_KEY, endpoint)
         return fn
@@ -745,6 +888,7 @@ def put(
     route_class_override: Optional[Type[APIRoute]] = None,
     callbacks: Optional[List[Route]] = None,
     openapi_extra: Optional[Dict[str, Any]] = None,
+    concurrency: Optional[ConcurrencyLimit] = None,
 ):
     def decorator(fn: Callable[..., Any]):
         endpoint = RouteArgs(
@@ -772,6 +916,7 @@ def put(
             route_class_override=route_class_override,
             callbacks=callbacks,
             openapi_extra=openapi_extra,
+            concurrency=concurrency,
         )
         setattr(fn, ENDPOINT_KEY, endpoint)
         return fn
@@ -803,6 +948,7 @@ def patch(
     route_class_override: Optional[Type[APIRoute]] = None,
     callbacks: Optional[List[Route]] = None,
     openapi_extra: Optional[Dict[str, Any]] = None,
+    concurrency: Optional[ConcurrencyLimit] = None,
 ):
     def decorator(fn: Callable[..., Any]):
         endpoint = RouteArgs(
@@ -830,6 +976,7 @@ def patch(
             route_class_override=route_class_override,
             callbacks=callbacks,
             openapi_extra=openapi_extra,
+            concurrency=concurrency,
         )
         setattr(fn, ENDPOINT_KEY, endpoint)
         return fn
@@ -864,6 +1011,8 @@ def controller(
         generate_unique_id
     ),
     container: IGlooContainer = igloo,
+    concurrency: Optional[ConcurrencyLimit] = None,
+    threadpool: Optional[str] = None,
 ) -> Type[Callable[[Type[T]], Type[T]]]:
     """
     Returns a decorator that makes a Class-Based-View (or a controller)
@@ -898,6 +1047,13 @@ def controller(
     >>>     @get('/{user_id}')
     >>>     async def get_users(self, user_id: str = Path(...)):
     >>>         return await self.user_service.get_by_id(user_id)
+
+    `concurrency` limits the requests all the endpoints of the controller
+    serve at once, except the ones with their own `concurrency` limit.
+
+    Sync endpoints run in the `threadpool` named here, sized by
+    `WinterSettings.threadpools`, so slow blocking controllers can be kept
+    from starving the rest of the app.
     """
 
     def decorator(_cls: Type[T]):
@@ -925,7 +1081,7 @@ def controller(
         )
 
         # inject the underlying router in the class
-        return _controller(router, _cls, container)
+        return _controller(router, _cls, container, concurrency, threadpool)
 
     if cls is None:
         return decorator
@@ -935,7 +1091,11 @@ def controller(
 
 
 def _controller(
-    router: ApiController, cls: Type[T], container: IGlooContainer = igloo
+    router: ApiController,
+    cls: Type[T],
+    container: IGlooContainer = igloo,
+    concurrency: Optional[ConcurrencyLimit] = None,
+    threadpool: Optional[str] = None,
 ) -> Type[T]:
     """
     Replaces any methods of the provided class `cls` that are endpoints
@@ -1007,11 +1167,26 @@ def _controller(
     # filter to get only endpoints
     endpoints = [f for f in functions_set if getattr(f, ENDPOINT_KEY, None) is not None]
 
+    # One limiter for all the endpoints without a limit of their own
+    shared_limiter = Limiter(concurrency) if concurrency is not None else None
+
     for endpoint in endpoints:
         _fix_endpoint_signature(cls, endpoint)
-        # Add the corrected function to the router
         args: RouteArgs = getattr(endpoint, ENDPOINT_KEY)
-        router.add_api_route(endpoint=endpoint, **dataclasses.asdict(args))
+        limiter = Limiter(args.concurrency) if args.concurrency else shared_limiter
+        if limiter is not None:
+            setattr(endpoint, __winter_limiter__, limiter)
+        if threadpool is not None:
+            setattr(endpoint, __winter_threadpool__, threadpool)
+        # Add the corrected function to the router
+        if args.cacheable:
+            setattr(endpoint, __winter_cacheable__, True)
+        if args.etag:
+            setattr(endpoint, __winter_etag__, args.etag)
+        route_args = dataclasses.asdict(args)
+        for wintry_arg in ("concurrency", "cacheable", "etag"):
+            del route_args[wintry_arg]
+        router.add_api_route(endpoint=endpoint, **route_args)
 
     # register the router
     __controllers__.append(router)
@@ -1050,89 +1225,3 @@ def _fix_endpoint_signature(cls: Type[Any], endpoint: Callable[..., Any]):
 
     new_signature = old_signature.replace(parameters=new_parameters)
     setattr(endpoint, "__signature__", new_signature)
-
-
-class TransportControllerRegistry(object):
-    controllers: dict[TransporterType, type] = dict()
-
-    @classmethod
-    def get_controller_for_transporter(cls, transporter: TransporterType):
-        return cls.controllers.get(transporter, None)
-
-    @classmethod
-    def get_events_for_transporter(cls, service: type):
-        events: dict[str, MethodType] = dict()
-        methods = inspect.getmembers(service, inspect.isfunction)
-
-        for _, method in methods:
-            if (
-                event := getattr(method, __winter_microservice_event__, None)
-            ) is not None:
-                events[event] = method  # type: ignore
-
-        return events
-
-
-TPayload = TypeVar("TPayload")
-
-
-def on(event: str):
-    """Listen on an event from the method configured listener
-
-    Args:
-        event(str): The event to listen to.
-
-    Returns:
-        ((T, ...) -> Any]) -> (T, ...) -> Any: A dynamic event handler registered for `event`
-
-    """
-
-    def wrapper(method: Callable[[T, TPayload], Any]) -> Callable[[T, TPayload], Any]:
-        method_signature = inspect.signature(method)
-        assert (
-            len(method_signature.parameters) == 2
-        ), "on can only be called on method with one parameter"
-        setattr(method, __winter_microservice_event__, event)
-        return method
-
-    return wrapper
-
-
-def microservice(
-    transporter: TransporterType,
-) -> type[T] | Callable[[type[T]], type[T]]:
-    """Transform a class into a Container for rpc
-    calls endpoints. This is use with the same purpouse as
-    `controller` for web endpoints.
-
-    Args:
-        transporter(:ref:`TransporterType`): The name of the configured transporter for this
-        microservice. This would add an event dispatcher
-
-    Returns
-        type[T]: The same class with augmented properties.
-
-    """
-
-    def make_microservice(_cls: type[T]) -> type[T]:
-        _cls = dataclass(
-            eq=False,
-            order=False,
-            frozen=False,
-            match_args=False,
-            init=True,
-            kw_only=False,
-            repr=False,
-            unsafe_hash=False,
-        )(_cls)
-        _cls = inject(_cls)
-
-        # register this class as a controller
-
-        # Services require a name to be accessible from the outside
-        transporter_name = transporter or TransporterType.none
-        setattr(_cls, __winter_transporter_name__, transporter_name)
-        TransportControllerRegistry.controllers[transporter_name] = _cls
-        return _cls
-
-    return make_microservice
@@ -0,0 +1,77 @@
+import sys
+from dataclasses import dataclass, fields
+from typing import Any, Callable, TypeVar, overload
+
+from wintry.generators import CodeGenerator, code_gen
+from wintry.utils.keys import __winter_dto__
+
+T = TypeVar("T")
+
+# Values that the JSON encoder outputs untouched
+_json_native = (str, int, float, bool)
+
+
+def _is_json_native(cls: type, globs: dict[str, Any], locs: dict[str, Any]) -> bool:
+    for f in fields(cls):
+        kind, type_ = CodeGenerator._field_kind(f.type, globs, locs)
+        if kind in ("scalar", "scalar_list"):
+            if type_ not in _json_native:
+                return False
+        elif type_ is not cls and not getattr(type_, __winter_dto__, False):
+            return False
+    return True
+
+
+def is_dto(obj: Any) -> bool:
+    return getattr(type(obj), __winter_dto__, None) is not None
+
+
+@overload
+def dto(cls: type[T], /) -> type[T]:
+    ...
+
+
+@overload
+def dto(cls: None = None, /) -> Callable[[type[T]], type[T]]:
+    ...
+
+
+def dto(cls: type[T] | None = None, /) -> type[T] | Callable[[type[T]], type[T]]:
+    """
+    Make a compact response DTO out of an annotated class.
+
+    The class becomes a dataclass with `__slots__`, so instances do not carry
+    a `__dict__`, roughly halving the memory of large lists of them. On top
+    of the dataclass `__init__`, it gets generated:
+
+        * `from_orm(obj)` and `from_orm_many(rows)`
+        * `build(dict)` and `map(dict)`
+        * `to_dict()`, which `prepare_response_content` and
+          `wintry_jsonable_encoder` use instead of `dataclasses.asdict()`
+
+    Related DTOs must be defined at module level, before the class or as
+    string annotations.
+
+    Example
+    =======
+
+    >>> @dto
+    >>> class UserRead:
+    >>>     id: int
+    >>>     name: str
+    >>>     address: AddressRead | None = None
+    """
+
+    def make_dto(_cls: type[T]) -> type[T]:
+        _cls = dataclass(slots=True)(_cls)
+        globs = vars(sys.modules[_cls.__module__])
+        locs = {_cls.__name__: _cls}
+        code_gen.compile_dto(_cls, globs, locs)
+        # True when to_dict() output is already JSON encodable
+        setattr(_cls, __winter_dto__, _is_json_native(_cls, globs, locs))
+        return _cls
+
+    if cls is None:
+        return make_dto
+
+    return make_dto(cls)
@@ -1,5 +1,4 @@
 # Import the services defined by the framework
-import logging
 from typing import Any, Sequence, Coroutine, Callable, Optional, List, Union
 
 from wintry.errors import (
@@ -12,11 +11,22 @@ from wintry.errors import (
     invalid_request_exception_handler,
     InvalidRequestError,
 )
-from wintry.middlewares import IoCContainerMiddleware
+from wintry.backends import init_backends
+from wintry.compression import CompressionMiddleware
+from wintry.concurrency import ConcurrencyLimitMiddleware
+from wintry.middlewares import (
+    IoCContainerMiddleware,
+    load_middlewares,
+    warn_base_http_middlewares,
+)
+from wintry.logs import configure_logging
+from wintry.openapi import OpenAPISchema
+from wintry.settings import WinterSettings, get_settings
+from wintry.threadpools import configure_threadpools
 from wintry.controllers import __controllers__
 from wintry.utils.loaders import autodiscover_modules
+from wintry.utils.manifest import autodiscover_from_settings, import_manifest
 from fastapi import FastAPI
-import uvicorn.logging
 
 
 from fastapi.datastructures import Default
@@ -26,34 +36,15 @@ from fastapi.routing import APIRoute
 from fastapi.utils import generate_unique_id
 from starlette.requests import Request as Request
 from starlette.responses import JSONResponse as JSONResponse, Response as Response
-from starlette.routing import BaseRoute
-
-
-def _config_logger():
-    FORMAT: str = "%(levelprefix)s %(asctime)s | %(message)s"
-    # create logger
-    logger = logging.getLogger("logger")
-    logger.setLevel(logging.DEBUG)
-
-    # create console handler and set level to debug
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.DEBUG)
+from starlette.routing import BaseRoute, Route
 
-    # create formatter
-    formatter = uvicorn.logging.DefaultFormatter(
-        FORMAT, datefmt="%Y-%m-%d %H:%M:%S"
-    )  # type:ignore
 
-    # add formatter to ch
-    ch.setFormatter(formatter)
-
-    # add ch to logger
-    logger.addHandler(ch)
-
-    return logger
+def _config_logger(settings: WinterSettings):
+    return configure_logging(settings.log_level, json_format=settings.log_json)
 
 
 class App(FastAPI):
+
     def __init__(
         self,
         *,
@@ -94,6 +85,9 @@ class App(FastAPI):
         generate_unique_id_function: Callable[[APIRoute], str] = Default(
             generate_unique_id
         ),
+        manifest: str | None = None,
+        manifest_import_threads: int = 0,
+        settings: WinterSettings | None = None,
         **extra: Any,
     ) -> None:
         super().__init__(
@@ -129,12 +123,48 @@ class App(FastAPI):
             title=title,
             version=version,
         )
-        self.add_middleware(IoCContainerMiddleware)
+        settings = settings or get_settings()
+        configure_threadpools(settings.threadpools)
+        # Middlewares from settings wrap everything, then compression, the
+        # concurrency limit, the container scope and then the ones given here.
+        # Rejected requests never open a scope
+        limit = settings.concurrency_limit
+        compression = settings.compression
+        self.user_middleware = [
+            *load_middlewares(settings.middlewares),
+            *(
+                [Middleware(CompressionMiddleware, options=compression)]
+                if compression
+                else []
+            ),
+            *([Middleware(ConcurrencyLimitMiddleware, limit=limit)] if limit else []),
+            Middleware(IoCContainerMiddleware),
+            *self.user_middleware,
+        ]
+        warn_base_http_middlewares(self.user_middleware)
+
+        # Controllers register themselves on import, so the modules of the
+        # manifest must be imported before including them
+        if manifest is not None:
+            import_manifest(manifest, threads=manifest_import_threads)
 
         for controller in __controllers__:
             self.include_router(controller, prefix=server_prefix)
 
-        _config_logger()
+        # Served from bytes encoded once instead of FastAPI's route, which
+        # generates the schema in the event loop on the first request
+        self.openapi_document = OpenAPISchema(self, settings.openapi_path)
+        if self.openapi_url:
+            self._replace_route(self.openapi_url, self.openapi_document.endpoint)
+            if settings.openapi_prebuild or settings.openapi_path:
+                self.on_startup(self.openapi_document.start)
+
+        _config_logger(settings)
+
+    def _replace_route(self, path: str, endpoint: Callable[..., Any]):
+        for i, route in enumerate(self.router.routes):
+            if isinstance(route, Route) and route.path == path:
+                self.router.routes[i] = Route(path, endpoint, include_in_schema=False)
 
     def on_startup(self, fn: Callable[..., Any]):
         return self.on_event("startup")(fn)
@@ -145,9 +175,27 @@ class App(FastAPI):
 
 class AppBuilder(object):
     @staticmethod
-    def autodiscover(app_path: str, modules: Optional[List[str]] = None):
-        modules = modules or []
-        autodiscover_modules(modules, app_path)
+    def autodiscover(
+        app_path: str,
+        modules: Optional[List[str]] = None,
+        settings: Optional[WinterSettings] = None,
+    ):
+        """Import the modules registering controllers, providers, etc. When
+        `settings` are given, autodiscovery is configured by them, including
+        the use of a manifest"""
+        if settings is None:
+            autodiscover_modules(modules or [], app_path)
+        else:
+            autodiscover_from_settings(settings)
+        return AppBuilder
+
+    @staticmethod
+    def use_backends(app: App, settings: WinterSettings):
+        """Register the backends of `settings` in the container, opening their
+        connection pools on startup and closing them on shutdown"""
+        registry = init_backends(settings)
+        app.on_startup(registry.open)
+        app.on_shutdown(registry.close)
         return AppBuilder
 
     @staticmethod
@@ -0,0 +1,43 @@
+import hashlib
+
+from starlette.responses import Response
+
+# Headers a 304 keeps from the response it stands for, see RFC 9110 15.4.5
+_NOT_MODIFIED_HEADERS = frozenset(
+    (b"cache-control", b"content-location", b"date", b"etag", b"expires", b"vary")
+)
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag of an encoded body. blake2b is not a cryptographic
+    requirement here, just the fastest good hash in the stdlib"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def quote_etag(version: str) -> str:
+    if version.startswith(('"', 'W/"')):
+        return version
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of `etag` against an `If-None-Match` header, as GET
+    and HEAD requests use"""
+    if if_none_match.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == target for tag in if_none_match.split(",")
+    )
+
+
+def not_modified(response: Response, etag: str) -> Response:
+    """The 304 answering a request whose `If-None-Match` matched `response`"""
+    not_modified = Response(status_code=304, background=response.background)
+    not_modified.raw_headers = [
+        (name, value)
+        for name, value in response.raw_headers
+        if name in _NOT_MODIFIED_HEADERS
+    ]
+    not_modified.headers["etag"] = etag
+    return not_modified
@@ -1,31 +1,141 @@
-from dataclasses import fields
+import hashlib
+import marshal
+import os
+import sys
+from dataclasses import fields, is_dataclass
 from datetime import date, datetime
 from enum import Enum
-from types import GenericAlias
-from typing import Any, ForwardRef
+from pathlib import Path
+from types import CodeType, GenericAlias, UnionType
+from typing import Any, Callable, ForwardRef, Optional, Union, get_args, get_origin
 from uuid import UUID, uuid4
 
+from wintry.utils.keys import __winter_modified_entity_state__
 from wintry.utils.type_helpers import resolve_generic_type_or_die
 
 
 builtin_types = {int, str, float, bool, datetime, date, Enum, UUID}
 
 
+def _resolve(field_type: Any, globs, locs) -> Any:
+    """Evaluate string annotations and look through Optional[...], so
+    `list[T] | None` is still a list"""
+    if isinstance(field_type, ForwardRef):
+        field_type = field_type.__forward_arg__
+    if isinstance(field_type, str):
+        field_type = eval(field_type, globs, locs)
+
+    args = get_args(field_type)
+    if get_origin(field_type) in (Union, UnionType) and type(None) in args:
+        if len(args) == 2:
+            return _resolve(args[0] if args[1] is type(None) else args[1], globs, locs)
+    return field_type
+
+
+class CodeCache(object):
+    """Cache of generated code objects, kept in memory and on disk.
+
+    Entries are keyed on the model fields with their resolved types and
+    kinds, the generator source and the interpreter version, so any change
+    to them produces a new entry instead of a stale one. String annotations
+    are resolved first, as what they name can change while their text does
+    not. Files are marshaled code objects, like `__pycache__/*.pyc`, and are
+    written atomically so concurrent workers can share the directory.
+
+    The directory is taken from `WINTRY_CODEGEN_CACHE_DIR`, defaulting to the
+    `__pycache__` dir next to the model module. Set the variable to an
+    empty string to disable the disk cache.
+    """
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory = (
+            directory if directory is not None else os.getenv("WINTRY_CODEGEN_CACHE_DIR")
+        )
+        self.memory: dict[str, CodeType] = {}
+        self._generator_hash: Optional[str] = None
+
+    @property
+    def generator_hash(self) -> str:
+        if self._generator_hash is None:
+            self._generator_hash = hashlib.sha1(Path(__file__).read_bytes()).hexdigest()
+        return self._generator_hash
+
+    def key(self, kind: str, model: type, globs, locs) -> str:
+        resolved = (
+            (f.name, *CodeGenerator._field_kind(f.type, globs, locs))
+            for f in fields(model)
+        )
+        signature = "\n".join(
+            [
+                kind,
+                model.__module__,
+                model.__qualname__,
+                sys.implementation.cache_tag or "",
+                self.generator_hash,
+                *(
+                    f"{name}:{field_kind}:{type_!r}"
+                    for name, field_kind, type_ in resolved
+                ),
+            ]
+        )
+        digest = hashlib.sha1(signature.encode()).hexdigest()[:20]
+        return f"{model.__module__}.{model.__qualname__}.{kind}.{digest}"
+
+    def path(self, key: str, model: type) -> Optional[Path]:
+        if self.directory == "":
+            return None
+        if self.directory is not None:
+            return Path(self.directory) / f"{key}.wintry.pyc"
+
+        module_file = getattr(sys.modules.get(model.__module__), "__file__", None)
+        if module_file is None:
+            return None
+        return Path(module_file).parent / "__pycache__" / f"{key}.wintry.pyc"
+
+    def load(self, key: str, model: type) -> Optional[CodeType]:
+        if (code := self.memory.get(key)) is not None:
+            return code
+
+        path = self.path(key, model)
+        if path is None:
+            return None
+        try:
+            code = marshal.loads(path.read_bytes())
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+        self.memory[key] = code
+        return code
+
+    def store(self, key: str, model: type, code: CodeType):
+        self.memory[key] = code
+        path = self.path(key, model)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(marshal.dumps(code))
+            os.replace(tmp, path)
+        except OSError:
+            # A read-only filesystem only costs us the warm start
+            pass
+
+
 class CodeGenerator:
-    def __init__(self) -> None:
+
+    def __init__(self, cache: Optional[CodeCache] = None) -> None:
         self.lines: list[str] = []
         self._indents: int = 0
+        self.cache = cache if cache is not None else CodeCache()
 
     def classmethod_(self, method_name: str, *args: str, **kwargs: str):
+        params = ["cls", *args, *(f"{k}={v}" for k, v in kwargs.items())]
         self._add_line("@classmethod")
-        self._add_line(
-            f"def {method_name}(cls, {','.join(args)}, {','.join(f'{k}={v}' for k,v in kwargs.items())}):"
-        )
+        self._add_line(f"def {method_name}({', '.join(params)}):")
 
     def method(self, method_name: str, *args: str, **kwargs: str):
-        self._add_line(
-            f"def {method_name}(self, {','.join(args)}, {','.join(f'{k}={v}' for k,v in kwargs.items())}):"
-        )
+        params = ["self", *args, *(f"{k}={v}" for k, v in kwargs.items())]
+        self._add_line(f"def {method_name}({', '.join(params)}):")
 
     def _add_line(self, line: str):
         self.lines.append(" " * (self._indents * 4) + line)
@@ -54,6 +164,68 @@ class CodeGenerator:
         if return_:
             return text
 
+    def _cached(
+        self, kind: str, model: type, globs, locs, generate: Callable[[], Any]
+    ) -> CodeType:
+        key = self.cache.key(kind, model, globs, locs)
+        if (code := self.cache.load(key, model)) is not None:
+            return code
+
+        generate()
+        code = compile(self.code(), f"<wintry {kind} {model.__qualname__}>", "exec")
+        self.cache.store(key, model, code)
+        return code
+
+    def compile_from_orm(self, model: type, globs=globals(), locs=locals()):
+        """Like `model_from_orm()` followed by `compile()`, but reusing the
+        code generated by previous runs when the model did not change"""
+        code = self._cached(
+            "from_orm",
+            model,
+            globs,
+            locs,
+            lambda: self.model_from_orm(model, globs, locs),
+        )
+        exec(code, globs, locs)
+        code = self._cached(
+            "from_orm_many",
+            model,
+            globs,
+            locs,
+            lambda: self.model_from_orm_many(model, globs, locs),
+        )
+        exec(code, globs, locs)
+
+    def compile_map_to(self, model: type, globs, locs):
+        """Like `map_to()` followed by `compile()`, but reusing the code
+        generated by previous runs when the model did not change"""
+        code = self._cached(
+            "map", model, globs, locs, lambda: self.map_to(model, globs, locs)
+        )
+        exec(code, globs, locs)
+
+    def compile_dto(self, model: type, globs, locs):
+        """Generate and compile the methods of a `@dto` class: `from_orm`,
+        `from_orm_many`, `build`, `map` and `to_dict`"""
+        self.compile_from_orm(model, globs, locs)
+        for kind, generate in (
+            ("build", self.dto_build),
+            ("dto_map", self.dto_map_to),
+            ("to_dict", self.model_to_dict),
+        ):
+            code = self._cached(
+                kind, model, globs, locs, lambda: generate(model, globs, locs)
+            )
+            exec(code, globs, locs)
+
+    def compile_tracker(self, model: type, globs, locs):
+        """Like `model_tracker()` followed by `compile()`, but reusing the
+        code generated by previous runs when the model did not change"""
+        code = self._cached(
+            "tracker", model, globs, locs, lambda: self.model_tracker(model)
+        )
+        exec(code, globs, locs)
+
     def model_from_orm(self, model: type, globs=globals(), locs=locals()):
         self.reset()
         self.classmethod_("from_orm", "obj")
@@ -65,59 +237,18 @@ class CodeGenerator:
             with self.indent():
                 self._add_line("return [cls.from_orm(o) for o in obj]")
             for f in fields(model):
-                if isinstance(f.type, GenericAlias) and f.type.__origin__ == list:
-                    type_ = resolve_generic_type_or_die(f.type)
-
-                    if isinstance(type_, str):
-                        type_ = eval(type_, globs, locs)
-                        type_ = resolve_generic_type_or_die(type_)
-
-                    if type_ in builtin_types:
-                        # If we got a list of builtin types, then just assign it
-                        self._add_line(f"__{f.name} = getattr(obj, '{f.name}', [])")
-                    else:
-                        self._add_line(
-                            f"__{f.name} = [{type_.__name__}.from_orm(o) for o in getattr(obj, '{f.name}', [])]"
-                        )
-
-                elif isinstance(f.type, str):
-                    type_ = eval(f.type, globs, locs)
-                    if isinstance(type_, GenericAlias) and type_.__origin__ == list:
-                        type_ = resolve_generic_type_or_die(type_)
-                        if isinstance(type_, str):
-                            type_ = eval(type_, globs, locs)
-                            type_ = resolve_generic_type_or_die(type_)
-                        self._add_line(
-                            f"__{f.name} = [{type_.__name__}.from_orm(o) for o in getattr(obj, '{f.name}')]"
-                        )
-                    else:
-                        type_ = resolve_generic_type_or_die(type_)
-                        self._add_line(
-                            f"__{f.name} = {type_.__name__}.from_orm(getattr(obj, '{f.name}'))"
-                        )
-                elif isinstance(f.type, ForwardRef):
-                    type_ = f.type.__forward_arg__
-                    type_ = eval(type_, globs, locs)
-                    if isinstance(type_, GenericAlias) and type_.__origin__ == list:
-                        type_ = resolve_generic_type_or_die(type_)
-                        if isinstance(type_, str):
-                            type_ = eval(type_, globs, locs)
-                            type_ = resolve_generic_type_or_die(type_)
-                        self._add_line(
-                            f"__{f.name} = [{type_.__name__}.from_orm(o) for o in getattr(obj, '{f.name}')]"
-                        )
-                    else:
-                        self._add_line(
-                            f"__{f.name} = {type_.__name__}.from_orm(getattr(obj, '{f.name}'))"
-                        )
-                elif not f.type in builtin_types:
-                    type_ = resolve_generic_type_or_die(f.type)
-                    if isinstance(type_, ForwardRef):
-                        type_ = type_.__forward_arg__
-                        type_ = eval(type_, globs, locs)
+                kind, type_ = self._field_kind(f.type, globs, locs)
+                if kind == "model":
                     self._add_line(
                         f"__{f.name} = {type_.__name__}.from_orm(getattr(obj, '{f.name}'))"
                     )
+                elif kind == "model_list":
+                    self._add_line(
+                        f"__{f.name} = [{type_.__name__}.from_orm(o) "
+                        f"for o in getattr(obj, '{f.name}', [])]"
+                    )
+                elif kind == "scalar_list":
+                    self._add_line(f"__{f.name} = getattr(obj, '{f.name}', [])")
                 else:
                     self._add_line(f"__{f.name} = getattr(obj, '{f.name}')")
             self._add_line(
@@ -125,6 +256,114 @@ class CodeGenerator:
             )
         self._add_line(f"setattr({model.__name__}, 'from_orm', from_orm)")
 
+    @staticmethod
+    def _field_kind(field_type: Any, globs, locs) -> tuple[str, Any]:
+        """Classify a field as `scalar`, `model`, `scalar_list` or `model_list`,
+        along with the (resolved) type of its values.
+
+        Only dataclasses, which includes `@dto` classes, are models. Any other
+        type is a scalar, and its values are used as they are.
+        """
+        field_type = _resolve(field_type, globs, locs)
+        is_list = get_origin(field_type) is list
+        if is_list:
+            args = get_args(field_type)
+            field_type = _resolve(args[0], globs, locs) if args else Any
+
+        if isinstance(field_type, type) and is_dataclass(field_type):
+            return ("model_list" if is_list else "model"), field_type
+        return ("scalar_list" if is_list else "scalar"), field_type
+
+    def model_from_orm_many(self, model: type, globs=globals(), locs=locals()):
+        """Generate `from_orm_many(rows)`, a batch version of `from_orm`.
+
+        Scalar fields of every row are read with a single `attrgetter`, and
+        related objects of all the rows are collected and converted with
+        one `from_orm_many` call per relationship, instead of recursing
+        row by row. `rows` must not contain `None`.
+        """
+        self.reset()
+        model_fields = fields(model)
+        kinds = {f.name: self._field_kind(f.type, globs, locs) for f in model_fields}
+        scalars = [f.name for f in model_fields if kinds[f.name][0] == "scalar"]
+        getter = ", ".join(repr(name) for name in scalars)
+
+        if scalars:
+            self.classmethod_(
+                "from_orm_many",
+                "rows",
+                _get=f"__import__('operator').attrgetter({getter})",
+            )
+        else:
+            self.classmethod_("from_orm_many", "rows")
+
+        # The zipped columns, and how each field reads from them
+        columns: list[str] = []
+        values: dict[str, str] = {}
+        with self.indent():
+            self._add_line("if not isinstance(rows, list):")
+            with self.indent():
+                self._add_line("rows = list(rows)")
+            if scalars:
+                columns.append("map(_get, rows)")
+                for i, name in enumerate(scalars):
+                    values[name] = f"__s[{i}]" if len(scalars) > 1 else "__s"
+
+            for f in model_fields:
+                kind, type_ = kinds[f.name]
+                if kind == "scalar":
+                    continue
+
+                column = f"__{f.name}"
+                if kind == "scalar_list":
+                    self._add_line(
+                        f"{column} = [getattr(r, '{f.name}', []) for r in rows]"
+                    )
+                elif kind == "model":
+                    # Convert every non null child in one batch, then put
+                    # them back in place of the originals
+                    self._add_line(f"{column} = [getattr(r, '{f.name}') for r in rows]")
+                    self._add_line(
+                        f"__converted = iter({type_.__name__}.from_orm_many("
+                        f"[c for c in {column} if c is not None]))"
+                    )
+                    self._add_line(
+                        f"{column} = "
+                        f"[None if c is None else next(__converted) for c in {column}]"
+                    )
+                else:
+                    # Flatten the children of every row, convert them in
+                    # one batch and slice them back per row
+                    self._add_line(
+                        f"__children = [getattr(r, '{f.name}', None) or [] for r in rows]"
+                    )
+                    self._add_line(
+                        f"__converted = {type_.__name__}.from_orm_many("
+                        "[c for cs in __children for c in cs])"
+                    )
+                    self._add_line(f"{column} = []")
+                    self._add_line("__start = 0")
+                    self._add_line("for cs in __children:")
+                    with self.indent():
+                        self._add_line("__end = __start + len(cs)")
+                        self._add_line(f"{column}.append(__converted[__start:__end])")
+                        self._add_line("__start = __end")
+                columns.append(column)
+                values[f.name] = f"__c{len(columns) - 1}"
+
+            names = ["__s" if scalars else None] + [
+                f"__c{i}" for i in range(1 if scalars else 0, len(columns))
+            ]
+            targets = ", ".join(n for n in names if n is not None)
+            kwargs = ", ".join(f"{f.name}={values[f.name]}" for f in model_fields)
+            if columns:
+                self._add_line(
+                    f"return [cls({kwargs}) for {targets}, in zip({', '.join(columns)})]"
+                )
+            else:
+                self._add_line("return [cls() for _ in rows]")
+        self._add_line(f"setattr({model.__name__}, 'from_orm_many', from_orm_many)")
+
     def map_to(self, model: type, globs, locs):
         self.reset()
         self.method("map", "_dict")
@@ -269,5 +508,128 @@ class CodeGenerator:
 
         self._add_line(f"setattr({model.__name__}, 'map', map)")
 
+    def dto_build(self, model: type, globs, locs):
+        """Generate `build(_dict)`, creating an instance from a dict and
+        building its related models from their nested dicts"""
+        self.reset()
+        self.classmethod_("build", "_dict")
+        with self.indent():
+            related = [
+                (f.name, *self._field_kind(f.type, globs, locs)) for f in fields(model)
+            ]
+            related = [r for r in related if r[1] in ("model", "model_list")]
+            if related:
+                self._add_line("_dict = dict(_dict)")
+            for name, kind, type_ in related:
+                self._add_line(f"if (value := _dict.get('{name}')) is not None:")
+                with self.indent():
+                    if kind == "model":
+                        self._add_line("if isinstance(value, dict):")
+                        with self.indent():
+                            self._add_line(
+                                f"_dict['{name}'] = {type_.__name__}.build(value)"
+                            )
+                    else:
+                        self._add_line(
+                            f"_dict['{name}'] = [{type_.__name__}.build(o) "
+                            "if isinstance(o, dict) else o for o in value]"
+                        )
+            self._add_line("return cls(**_dict)")
+        self._add_line(f"setattr({model.__name__}, 'build', build)")
+
+    def dto_map_to(self, model: type, globs, locs):
+        """Generate `map(_dict)` for `@dto` classes, updating the fields
+        present in `_dict`, and related models in place"""
+        self.reset()
+        self.method("map", "_dict", _missing="__import__('dataclasses').MISSING")
+        with self.indent():
+            for f in fields(model):
+                kind, type_ = self._field_kind(f.type, globs, locs)
+                self._add_line(
+                    f"if (value := _dict.get('{f.name}', _missing)) is not _missing:"
+                )
+                with self.indent():
+                    if kind == "model":
+                        self._add_line(
+                            f"if value is not None and self.{f.name} is not None:"
+                        )
+                        with self.indent():
+                            self._add_line(f"self.{f.name}.map(value)")
+                        self._add_line("else:")
+                        with self.indent():
+                            self._add_line(
+                                f"self.{f.name} = None if value is None "
+                                f"else {type_.__name__}.build(value)"
+                            )
+                    elif kind == "model_list":
+                        self._add_line(
+                            f"self.{f.name} = None if value is None "
+                            f"else [{type_.__name__}.build(o) for o in value]"
+                        )
+                    else:
+                        self._add_line(f"self.{f.name} = value")
+            if not fields(model):
+                self._add_line("pass")
+        self._add_line(f"setattr({model.__name__}, 'map', map)")
+
+    def model_to_dict(self, model: type, globs, locs):
+        """Generate `to_dict()`, a flat `dataclasses.asdict()` that only
+        recurses into related models, without deep copying anything else"""
+        self.reset()
+        self.method("to_dict")
+        with self.indent():
+            items = []
+            for f in fields(model):
+                kind, _ = self._field_kind(f.type, globs, locs)
+                value = f"self.{f.name}"
+                if kind == "model":
+                    value = f"None if {value} is None else {value}.to_dict()"
+                elif kind == "model_list":
+                    value = f"None if {value} is None else [o.to_dict() for o in {value}]"
+                elif kind == "scalar_list":
+                    value = f"None if {value} is None else list({value})"
+                items.append(f"'{f.name}': {value}")
+            self._add_line(f"return {{{', '.join(items)}}}")
+        self._add_line(f"setattr({model.__name__}, 'to_dict', to_dict)")
+
+    def model_tracker(self, model: type):
+        """Generate a `__setattr__` that records the original value of every
+        field assigned a different value, under `__winter_modified_entity_state__`.
+
+        Assigning the original value back removes the field from the state,
+        so it only ever holds actual changes. Nothing is recorded until the
+        state exists, which keeps `__init__` assignments out of it.
+        """
+        self.reset()
+        names = tuple(f.name for f in fields(model))
+        self.method(
+            "__setattr__",
+            "name",
+            "value",
+            _set="object.__setattr__",
+            _missing="__import__('dataclasses').MISSING",
+        )
+        with self.indent():
+            self._add_line(f"if name in {names!r}:")
+            with self.indent():
+                self._add_line(
+                    f"state = getattr(self, '{__winter_modified_entity_state__}', None)"
+                )
+                self._add_line("if state is not None:")
+                with self.indent():
+                    self._add_line("if name in state:")
+                    with self.indent():
+                        self._add_line("if state[name] is value or state[name] == value:")
+                        with self.indent():
+                            self._add_line("del state[name]")
+                    self._add_line("else:")
+                    with self.indent():
+                        self._add_line("old = getattr(self, name, _missing)")
+                        self._add_line("if old is not value and old != value:")
+                        with self.indent():
+                            self._add_line("state[name] = old")
+            self._add_line("_set(self, name, value)")
+        self._add_line(f"setattr({model.__name__}, '__setattr__', __setattr__)")
+
 
 code_gen = CodeGenerator()
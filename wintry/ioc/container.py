@@ -1,9 +1,10 @@
 from asyncio import iscoroutinefunction
-from contextlib import contextmanager, asynccontextmanager
 from contextvars import ContextVar, Token
-from typing import Any, Callable, TypeVar
-from fastapi.params import Depends
-from starlette.concurrency import run_in_threadpool
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
+from wintry.threadpools import DISPOSE, get_threadpool
+
+if TYPE_CHECKING:  # pragma: no cover
+    from fastapi.params import Depends
 
 T = TypeVar("T")
 
@@ -24,7 +25,7 @@ class SnowFactory(object):
     """This is just a way of differentiating Factories from singleton objects.
     This is a proxy object which forward the obj instantiation."""
 
-    def __init__(self, cls: Callable, **dependencies: Depends) -> None:
+    def __init__(self, cls: Callable, **dependencies: "Depends") -> None:
         self.cls = cls
         self.fastapi_dependencies = dependencies
 
@@ -32,6 +33,35 @@ class SnowFactory(object):
         return self.cls(**self.fastapi_dependencies)
 
 
+class ContainerScope(object):
+    # A plain async context manager instead of an @asynccontextmanager
+    # generator, as it is entered once per request and once per message,
+    # so its overhead adds up
+    __slots__ = ("_token_context", "_token_flag")
+
+    async def __aenter__(self):
+        self._token_context = _context_bounded_dependencies.set({})
+        self._token_flag = _in_scope.set(True)
+        return self
+
+    async def __aexit__(self, *exc_info: Any):
+        # Try to clean the context objects
+        context = _context_bounded_dependencies.get()
+        try:
+            for dep in context.values():
+                dispose_method = getattr(dep, "dispose", None)
+                if dispose_method is None:
+                    continue
+                if iscoroutinefunction(dispose_method):
+                    await dispose_method()
+                else:
+                    # Own pool, so slow sync endpoints do not delay disposal
+                    await get_threadpool(DISPOSE).run(dispose_method)
+        finally:
+            _context_bounded_dependencies.reset(self._token_context)
+            _in_scope.reset(self._token_flag)
+
+
 class IGlooContainer(object):
     # An igloo is a container for wintry objects, so
     # bear with me on the name. This is a Dependency Injection
@@ -65,28 +95,15 @@ class IGlooContainer(object):
         # exits
         self.request_dependencies: dict[type, Any] = dict()
 
-    @asynccontextmanager
-    async def scoped(self):
+    def scoped(self) -> "ContainerScope":
         # Prepare the scoped context for dependency injection
         # It is important that this method gets called once for
         # each async context, so it might be a good candidate
         # for a middleware
-        token_context = _context_bounded_dependencies.set({})
-        token_flag = _in_scope.set(True)
-        try:
-            yield
-        finally:
-            # Try to clean the context objects
-            context = _context_bounded_dependencies.get()
-            for dep in context.values():
-                if hasattr(dep, "dispose"):
-                    dispose_method = getattr(dep, "dispose")
-                    if iscoroutinefunction(dispose_method):
-                        await dispose_method()
-                    else:
-                        await run_in_threadpool(dispose_method)
-            _context_bounded_dependencies.reset(token_context)
-            _in_scope.reset(token_flag)
+        return ContainerScope()
+
+    def in_scope(self) -> bool:
+        return _in_scope.get()
 
     def add_scoped(self, interface: type, implementer: Any):
         factory = SnowFactory(implementer)
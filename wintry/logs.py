@@ -0,0 +1,124 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from threading import Lock
+from typing import IO, Any, Optional, Union
+
+LOGGER_NAME = "logger"
+
+_lock = Lock()
+_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the `extra` of the record as fields"""
+
+    _reserved = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in self._reserved:
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Like the base one, merges the arguments into the message and drops
+        # the traceback objects, but keeps the traceback apart in `exc_text`
+        # so formatters decide where it goes
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _plain.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_plain = logging.Formatter()
+
+
+def _formatter(json_format: bool) -> logging.Formatter:
+    if json_format:
+        return JsonFormatter()
+    # Not imported on top, consumer processes log without the HTTP stack
+    import uvicorn.logging
+
+    return uvicorn.logging.DefaultFormatter(
+        "%(levelprefix)s %(asctime)s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+    )  # type:ignore
+
+
+def configure_logging(
+    level: Union[int, str] = logging.INFO,
+    *,
+    json_format: bool = False,
+    stream: Optional[IO[str]] = None,
+) -> logging.Logger:
+    """Configure the "logger" logger used by Wintry.
+
+    Records are put in a queue and written to `stream` (stderr by default)
+    by a background thread, so a slow terminal or log collector never blocks
+    the event loop. Calling it again only updates the level and format, so
+    building several apps does not duplicate the output.
+    """
+    global _handler, _listener
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    with _lock:
+        if _listener is None or (stream is not None and _stream() is not stream):
+            _stop()
+            writer = logging.StreamHandler(stream or sys.stderr)
+            records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+            _handler = _QueueHandler(records)
+            _listener = QueueListener(records, writer, respect_handler_level=True)
+            _listener.start()
+            logger.addHandler(_handler)
+
+        for writer in _listener.handlers:
+            writer.setFormatter(_formatter(json_format))
+    return logger
+
+
+def _stream() -> Optional[IO[str]]:
+    if _listener is None:
+        return None
+    return getattr(_listener.handlers[0], "stream", None)
+
+
+def _stop():
+    global _handler, _listener
+    if _listener is not None:
+        # Writes the queued records before returning
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger(LOGGER_NAME).removeHandler(_handler)
+        _handler = None
+
+
+def stop_logging():
+    """Write pending records and remove the handlers of `configure_logging`"""
+    with _lock:
+        _stop()
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,176 @@
+import inspect
+import random
+from dataclasses import dataclass
+from types import MethodType
+from typing import Any, Callable, Optional, TypeVar
+
+from wintry.ioc import inject
+from wintry.settings import TransporterType
+from wintry.utils.keys import (
+    __winter_transporter_name__,
+    __winter_microservice_event__,
+    __winter_microservice_event_options__,
+)
+
+T = TypeVar("T")
+
+
+class TransportControllerRegistry(object):
+    controllers: dict[TransporterType, type] = dict()
+
+    @classmethod
+    def get_controller_for_transporter(cls, transporter: TransporterType):
+        return cls.controllers.get(transporter, None)
+
+    @classmethod
+    def get_events_for_transporter(cls, service: type):
+        events: dict[str, MethodType] = dict()
+        methods = inspect.getmembers(service, inspect.isfunction)
+
+        for _, method in methods:
+            if (
+                event := getattr(method, __winter_microservice_event__, None)
+            ) is not None:
+                events[event] = method  # type: ignore
+
+        return events
+
+
+TPayload = TypeVar("TPayload")
+
+
+@dataclass
+class RetryPolicy(object):
+    """Exponential backoff with jitter for failed event handlers.
+
+    Attempt `n` (starting at 1) is retried after
+    `min(max_backoff, backoff * 2 ** (n - 1))` seconds, shortened by up to
+    `jitter` of itself, so redeliveries of a burst of failures spread out.
+    """
+
+    max_attempts: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 60.0
+    jitter: float = 0.5
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+
+@dataclass
+class EventHandlerOptions(object):
+    """Per handler configuration, consumed by the transporters when
+    dispatching an event"""
+
+    concurrency: Optional[int] = None
+    """
+    Maximum number of messages of this event handled at the same time
+    by a single consumer. `None` means that only the transporter prefetch
+    limits it.
+    """
+
+    retry: Optional[RetryPolicy] = None
+    """
+    How to retry failed messages. `None` means that failed messages are
+    not retried.
+    """
+
+    dead_letter: Optional[str] = None
+    """
+    Event under which messages that exhausted their attempts are published,
+    with the error and the original event in the headers.
+    """
+
+    idempotent: bool = False
+    """
+    Skip messages whose idempotency key was already handled successfully,
+    like broker redeliveries or duplicated publishes.
+    """
+
+
+def on(
+    event: str,
+    *,
+    concurrency: Optional[int] = None,
+    retry: Optional[RetryPolicy] = None,
+    dead_letter: Optional[str] = None,
+    idempotent: bool = False,
+):
+    """Listen on an event from the method configured listener
+
+    Args:
+        event(str): The event to listen to.
+        concurrency(int | None): Max number of in-flight messages for this handler.
+        retry(RetryPolicy | None): Retry configuration for failed messages.
+        dead_letter(str | None): Event to publish messages that exhausted their attempts.
+        idempotent(bool): Skip messages which were already handled.
+
+    Returns:
+        ((T, ...) -> Any]) -> (T, ...) -> Any: A dynamic event handler registered for `event`
+
+    """
+    assert concurrency is None or concurrency > 0, "concurrency must be a positive number"
+    assert (
+        retry is None or retry.max_attempts > 0
+    ), "max_attempts must be a positive number"
+
+    def wrapper(method: Callable[[T, TPayload], Any]) -> Callable[[T, TPayload], Any]:
+        method_signature = inspect.signature(method)
+        assert (
+            len(method_signature.parameters) == 2
+        ), "on can only be called on method with one parameter"
+        setattr(method, __winter_microservice_event__, event)
+        setattr(
+            method,
+            __winter_microservice_event_options__,
+            EventHandlerOptions(
+                concurrency=concurrency,
+                retry=retry,
+                dead_letter=dead_letter,
+                idempotent=idempotent,
+            ),
+        )
+        return method
+
+    return wrapper
+
+
+def microservice(
+    transporter: TransporterType,
+) -> type[T] | Callable[[type[T]], type[T]]:
+    """Transform a class into a Container for rpc
+    calls endpoints. This is use with the same purpouse as
+    `controller` for web endpoints.
+
+    Args:
+        transporter(:ref:`TransporterType`): The name of the configured transporter for this
+        microservice. This would add an event dispatcher
+
+    Returns
+        type[T]: The same class with augmented properties.
+
+    """
+
+    def make_microservice(_cls: type[T]) -> type[T]:
+        _cls = dataclass(
+            eq=False,
+            order=False,
+            frozen=False,
+            match_args=False,
+            init=True,
+            kw_only=False,
+            repr=False,
+            unsafe_hash=False,
+        )(_cls)
+        _cls = inject(_cls)
+
+        # register this class as a controller
+
+        # Services require a name to be accessible from the outside
+        transporter_name = transporter or TransporterType.none
+        setattr(_cls, __winter_transporter_name__, transporter_name)
+        TransportControllerRegistry.controllers[transporter_name] = _cls
+        return _cls
+
+    return make_microservice
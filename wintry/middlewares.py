@@ -1,18 +1,210 @@
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.requests import Request
-from starlette.responses import Response
-from starlette.types import ASGIApp
+import logging
+import re
+from importlib import import_module
+from typing import Iterable, Optional, Sequence
+
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from wintry.ioc.container import igloo
+from wintry.settings import Middleware as MiddlewareSpec
+
+logger = logging.getLogger("logger")
 
 
-class IoCContainerMiddleware(BaseHTTPMiddleware):
+class IoCContainerMiddleware(object):
+    # A pure ASGI middleware, as a BaseHTTPMiddleware would run the rest of
+    # the app in a new task for each request. It also keeps the scope open
+    # until the whole body is sent, so streaming responses can still use
+    # their scoped dependencies
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
+        self.app = app
 
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
         async with igloo.scoped():
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send)
+
+
+ALL_METHODS = ("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT")
+SAFELISTED_HEADERS = {"accept", "accept-language", "content-language", "content-type"}
+
+
+class CORSMiddleware(object):
+    """Pure ASGI CORS, with the same arguments as Starlette's one.
+
+    Everything that does not depend on the request is encoded once here.
+    Preflight responses only depend on the origin and the requested method
+    and headers, so they are cached by those and answered without reaching
+    the router.
+    """
+
+    max_cached_preflights = 1024
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        allow_origins: Sequence[str] = (),
+        allow_methods: Sequence[str] = ("GET",),
+        allow_headers: Sequence[str] = (),
+        allow_credentials: bool = False,
+        allow_origin_regex: Optional[str] = None,
+        expose_headers: Sequence[str] = (),
+        max_age: int = 600,
+    ) -> None:
+        self.app = app
+        self.allow_all_origins = "*" in allow_origins
+        self.allow_all_headers = "*" in allow_headers
+        self.allow_origins = frozenset(o.encode("latin-1") for o in allow_origins)
+        self.allow_origin_regex = (
+            re.compile(allow_origin_regex) if allow_origin_regex is not None else None
+        )
+        methods = ALL_METHODS if "*" in allow_methods else tuple(allow_methods)
+        self.allow_methods = frozenset(m.encode("latin-1") for m in methods)
+        self.allow_headers = frozenset(
+            h.lower() for h in (*SAFELISTED_HEADERS, *allow_headers) if h != "*"
+        )
+        # Without credentials, any origin can be answered with "*"
+        self.echo_origin = not self.allow_all_origins or allow_credentials
+
+        simple: list[tuple[bytes, bytes]] = []
+        if allow_credentials:
+            simple.append((b"access-control-allow-credentials", b"true"))
+        if expose_headers:
+            simple.append(
+                (b"access-control-expose-headers", ", ".join(expose_headers).encode())
+            )
+        self.simple_headers = simple
+
+        preflight: list[tuple[bytes, bytes]] = [
+            (b"access-control-allow-methods", ", ".join(methods).encode()),
+            (b"access-control-max-age", str(max_age).encode()),
+        ]
+        if allow_credentials:
+            preflight.append((b"access-control-allow-credentials", b"true"))
+        if not self.allow_all_headers and self.allow_headers:
+            preflight.append(
+                (
+                    b"access-control-allow-headers",
+                    ", ".join(sorted(self.allow_headers)).encode(),
+                )
+            )
+        self.preflight_headers = preflight
+        self._preflights: dict[
+            tuple[bytes, bytes, bytes], tuple[int, list[tuple[bytes, bytes]], bytes]
+        ] = {}
+
+    def is_allowed_origin(self, origin: bytes) -> bool:
+        if self.allow_all_origins or origin in self.allow_origins:
+            return True
+        return self.allow_origin_regex is not None and bool(
+            self.allow_origin_regex.fullmatch(origin.decode("latin-1"))
+        )
+
+    def _origin_headers(self, origin: bytes) -> list[tuple[bytes, bytes]]:
+        if self.echo_origin:
+            return [(b"access-control-allow-origin", origin), (b"vary", b"Origin")]
+        return [(b"access-control-allow-origin", b"*")]
+
+    def _preflight(
+        self, origin: bytes, method: bytes, requested_headers: bytes
+    ) -> tuple[int, list[tuple[bytes, bytes]], bytes]:
+        headers = list(self.preflight_headers)
+        failures: list[str] = []
+        if self.is_allowed_origin(origin):
+            headers.extend(self._origin_headers(origin))
+        else:
+            failures.append("origin")
+        if method not in self.allow_methods:
+            failures.append("method")
+        if self.allow_all_headers and requested_headers:
+            headers.append((b"access-control-allow-headers", requested_headers))
+        elif any(
+            h.strip().lower() not in self.allow_headers
+            for h in requested_headers.decode("latin-1").split(",")
+            if h.strip()
+        ):
+            failures.append("headers")
+
+        if failures:
+            status, body = 400, f"Disallowed CORS {', '.join(failures)}".encode()
+        else:
+            status, body = 200, b"OK"
+        headers.append((b"content-type", b"text/plain; charset=utf-8"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        return status, headers, body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        origin = request_method = None
+        request_headers = b""
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if origin is None:
+            return await self.app(scope, receive, send)
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            key = (origin, request_method, request_headers)
+            if (preflight := self._preflights.get(key)) is None:
+                if len(self._preflights) >= self.max_cached_preflights:
+                    # Origins come from clients, do not let them grow it forever
+                    self._preflights.clear()
+                preflight = self._preflights[key] = self._preflight(*key)
+            status, headers, body = preflight
+            # Fresh messages, as outer middlewares may change them
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": status,
+                    "headers": list(headers),
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        if not self.is_allowed_origin(origin):
+            return await self.app(scope, receive, send)
+
+        extra = [*self._origin_headers(origin), *self.simple_headers]
+
+        async def send_with_cors(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *extra]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+def warn_base_http_middlewares(middlewares: Iterable[Middleware]):
+    for middleware in middlewares:
+        cls = middleware.cls
+        if isinstance(cls, type) and issubclass(cls, BaseHTTPMiddleware):
+            logger.warning(
+                f"{cls.__module__}.{cls.__qualname__} is a BaseHTTPMiddleware, which "
+                "runs the rest of the app in a new task for every request. "
+                "Prefer a pure ASGI middleware"
+            )
+
+
+def load_middlewares(specs: Iterable[MiddlewareSpec]) -> list[Middleware]:
+    """Import the middlewares of `WinterSettings.middlewares`, keeping their
+    order: the first one wraps all the others"""
+    middlewares: list[Middleware] = []
+    for spec in specs:
+        module = import_module(spec.module)
+        try:
+            cls = getattr(module, spec.name)
+        except AttributeError:
+            raise ImportError(f"{spec.module} has no middleware {spec.name}") from None
+        middlewares.append(Middleware(cls, **spec.args))
+    return middlewares
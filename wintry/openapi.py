@@ -0,0 +1,90 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from wintry.etags import etag_matches, make_etag
+from wintry.threadpools import get_threadpool
+
+if TYPE_CHECKING:  # pragma: no cover
+    from fastapi import FastAPI
+
+logger = logging.getLogger("logger")
+
+THREADPOOL = "openapi"
+
+
+def encode_schema(schema: dict[str, Any]) -> bytes:
+    return json.dumps(schema, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def build_schema(app: "FastAPI") -> bytes:
+    """The encoded OpenAPI schema of `app`"""
+    if app.root_path and app.root_path_in_servers:
+        if not any(server.get("url") == app.root_path for server in app.servers):
+            app.servers.insert(0, {"url": app.root_path})
+    return encode_schema(app.openapi())
+
+
+class OpenAPISchema(object):
+    """The OpenAPI schema of an app, encoded once and served as bytes with
+    an ETag.
+
+    It is loaded from `path` when given, otherwise generated in the
+    `openapi` thread pool by `start`, or by the first request for it. Requests
+    arriving meanwhile wait for it without blocking the event loop.
+    """
+
+    def __init__(self, app: "FastAPI", path: Union[str, Path, None] = None) -> None:
+        self.app = app
+        self.path = Path(path) if path is not None else None
+        self.body: Optional[bytes] = None
+        self.etag = ""
+        self._lock = Lock()
+        self._building: Optional[Future[None]] = None
+
+    def load(self, path: Union[str, Path]):
+        body = Path(path).read_bytes()
+        self.app.openapi_schema = json.loads(body)
+        self._set(body)
+
+    def build(self):
+        start = time.perf_counter()
+        self._set(build_schema(self.app))
+        logger.debug(f"OpenAPI schema built in {time.perf_counter() - start:.3f}s")
+
+    def _set(self, body: bytes):
+        self.etag = make_etag(body)
+        self.body = body
+
+    def start(self) -> Future[None]:
+        """Load or build the schema in the background, once"""
+        with self._lock:
+            building = self._building
+            # A failed attempt is retried by the next request
+            if building is None or (building.done() and building.exception()):
+                pool = get_threadpool(THREADPOOL)
+                if self.path is not None:
+                    building = pool.submit(self.load, self.path)
+                else:
+                    building = pool.submit(self.build)
+                self._building = building
+            return building
+
+    async def endpoint(self, request: Request) -> Response:
+        if self.body is None:
+            await asyncio.wrap_future(self.start())
+        assert self.body is not None
+
+        headers = {"etag": self.etag, "cache-control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
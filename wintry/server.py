@@ -0,0 +1,338 @@
+import importlib.util
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from dataclasses import dataclass, replace
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+from multiprocessing.synchronize import Event
+from typing import Any, Optional
+
+import uvicorn
+
+from wintry.settings import WinterSettings
+
+logger = logging.getLogger("logger")
+
+# Only Linux balances connections between the sockets bound to the same
+# port, elsewhere a single socket of the group gets all of them
+REUSE_PORT_BALANCES = sys.platform.startswith("linux") and hasattr(socket, "SO_REUSEPORT")
+
+
+def _get_context() -> BaseContext:
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, which inside containers or with a CPU
+    affinity set can be less than `os.cpu_count()`"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def resolve_loop(loop: str) -> str:
+    if loop == "auto":
+        return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    return loop
+
+
+def resolve_http(http: str) -> str:
+    if http == "auto":
+        return "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return http
+
+
+def bind_socket(
+    host: str, port: int, *, backlog: int, reuse_port: bool, listen: bool = True
+) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    try:
+        sock.bind((host, port))
+        if listen:
+            sock.listen(backlog)
+    except OSError:
+        sock.close()
+        raise
+    sock.set_inheritable(True)
+    return sock
+
+
+@dataclass
+class ServerOptions(object):
+    app_path: str
+    host: str
+    port: int
+    workers: int
+    loop: str
+    http: str
+    backlog: int
+    keep_alive: int
+    graceful_timeout: float
+    reuse_port: bool
+
+    @classmethod
+    def from_settings(cls, settings: WinterSettings, **overrides: Any) -> "ServerOptions":
+        """Options from `settings`, replacing those given in `overrides`
+        unless they are None. `auto` values get resolved here, so every
+        process uses the same ones."""
+        options = cls(
+            app_path=settings.app_path,
+            host=settings.host,
+            port=settings.port,
+            workers=settings.workers,
+            loop=settings.loop,
+            http=settings.http,
+            backlog=settings.backlog,
+            keep_alive=settings.keep_alive,
+            graceful_timeout=settings.graceful_timeout,
+            reuse_port=settings.reuse_port,
+        )
+        options = replace(
+            options, **{k: v for k, v in overrides.items() if v is not None}
+        )
+        return replace(
+            options,
+            workers=options.workers if options.workers > 0 else available_cpus(),
+            loop=resolve_loop(options.loop),
+            http=resolve_http(options.http),
+            reuse_port=options.reuse_port and REUSE_PORT_BALANCES,
+        )
+
+    def config(self) -> uvicorn.Config:
+        return uvicorn.Config(
+            self.app_path,
+            host=self.host,
+            port=self.port,
+            loop=self.loop,
+            http=self.http,
+            backlog=self.backlog,
+            timeout_keep_alive=self.keep_alive,
+            timeout_graceful_shutdown=math.ceil(self.graceful_timeout),
+        )
+
+
+class _Server(uvicorn.Server):
+    """Signals the launcher once it accepts connections"""
+
+    def __init__(self, config: uvicorn.Config, ready: Optional[Event]) -> None:
+        super().__init__(config)
+        self.ready = ready
+
+    async def startup(self, sockets: Optional[list[socket.socket]] = None) -> None:
+        await super().startup(sockets=sockets)
+        if self.ready is not None and not self.should_exit:
+            self.ready.set()
+
+
+def _server_main(options: ServerOptions, sock: Optional[socket.socket], ready: Event):
+    if sock is None:
+        sock = bind_socket(
+            options.host, options.port, backlog=options.backlog, reuse_port=True
+        )
+    _Server(options.config(), ready).run(sockets=[sock])
+
+
+@dataclass
+class ServerSlot(object):
+    index: int
+    process: Optional[BaseProcess] = None
+    ready: Optional[Event] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    restart_at: Optional[float] = None
+
+
+class ServerSupervisor(object):
+    """Runs `options.workers` server processes.
+
+    * With `reuse_port` every process listens on its own socket and the
+      kernel balances connections between them, avoiding the thundering
+      herd of processes accepting from a shared one. Otherwise, they all
+      share a socket bound here.
+    * SIGHUP restarts the processes one at a time, e.g. to deploy new
+      code: a replacement is started and the old process is only drained
+      once the new one accepts connections, so the app keeps serving.
+    * SIGTERM/SIGINT drain the processes, which stop accepting
+      connections and finish in-flight requests. Those still alive after
+      `graceful_timeout` seconds are killed.
+    * Crashed processes are restarted, waiting `backoff * 2 ** restarts`
+      seconds (at most `max_backoff`).
+    """
+
+    def __init__(
+        self,
+        options: ServerOptions,
+        *,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        ready_timeout: float = 60.0,
+    ) -> None:
+        self.options = options
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.ready_timeout = ready_timeout
+        self.context = _get_context()
+        self.slots = [ServerSlot(index=i) for i in range(options.workers)]
+        self.socket: Optional[socket.socket] = None
+        self.draining = False
+        self.restart_requested = False
+
+    def start_server(self, slot: ServerSlot):
+        slot.ready = self.context.Event()
+        slot.process = self.context.Process(
+            target=_server_main,
+            args=(self.options, self.socket, slot.ready),
+            name=f"wintry-server-{slot.index}",
+            daemon=False,
+        )
+        slot.process.start()
+        slot.started_at = time.monotonic()
+        slot.restart_at = None
+        logger.info(f"Started server process {slot.index} (pid {slot.process.pid})")
+
+    def stop_server(self, process: BaseProcess):
+        process.terminate()
+        process.join(self.options.graceful_timeout + 5)
+        if process.is_alive():
+            logger.warning(
+                f"Server process {process.pid} did not drain in time, killing it"
+            )
+            process.kill()
+            process.join()
+
+    def wait_ready(self, slot: ServerSlot) -> bool:
+        assert slot.process is not None and slot.ready is not None
+        deadline = time.monotonic() + self.ready_timeout
+        while time.monotonic() < deadline and not self.draining:
+            if slot.ready.wait(0.1):
+                return True
+            if not slot.process.is_alive():
+                return False
+        return False
+
+    def rolling_restart(self):
+        logger.info("Restarting server processes")
+        for slot in self.slots:
+            if self.draining:
+                return
+            old = slot.process
+            self.start_server(slot)
+            if not self.wait_ready(slot):
+                logger.error(
+                    f"Server process {slot.index} did not start, keeping the old "
+                    "processes and aborting the restart"
+                )
+                self.stop_server(slot.process)  # type: ignore
+                slot.process = old
+                return
+            if old is not None and old.is_alive():
+                self.stop_server(old)
+        logger.info("Server processes restarted")
+
+    def check_server(self, slot: ServerSlot):
+        now = time.monotonic()
+        if slot.restart_at is not None:
+            if now >= slot.restart_at:
+                self.start_server(slot)
+            return
+
+        assert slot.process is not None
+        if slot.process.is_alive():
+            if slot.restarts and now - slot.started_at > self.max_backoff:
+                slot.restarts = 0
+            return
+
+        delay = min(self.max_backoff, self.backoff * 2**slot.restarts)
+        slot.restarts += 1
+        slot.restart_at = now + delay
+        logger.warning(
+            f"Server process {slot.index} exited with code {slot.process.exitcode}, "
+            f"restarting in {delay:.1f}s"
+        )
+
+    def drain(self, *_: Any):
+        self.draining = True
+
+    def request_restart(self, *_: Any):
+        self.restart_requested = True
+
+    def alive(self) -> list[BaseProcess]:
+        return [
+            s.process
+            for s in self.slots
+            if s.process is not None and s.process.is_alive()
+        ]
+
+    def run(self):
+        options = self.options
+        if options.reuse_port:
+            # Fail here instead of in every process if the port is taken. The
+            # socket does not listen, so it never gets any connection
+            bind_socket(
+                options.host, options.port, backlog=0, reuse_port=True, listen=False
+            ).close()
+        else:
+            self.socket = bind_socket(
+                options.host, options.port, backlog=options.backlog, reuse_port=False
+            )
+
+        signal.signal(signal.SIGTERM, self.drain)
+        signal.signal(signal.SIGINT, self.drain)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.request_restart)
+
+        logger.info(
+            f"Serving {options.app_path} on {options.host}:{options.port} with "
+            f"{options.workers} processes ({options.loop}, {options.http}, "
+            f"{'SO_REUSEPORT' if options.reuse_port else 'shared socket'})"
+        )
+        for slot in self.slots:
+            self.start_server(slot)
+
+        while not self.draining:
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            for slot in self.slots:
+                self.check_server(slot)
+            time.sleep(0.2)
+
+        logger.info("Draining server processes")
+        for process in self.alive():
+            process.terminate()
+        deadline = time.monotonic() + options.graceful_timeout + 5
+        while self.alive() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        for process in self.alive():
+            logger.warning(
+                f"Server process {process.pid} did not drain in time, killing it"
+            )
+            process.kill()
+        for slot in self.slots:
+            if slot.process is not None:
+                slot.process.join()
+        if self.socket is not None:
+            self.socket.close()
+
+
+def serve(settings: WinterSettings, **overrides: Any):
+    """Run the app of `settings.app_path` for production, see
+    `ServerSupervisor`. A single process is served without a supervisor."""
+    options = ServerOptions.from_settings(settings, **overrides)
+    if options.workers == 1:
+        _Server(options.config(), None).run()
+    else:
+        ServerSupervisor(options).run()
@@ -1,11 +1,19 @@
 from enum import Enum, unique
-from importlib import import_module
+from importlib import import_module, reload
 import json
 from pathlib import Path
-from typing import Any, Dict, Optional
+import sys
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
 import pydantic as pdc
 import os
 
+from wintry.ioc.container import SnowFactory, igloo
+
+
+def _json_settings_file() -> Path:
+    return Path(os.getenv("WINTRY_SETTINGS_FILE", "config.json"))
+
 
 def json_config_settings_source(settings: pdc.BaseSettings) -> Dict[str, Any]:
     """
@@ -17,15 +25,17 @@ def json_config_settings_source(settings: pdc.BaseSettings) -> Dict[str, Any]:
     """
     encoding = settings.__config__.env_file_encoding
     try:
-        return json.loads(
-            Path(os.getenv("WINTRY_SETTINGS_FILE", "config.json")).read_text(encoding)
-        )
+        return json.loads(_json_settings_file().read_text(encoding))
     except FileNotFoundError:
         return {}
 
 
+def _py_settings_module() -> str:
+    return os.getenv("WINTRY_PY_SETTINGS_MODULE", "config:settings")
+
+
 def py_config_setting_source(settings: pdc.BaseSettings) -> Dict[str, Any]:
-    settings_module = os.getenv("WINTRY_PY_SETTINGS_MODULE", "config:settings")
+    settings_module = _py_settings_module()
     try:
         module_path, obj_name = settings_module.split(":")
         module = import_module(module_path)
@@ -60,6 +70,24 @@ class ConnectionOptions(pdc.BaseModel):
     connector: str | None = None
     extras: Any = dict()
 
+    pool_min_size: int = 0
+    """Connections opened on startup and kept open while idle"""
+
+    pool_max_size: int = 10
+    """Maximum number of connections open at once to the backend"""
+
+    pool_idle_timeout: Optional[float] = 300.0
+    """Seconds after which an idle connection is closed. `None` keeps them open"""
+
+    pool_acquire_timeout: Optional[float] = None
+    """Seconds to wait for a free connection before failing. `None` waits forever"""
+
+    pool_health_check_after: float = 30.0
+    """
+    Connections idle for at least these seconds are checked with the driver
+    `ping()` before being handed out, and replaced when they are broken.
+    """
+
 
 class TransporterSettings(pdc.BaseModel):
     transporter: TransporterType = TransporterType.redis
@@ -67,11 +95,117 @@ class TransporterSettings(pdc.BaseModel):
     service: str = "RedisMicroservice"
     connection_options: ConnectionOptions = ConnectionOptions()
 
+    prefetch_count: int = 10
+    """
+    Maximum number of unacknowledged messages a consumer holds at once.
+    Keep it close to the sum of the handlers concurrency, so messages
+    are not buffered on a busy consumer while other consumers are idle.
+    """
+
+    publish_batch_size: int = 100
+    """
+    Number of published messages whose broker confirmations are awaited
+    together. Published messages are flushed when the batch is full.
+    """
+
+    publish_flush_interval: float = 0.05
+    """
+    Seconds after which a non-full batch of published messages is flushed.
+    """
+
+    codec: str = "json"
+    """
+    Codec used to encode published messages: `json`, `msgpack` or `compact`.
+    Consumers pick the codec from each message content type, so services
+    using different codecs can still talk to each other.
+    """
+
+    idempotency_url: Optional[str] = None
+    """
+    Redis url where idempotency keys of handled messages are stored, so every
+    worker skips duplicates. When not set, each process remembers its own
+    most recent `idempotency_cache_size` keys.
+    """
+
+    idempotency_cache_size: int = 10000
+    """Number of idempotency keys kept by the in process store"""
+
+    idempotency_ttl: int = 86400
+    """Seconds an idempotency key is remembered by the Redis store"""
+
 
 class Middleware(pdc.BaseModel):
     module: str
     name: str
-    args: dict[str, Any]
+    args: dict[str, Any] = {}
+
+
+class ConcurrencyLimit(pdc.BaseModel):
+    """
+    Bounds the requests served at the same time, adapting the bound to the
+    observed latency. Requests over it wait in a bounded queue and are
+    answered with a 503 when it is full or they wait too long.
+    """
+
+    algorithm: str = "gradient"
+    """
+    How the limit adapts: `gradient` compares recent latency with the long
+    term one, `aimd` adds 1 per round of requests under `latency_threshold`
+    and cuts it by `backoff_ratio` otherwise, `fixed` keeps `initial_limit`.
+    """
+
+    initial_limit: int = 20
+    min_limit: int = 1
+    max_limit: int = 1000
+
+    max_queue: int = 50
+    """Requests waiting for a slot, over it requests are rejected at once"""
+
+    queue_timeout: float = 1.0
+    """Seconds a request waits for a slot before being rejected"""
+
+    retry_after: int = 1
+    """Seconds clients are told to wait before retrying a rejected request"""
+
+    smoothing: float = 0.2
+    """How fast the `gradient` limit moves towards a new estimate, from 0 to 1"""
+
+    tolerance: float = 1.5
+    """Latency increase the `gradient` algorithm tolerates before cutting the limit"""
+
+    latency_threshold: float = 0.5
+    """Seconds over which the `aimd` algorithm cuts the limit"""
+
+    backoff_ratio: float = 0.9
+    """Ratio the `aimd` limit is multiplied by on slow or failed requests"""
+
+
+class Compression(pdc.BaseModel):
+    """
+    Compression of response bodies, negotiated with `Accept-Encoding`.
+    `br` needs `brotli` and `zstd` needs `zstandard`, installed with
+    `pip install wintry[compression]`. Encodings whose library is missing
+    are skipped.
+    """
+
+    encodings: list[str] = ["br", "zstd", "gzip"]
+    """Encodings offered, from the most to the least preferred"""
+
+    minimum_size: int = 1024
+    """Smaller bodies are sent as they are"""
+
+    thread_threshold: int = 256 * 1024
+    """Bodies from this size on are compressed in the `compression` thread pool"""
+
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    zstd_level: int = 3
+
+    cache_size: int = 32 * 1024 * 1024
+    """
+    Bytes of compressed bodies kept for `cacheable` routes, so repeated
+    responses are not compressed again
+    """
 
 
 class BackendOptions(pdc.BaseModel):
@@ -109,6 +243,59 @@ class WinterSettings(pdc.BaseSettings):
     repositories, etc
     """
 
+    autodiscovery_include: list[str] = ["*.py"]
+    """
+    Glob patterns, relative to each of `modules`, of the files autodiscovery
+    may import. `*` also matches `/`, so `*.py` matches every python file.
+    """
+
+    autodiscovery_exclude: list[str] = [
+        ".*",
+        "*/.*",
+        "tests/*",
+        "*/tests/*",
+        "test_*.py",
+        "*/test_*.py",
+        "migrations/*",
+        "*/migrations/*",
+        "scripts/*",
+        "*/scripts/*",
+    ]
+    """Glob patterns of files and directories autodiscovery never looks into"""
+
+    autodiscovery_markers: list[str] = [
+        "controller",
+        "provider",
+        "scoped",
+        "microservice",
+    ]
+    """
+    Autodiscovery only imports the files using one of these decorators. Set
+    it to an empty list to import every included file.
+    """
+
+    openapi_path: Optional[str] = None
+    """
+    Schema written by `wintry build-openapi`. When set, the app serves it
+    instead of generating its own, so it must be rebuilt with the code.
+    """
+
+    openapi_prebuild: bool = True
+    """
+    Generate the schema in a background thread on startup, so the first
+    request for it does not wait for it
+    """
+
+    manifest_path: Optional[str] = None
+    """
+    Manifest written by `wintry build-manifest`. When set, autodiscovery
+    imports the modules it lists instead of scanning `modules`, unless the
+    manifest is stale.
+    """
+
+    manifest_import_threads: int = 0
+    """Threads importing the modules of the manifest, 0 imports them in order"""
+
     ensure_metadata: bool = False
 
     modules: list[str] = ["."]
@@ -121,7 +308,7 @@ class WinterSettings(pdc.BaseSettings):
     middlewares: list[Middleware] = [
         Middleware(
             name="CORSMiddleware",
-            module="fastapi.middleware.cors",
+            module="wintry.middlewares",
             args={
                 "allow_origins": ["*"],
                 "allow_credentials": True,
@@ -133,7 +320,10 @@ class WinterSettings(pdc.BaseSettings):
     """
     List of middlewares to use in the application. Middlewares should
     conform to FastAPI, as them would be constructed and added directly
-    to FastAPI instnace.
+    to FastAPI instnace. The first one wraps all the others, including
+    the ones given to `App`. Prefer pure ASGI middlewares over
+    `BaseHTTPMiddleware` subclasses, which run the rest of the app in a
+    new task for every request.
     """
 
     app_path: str = "main:api"
@@ -169,6 +359,54 @@ class WinterSettings(pdc.BaseSettings):
     hot_reload: bool = True
     """Enabled hot reloading. Disable this for production environments"""
 
+    log_level: str = "INFO"
+    """Level of the Wintry logger"""
+
+    log_json: bool = False
+    """Write logs as JSON lines, for log collectors, instead of plain text"""
+
+    concurrency_limit: Optional[ConcurrencyLimit] = None
+    """
+    Limit of the requests the app serves at the same time. Controllers and
+    routes can have their own with the `concurrency` argument.
+    """
+
+    compression: Optional[Compression] = None
+    """Compress responses, not done when not set"""
+
+    threadpools: dict[str, int] = {"default": 40, "dispose": 8}
+    """
+    Threads of each named pool. `default` runs the sync endpoints of
+    controllers without a `threadpool` of their own, `dispose` runs the sync
+    `dispose()` of scoped dependencies. Pools not listed get the size of
+    `default`.
+    """
+
+    workers: int = 0
+    """Server processes started by `wintry serve`, 0 starts one per available CPU"""
+
+    backlog: int = 2048
+    """Connections the kernel queues for each listening socket"""
+
+    keep_alive: int = 5
+    """Seconds an idle HTTP connection is kept open"""
+
+    reuse_port: bool = True
+    """
+    Let every server process bind its own socket with `SO_REUSEPORT`, so
+    the kernel balances connections between them. Where the option is not
+    available, processes share the socket of the launcher.
+    """
+
+    loop: str = "auto"
+    """Event loop of the server, `auto` uses `uvloop` when installed"""
+
+    http: str = "auto"
+    """HTTP protocol implementation, `auto` uses `httptools` when installed"""
+
+    graceful_timeout: float = 30.0
+    """Seconds server processes have to finish in-flight requests on shutdown"""
+
     transporters: list[TransporterSettings] = []
     """
     This config is specific to microservices comunication.
@@ -188,3 +426,93 @@ class WinterSettings(pdc.BaseSettings):
                 json_config_settings_source,
                 file_secret_settings,
             )
+
+
+class SettingsProvider(object):
+    """Process wide `WinterSettings`, parsed once from all their sources.
+
+    Building `WinterSettings` imports the python settings module, reads the
+    `.env` and json files and validates everything, so instead of doing it
+    for every service that needs them, `get()` returns the same instance
+    without any I/O. Call `reload()` to parse them again if any of those
+    files changed since.
+
+    `igloo` resolves `WinterSettings` through the global `settings_provider`,
+    so providers get the reloaded settings from then on.
+    """
+
+    def __init__(self, factory: Callable[[], WinterSettings] = WinterSettings) -> None:
+        self.factory = factory
+        self._settings: Optional[WinterSettings] = None
+        self._mtimes: dict[Path, Optional[int]] = {}
+        self._lock = Lock()
+
+    def get(self) -> WinterSettings:
+        if (settings := self._settings) is not None:
+            return settings
+        with self._lock:
+            if self._settings is None:
+                self._load()
+            return self._settings  # type: ignore
+
+    __call__ = get
+
+    def _watched_files(self) -> list[Path]:
+        env_file = Path(WinterSettings.__config__.env_file)  # type: ignore
+        files = [_json_settings_file(), env_file]
+        module = sys.modules.get(_py_settings_module().split(":")[0])
+        if module is not None and getattr(module, "__file__", None):
+            files.append(Path(module.__file__))  # type: ignore
+        return files
+
+    @staticmethod
+    def _mtime(path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        self._settings = self.factory()
+        self._mtimes = {path: self._mtime(path) for path in self._watched_files()}
+
+    def changed(self) -> list[Path]:
+        """Settings files modified, created or removed since the last load"""
+        return [
+            path
+            for path in self._watched_files()
+            if self._mtimes.get(path) != self._mtime(path)
+        ]
+
+    def reload(self, force: bool = False) -> WinterSettings:
+        """Parse the settings again if their files changed, or always with
+        `force`, and return the current ones"""
+        with self._lock:
+            if self._settings is None:
+                self._load()
+                return self._settings  # type: ignore
+
+            changed = self.changed()
+            if not (force or changed):
+                return self._settings
+            module = sys.modules.get(_py_settings_module().split(":")[0])
+            if module is not None and (force or Path(module.__file__ or "") in changed):
+                reload(module)
+            self._load()
+            return self._settings  # type: ignore
+
+    def clear(self):
+        with self._lock:
+            self._settings = None
+            self._mtimes = {}
+
+
+settings_provider = SettingsProvider()
+# A factory and not a singleton, so the container hands out the settings
+# after a reload instead of caching the first ones
+igloo[WinterSettings] = SnowFactory(settings_provider.get)
+
+
+def get_settings() -> WinterSettings:
+    """The settings of the process, see `SettingsProvider`"""
+    return settings_provider.get()
@@ -0,0 +1,123 @@
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Mapping, TypeVar, Union
+
+T = TypeVar("T")
+
+DEFAULT = "default"
+"""Pool of the sync endpoints of controllers without a `threadpool`"""
+
+DISPOSE = "dispose"
+"""Pool running the sync `dispose()` of scoped dependencies"""
+
+
+class ThreadPool(object):
+    """A named thread pool for blocking work, keeping count of what it runs.
+
+    `queued` tasks are waiting for a free thread: a pool that keeps them
+    while `utilization` stays at 1 is too small for its load.
+    """
+
+    def __init__(self, name: str, max_workers: int) -> None:
+        if max_workers < 1:
+            raise ValueError(f"Thread pool {name} needs at least one worker")
+        self.name = name
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix=f"wintry-{name}"
+        )
+        self._lock = Lock()
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    async def run(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Run `fn` in the pool, with a copy of the current context so scoped
+        dependencies can still be resolved from it"""
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, fn, *args, **kwargs)
+        queued_at = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._measure, call, queued_at
+        )
+
+    def submit(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> Future[T]:
+        """Like `run`, without waiting for the result nor needing a loop"""
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, fn, *args, **kwargs)
+        with self._lock:
+            self.submitted += 1
+        return self.executor.submit(self._measure, call, time.perf_counter())
+
+    def _measure(self, call: Callable[[], T], queued_at: float) -> T:
+        start = time.perf_counter()
+        with self._lock:
+            self.started += 1
+            self.wait_seconds += start - queued_at
+        try:
+            return call()
+        finally:
+            with self._lock:
+                self.completed += 1
+                self.busy_seconds += time.perf_counter() - start
+
+    def stats(self) -> dict[str, Union[str, int, float]]:
+        with self._lock:
+            active = self.started - self.completed
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "active": active,
+                "queued": self.submitted - self.started,
+                "completed": self.completed,
+                "utilization": active / self.max_workers,
+                "busy_seconds": self.busy_seconds,
+                "wait_seconds": self.wait_seconds,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+
+# Same default as ThreadPoolExecutor
+_default_size = min(32, (os.cpu_count() or 1) + 4)
+_sizes: dict[str, int] = {}
+_pools: dict[str, ThreadPool] = {}
+_pools_lock = Lock()
+
+
+def get_threadpool(name: str = DEFAULT) -> ThreadPool:
+    """The pool called `name`, created on first use with its configured size"""
+    try:
+        return _pools[name]
+    except KeyError:
+        with _pools_lock:
+            if name not in _pools:
+                size = _sizes.get(name, _sizes.get(DEFAULT, _default_size))
+                _pools[name] = ThreadPool(name, size)
+            return _pools[name]
+
+
+def configure_threadpools(sizes: Mapping[str, int]):
+    """Set the number of threads of the pools by name. Pools already running
+    with another size are replaced, letting their current tasks finish"""
+    with _pools_lock:
+        _sizes.update(sizes)
+        for name, pool in list(_pools.items()):
+            size = _sizes.get(name, _sizes.get(DEFAULT, _default_size))
+            if pool.max_workers != size:
+                del _pools[name]
+                pool.shutdown(wait=False)
+
+
+def threadpool_stats() -> list[dict[str, Union[str, int, float]]]:
+    return [pool.stats() for pool in list(_pools.values())]
@@ -0,0 +1,162 @@
+import dataclasses
+import sys
+from typing import Any, Callable, TypeVar, overload
+
+from wintry.generators import CodeGenerator, code_gen
+from wintry.utils.keys import __winter_modified_entity_state__, __winter_tracker__
+from wintry.utils.type_helpers import ModelError
+
+T = TypeVar("T")
+
+
+def is_tracked(obj: Any) -> bool:
+    return getattr(type(obj), __winter_tracker__, None) is not None
+
+
+def _state(obj: Any) -> dict[str, Any]:
+    return getattr(obj, __winter_modified_entity_state__, None) or {}
+
+
+def _related(obj: Any) -> dict[str, str]:
+    return getattr(type(obj), __winter_tracker__)
+
+
+def _changed_related(obj: Any) -> dict[str, Any]:
+    """Related fields modified in place, with their own diff"""
+    changes: dict[str, Any] = {}
+    state = _state(obj)
+    for name, kind in _related(obj).items():
+        if name in state:
+            continue
+        value = getattr(obj, name, None)
+        if value is None:
+            continue
+        if kind == "model":
+            if is_tracked(value) and (nested := diff(value)):
+                changes[name] = nested
+        elif any(is_tracked(item) and dirty_fields(item) for item in value):
+            # Lists are replaced as a whole
+            changes[name] = value
+    return changes
+
+
+def dirty_fields(obj: Any) -> set[str]:
+    """Names of the fields of a tracked model that changed since it was
+    created or last marked clean, including related models changed in place"""
+    return set(_state(obj)) | set(_changed_related(obj))
+
+
+def diff(obj: Any) -> dict[str, Any]:
+    """Current values of the changed fields of a tracked model.
+
+    Related models changed in place contribute their own diff, and lists
+    of related models with any changed item are included whole. This
+    is what a partial update needs to write.
+    """
+    changes = {name: getattr(obj, name) for name in _state(obj)}
+    changes.update(_changed_related(obj))
+    return changes
+
+
+def original_values(obj: Any) -> dict[str, Any]:
+    """Values the changed fields had before being modified"""
+    return dict(_state(obj))
+
+
+def mark_clean(obj: Any) -> None:
+    """Forget the changes of a tracked model and its related models, e.g.
+    after they were persisted"""
+    state = getattr(obj, __winter_modified_entity_state__, None)
+    if state is not None:
+        state.clear()
+    for name, kind in _related(obj).items():
+        value = getattr(obj, name, None)
+        if value is None:
+            continue
+        for item in [value] if kind == "model" else value:
+            if is_tracked(item):
+                mark_clean(item)
+
+
+@overload
+def track(cls: type[T], /) -> type[T]:
+    ...
+
+
+@overload
+def track(cls: None = None, /) -> Callable[[type[T]], type[T]]:
+    ...
+
+
+def track(cls: type[T] | None = None, /) -> type[T] | Callable[[type[T]], type[T]]:
+    """
+    Track changes of a dataclass (or `@dto`) model.
+
+    A generated `__setattr__` records the fields assigned a different value
+    after `__init__`, by `map()` or by plain attribute assignment, so
+    persistence layers can write just those with `dirty_fields()`, `diff()`
+    and `mark_clean()`. Mutating a list in place is not seen, assign a new
+    list instead.
+
+    Slotted classes get a subclass with an extra slot for the tracker state.
+
+    Example
+    =======
+
+    >>> @track
+    >>> @dataclass
+    >>> class User:
+    >>>     id: int
+    >>>     name: str
+    >>>
+    >>> user = User(id=1, name="Jon")
+    >>> user.map({"id": 1, "name": "Arya"})
+    >>> diff(user)
+    >>> {'name': 'Arya'}
+    """
+
+    def make_tracked(_cls: type[T]) -> type[T]:
+        if not dataclasses.is_dataclass(_cls):
+            raise ModelError(f"{_cls.__name__} must be a dataclass to be tracked")
+        params = getattr(_cls, "__dataclass_params__")
+        if params.frozen:
+            raise ModelError(f"{_cls.__name__} is frozen, there is nothing to track")
+
+        if "__slots__" in vars(_cls):
+            _cls = type(  # type: ignore
+                _cls.__name__,
+                (_cls,),
+                {
+                    "__slots__": (__winter_modified_entity_state__,),
+                    "__module__": _cls.__module__,
+                    "__qualname__": _cls.__qualname__,
+                    "__doc__": _cls.__doc__,
+                },
+            )
+
+        globs = vars(sys.modules[_cls.__module__])
+        locs = {_cls.__name__: _cls}
+        code_gen.compile_tracker(_cls, globs, locs)
+
+        init = _cls.__init__
+
+        def __init__(self: Any, *args: Any, **kwargs: Any) -> None:
+            init(self, *args, **kwargs)
+            # Start tracking once every field got its initial value
+            object.__setattr__(self, __winter_modified_entity_state__, {})
+
+        __init__.__wrapped__ = init  # type: ignore
+        setattr(_cls, "__init__", __init__)
+
+        related = {}
+        for f in dataclasses.fields(_cls):
+            kind, _ = CodeGenerator._field_kind(f.type, globs, locs)
+            if kind in ("model", "model_list"):
+                related[f.name] = kind
+        setattr(_cls, __winter_tracker__, related)
+        return _cls
+
+    if cls is None:
+        return make_tracked
+
+    return make_tracked(cls)
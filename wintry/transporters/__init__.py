@@ -0,0 +1,295 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from importlib import import_module
+from inspect import isawaitable
+from typing import Any, Callable, Optional
+from uuid import uuid4
+
+from wintry.microservices import EventHandlerOptions, TransportControllerRegistry
+from wintry.ioc.container import IGlooContainer, igloo
+from wintry.settings import TransporterSettings
+from wintry.transporters.codecs import CodecRegistry, EncodedMessage
+from wintry.transporters.idempotency import IdempotencyStore, make_idempotency_store
+from wintry.utils.keys import __winter_microservice_event_options__
+from wintry.utils.model_binding import bind_payload_to, get_payload_type_for
+
+
+PUBLISHED_AT_HEADER = "x-wintry-published-at"
+IDEMPOTENCY_HEADER = "x-wintry-idempotency-key"
+ATTEMPT_HEADER = "x-wintry-attempt"
+EVENT_HEADER = "x-wintry-event"
+ERROR_HEADER = "x-wintry-error"
+
+
+class TransporterError(Exception):
+    pass
+
+
+@dataclass
+class EventStats(object):
+    """Counters of an event handler, since the last time they were collected"""
+
+    processed: int = 0
+    failed: int = 0
+    duplicates: int = 0
+    lag_total: float = 0.0
+    lag_max: float = 0.0
+
+    def record(self, lag: Optional[float], failed: bool = False):
+        self.processed += 1
+        if failed:
+            self.failed += 1
+        if lag is not None:
+            self.lag_total += lag
+            self.lag_max = max(self.lag_max, lag)
+
+    def merge(self, other: "EventStats"):
+        self.processed += other.processed
+        self.failed += other.failed
+        self.duplicates += other.duplicates
+        self.lag_total += other.lag_total
+        self.lag_max = max(self.lag_max, other.lag_max)
+
+    @property
+    def lag_avg(self) -> float:
+        return self.lag_total / self.processed if self.processed else 0.0
+
+
+def _lag_since(published_at: Any) -> Optional[float]:
+    try:
+        return max(0.0, time.time() - float(published_at))
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class EventHandler(object):
+    """An `@on` decorated method of a `@microservice`, ready to be dispatched"""
+
+    event: str
+    service: type
+    method: Callable[..., Any]
+    payload_type: Any
+    options: EventHandlerOptions
+    limiter: Optional[asyncio.Semaphore] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.options.concurrency is not None:
+            self.limiter = asyncio.Semaphore(self.options.concurrency)
+
+    def bind(self, payload: Any) -> Any:
+        if isinstance(self.payload_type, type) and isinstance(payload, self.payload_type):
+            return payload
+        return bind_payload_to(payload, self.payload_type)
+
+
+class Microservice(ABC):
+    """Base class for transporters.
+
+    A transporter connects to a broker, consumes the events registered with
+    `@on` in the `@microservice` configured for `settings.transporter` and
+    dispatches them. It also publishes events to other services.
+
+    Implementations are loaded from `TransporterSettings.driver` and
+    `TransporterSettings.service`, see :func:`load_microservice`.
+    """
+
+    def __init__(
+        self, settings: TransporterSettings, container: IGlooContainer = igloo
+    ) -> None:
+        self.settings = settings
+        self.container = container
+        self.logger = logging.getLogger("logger")
+        self.codecs = CodecRegistry(settings.codec)
+        self.stats: dict[str, EventStats] = {}
+        self.idempotency: IdempotencyStore = make_idempotency_store(settings)
+        # Identifies this consumer inside the group of processes that
+        # share the service queues. Worker supervisors override it with
+        # a name that is stable across restarts.
+        self.consumer_name = f"{socket.gethostname()}.{os.getpid()}"
+        self.handlers: dict[str, EventHandler] = self.get_handlers()
+
+    def get_handlers(self) -> dict[str, EventHandler]:
+        service = TransportControllerRegistry.get_controller_for_transporter(
+            self.settings.transporter
+        )
+        if service is None:
+            return {}
+
+        handlers: dict[str, EventHandler] = {}
+        events = TransportControllerRegistry.get_events_for_transporter(service)
+        for event, method in events.items():
+            handlers[event] = EventHandler(
+                event=event,
+                service=service,
+                method=method,
+                payload_type=get_payload_type_for(method),
+                options=getattr(
+                    method, __winter_microservice_event_options__, EventHandlerOptions()
+                ),
+            )
+
+        return handlers
+
+    def encode(
+        self, payload: Any, idempotency_key: Optional[str] = None
+    ) -> EncodedMessage:
+        encoded = self.codecs.default.encode(payload)
+        encoded.headers[PUBLISHED_AT_HEADER] = repr(time.time())
+        # Broker redeliveries carry the same key, producers that retry a
+        # publish should pass their own key to get the same guarantee
+        encoded.headers[IDEMPOTENCY_HEADER] = idempotency_key or uuid4().hex
+        return encoded
+
+    def decode(
+        self,
+        handler: EventHandler,
+        body: bytes,
+        content_type: Optional[str],
+        headers: Optional[dict[str, Any]] = None,
+    ) -> Any:
+        # The codec is negotiated per message, so producers can switch
+        # formats without coordinating a deploy with the consumers
+        codec = self.codecs.for_content_type(content_type)
+        return codec.decode(body, handler.payload_type, headers or {})
+
+    async def dispatch(self, handler: EventHandler, payload: Any) -> Any:
+        # Each message gets its own container scope, like a web request
+        # does, unless it is part of a batch that already opened one
+        if self.container.in_scope():
+            return await self._call(handler, payload)
+        async with self.container.scoped():
+            return await self._call(handler, payload)
+
+    async def _call(self, handler: EventHandler, payload: Any) -> Any:
+        # Services are built per message, so their dependencies
+        # get resolved by the container on each dispatch
+        service = handler.service()
+        result = handler.method(service, handler.bind(payload))
+        if isawaitable(result):
+            result = await result
+        return result
+
+    async def handle_message(
+        self,
+        handler: EventHandler,
+        body: bytes,
+        content_type: Optional[str],
+        headers: Optional[dict[str, Any]] = None,
+    ):
+        """Decode and dispatch a received message, keeping the handler stats.
+
+        Transporters call this for each delivery, and acknowledge the
+        message when it returns. Any exception means the message failed.
+        """
+        headers = headers or {}
+        lag = _lag_since(headers.get(PUBLISHED_AT_HEADER))
+        if (stats := self.stats.get(handler.event)) is None:
+            stats = self.stats[handler.event] = EventStats()
+
+        key = headers.get(IDEMPOTENCY_HEADER) if handler.options.idempotent else None
+        if key is not None and await self.idempotency.seen(key):
+            stats.duplicates += 1
+            return
+
+        try:
+            payload = self.decode(handler, body, content_type, headers)
+            await self.dispatch(handler, payload)
+        except Exception:
+            stats.record(lag, failed=True)
+            raise
+        stats.record(lag)
+
+        if key is not None:
+            await self.idempotency.add(key)
+
+    async def handle_batch(
+        self,
+        handler: EventHandler,
+        messages: list[tuple[bytes, Optional[str], Optional[dict[str, Any]]]],
+    ) -> list[Optional[Exception]]:
+        """Handle `(body, content_type, headers)` messages inside a single
+        container scope, so scoped dependencies (a unit of work, a session)
+        are shared by the whole batch and disposed once at the end.
+
+        Returns the error of each message, or `None` for those that succeeded.
+        """
+        errors: list[Optional[Exception]] = []
+        async with self.container.scoped():
+            for body, content_type, headers in messages:
+                try:
+                    await self.handle_message(handler, body, content_type, headers)
+                except Exception as e:
+                    errors.append(e)
+                else:
+                    errors.append(None)
+        return errors
+
+    def next_attempt(
+        self, handler: EventHandler, headers: Optional[dict[str, Any]]
+    ) -> Optional[tuple[int, float]]:
+        """Number and delay of the next attempt for a failed message, or
+        `None` if it must not be retried"""
+        retry = handler.options.retry
+        if retry is None:
+            return None
+
+        attempt = int((headers or {}).get(ATTEMPT_HEADER, 1))
+        if attempt >= retry.max_attempts:
+            return None
+        return attempt + 1, retry.delay(attempt)
+
+    def dead_letter_headers(
+        self, handler: EventHandler, headers: Optional[dict[str, Any]], error: Exception
+    ) -> dict[str, Any]:
+        return {
+            **(headers or {}),
+            EVENT_HEADER: handler.event,
+            ERROR_HEADER: repr(error),
+        }
+
+    def collect_stats(self) -> dict[str, EventStats]:
+        """Return the stats gathered since the previous call and reset them"""
+        stats, self.stats = self.stats, {}
+        return stats
+
+    @abstractmethod
+    async def init(self) -> None:
+        """Connect to the broker and declare the needed topology"""
+        ...
+
+    @abstractmethod
+    async def run(self) -> None:
+        """Consume events until `close()` is called"""
+        ...
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Stop consuming, drain in-flight messages and disconnect"""
+        ...
+
+    @abstractmethod
+    async def publish(
+        self, event: str, payload: Any, idempotency_key: Optional[str] = None
+    ) -> None:
+        """Send `payload` to every consumer of `event`"""
+        ...
+
+
+def load_microservice(
+    settings: TransporterSettings, container: IGlooContainer = igloo
+) -> Microservice:
+    try:
+        module = import_module(settings.driver)
+        service_cls = getattr(module, settings.service)
+    except (ImportError, AttributeError) as e:
+        raise TransporterError(
+            f"Could not load {settings.service} from {settings.driver}: {e}"
+        ) from e
+
+    return service_cls(settings, container)
@@ -0,0 +1,319 @@
+import asyncio
+from typing import Any, Optional
+
+from wintry.ioc.container import IGlooContainer, igloo
+from wintry.settings import TransporterSettings
+from wintry.transporters import (
+    ATTEMPT_HEADER,
+    EventHandler,
+    Microservice,
+    TransporterError,
+)
+from wintry.utils.pool import Pool
+
+AMQP_DEFAULT_PORT = 5672
+
+
+class PublishError(TransporterError):
+    pass
+
+
+def _import_driver():
+    try:
+        import aio_pika
+    except ImportError as e:  # pragma: no cover
+        raise TransporterError(
+            "AMQP transporter requires `aio-pika`. "
+            "Install it with `pip install wintry[amqp]`"
+        ) from e
+    return aio_pika
+
+
+class AMQPMicroservice(Microservice):
+    """Transporter for RabbitMQ (or any AMQP 0.9.1 broker), backed by `aio-pika`.
+
+    Each `@on` event gets a durable queue bound to a topic exchange with the
+    event name as routing key, so processes of the same service share the
+    queue and compete for its messages.
+
+    Tuning:
+        * `settings.prefetch_count` bounds the unacknowledged messages held by
+          the consumer channel.
+        * `@on(event, concurrency=n)` bounds the in-flight messages per handler.
+        * Publisher confirms are awaited in batches of `settings.publish_batch_size`,
+          or every `settings.publish_flush_interval` seconds.
+        * `connection_options.extras` accepts `exchange`, `queue_prefix`,
+          `connection_pool_size` and `channel_pool_size`.
+
+    Handlers with a retry policy get a `<queue>.retry` queue. Failed messages
+    wait there, with the backoff as per-message TTL, until the broker
+    dead-letters them back into the handler queue. Nothing is held in
+    memory meanwhile. Note that RabbitMQ only expires messages at the head
+    of a queue, so a long backoff may delay shorter ones queued behind it.
+
+    `driver` defaults to the `aio_pika` module, and can be replaced by any object
+    with the same interface, which is handy for testing without a broker.
+    """
+
+    def __init__(
+        self,
+        settings: TransporterSettings,
+        container: IGlooContainer = igloo,
+        driver: Any = None,
+    ) -> None:
+        super().__init__(settings, container)
+        self.driver = driver
+        extras: dict[str, Any] = settings.connection_options.extras or {}
+        self.exchange_name: str = extras.get("exchange", "wintry")
+        self.queue_prefix: str = extras.get("queue_prefix", self.exchange_name)
+        self.connection_pool: Pool[Any] = Pool(
+            self._connect,
+            max_size=extras.get("connection_pool_size", 2),
+            dispose=lambda connection: connection.close(),
+        )
+        self.channel_pool: Pool[Any] = Pool(
+            self._open_channel,
+            max_size=extras.get("channel_pool_size", 10),
+            dispose=lambda pair: pair[0].close(),
+        )
+        self._consumer_channel: Any = None
+        self._consumers: list[tuple[Any, str]] = []
+        self._in_flight: set[asyncio.Task] = set()
+        self._unconfirmed: list[asyncio.Future] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._closing = asyncio.Event()
+
+    @property
+    def url(self) -> str:
+        options = self.settings.connection_options
+        if options.url is not None:
+            return options.url
+
+        # ConnectionOptions port defaults to mongo's port, so only
+        # honor it when explicitly configured
+        port = options.port if "port" in options.__fields_set__ else AMQP_DEFAULT_PORT
+        user = options.user or "guest"
+        password = options.password or "guest"
+        return f"amqp://{user}:{password}@{options.host}:{port}/"
+
+    async def _connect(self) -> Any:
+        return await self.driver.connect_robust(self.url)
+
+    async def _declare_exchange(self, channel: Any) -> Any:
+        return await channel.declare_exchange(
+            self.exchange_name, self.driver.ExchangeType.TOPIC, durable=True
+        )
+
+    async def _open_channel(self) -> tuple[Any, Any]:
+        async with self.connection_pool.acquire() as connection:
+            channel = await connection.channel(publisher_confirms=True)
+        return channel, await self._declare_exchange(channel)
+
+    async def init(self) -> None:
+        if self.driver is None:
+            self.driver = _import_driver()
+
+        async with self.connection_pool.acquire() as connection:
+            self._consumer_channel = await connection.channel()
+        await self._consumer_channel.set_qos(prefetch_count=self.settings.prefetch_count)
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    def _queue_name(self, event: str) -> str:
+        return f"{self.queue_prefix}.{event}"
+
+    def _retry_queue_name(self, event: str) -> str:
+        return f"{self._queue_name(event)}.retry"
+
+    async def run(self) -> None:
+        exchange = await self._declare_exchange(self._consumer_channel)
+        for event, handler in self.handlers.items():
+            queue = await self._consumer_channel.declare_queue(
+                self._queue_name(event), durable=True
+            )
+            await queue.bind(exchange, routing_key=event)
+            if handler.options.retry is not None:
+                await self._consumer_channel.declare_queue(
+                    self._retry_queue_name(event),
+                    durable=True,
+                    arguments={
+                        "x-dead-letter-exchange": "",
+                        "x-dead-letter-routing-key": self._queue_name(event),
+                    },
+                )
+            consumer_tag = await queue.consume(
+                self._consumer_for(handler), consumer_tag=f"{self.consumer_name}.{event}"
+            )
+            self._consumers.append((queue, consumer_tag))
+
+        # Dead letters are published to the topic exchange, where nothing
+        # would route them unless this service also consumes them
+        dead_letters = {
+            handler.options.dead_letter
+            for handler in self.handlers.values()
+            if handler.options.dead_letter is not None
+        }
+        for routing_key in sorted(dead_letters - set(self.handlers)):
+            queue = await self._consumer_channel.declare_queue(
+                self._queue_name(routing_key), durable=True
+            )
+            await queue.bind(exchange, routing_key=routing_key)
+
+        await self._closing.wait()
+
+    def _consumer_for(self, handler: EventHandler):
+        async def on_message(message: Any):
+            # Handle each delivery on its own task, so a slow handler does
+            # not block deliveries for the others. Prefetch bounds how many
+            # of these are alive at once.
+            task = asyncio.create_task(self._process(handler, message))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+        return on_message
+
+    async def _process(self, handler: EventHandler, message: Any):
+        if handler.limiter is None:
+            await self._handle(handler, message)
+        else:
+            async with handler.limiter:
+                await self._handle(handler, message)
+
+    async def _handle(self, handler: EventHandler, message: Any):
+        try:
+            await self.handle_message(
+                handler, message.body, message.content_type, message.headers
+            )
+        except Exception as e:
+            self.logger.exception(f"Handler for {handler.event} failed")
+            await self._on_failure(handler, message, e)
+        else:
+            await message.ack()
+
+    async def _on_failure(self, handler: EventHandler, message: Any, error: Exception):
+        headers = dict(message.headers or {})
+        try:
+            if (next_attempt := self.next_attempt(handler, headers)) is not None:
+                attempt, delay = next_attempt
+                headers[ATTEMPT_HEADER] = attempt
+                await self._publish_confirmed(
+                    self._retry_queue_name(handler.event),
+                    message,
+                    headers,
+                    expiration=delay,
+                    default_exchange=True,
+                )
+            elif handler.options.dead_letter is not None:
+                await self._publish_confirmed(
+                    handler.options.dead_letter,
+                    message,
+                    self.dead_letter_headers(handler, headers, error),
+                )
+            else:
+                await message.nack(requeue=False)
+                return
+        except Exception:
+            # The copy did not make it to the broker, so keep the original
+            self.logger.exception(f"Could not reschedule failed {handler.event} message")
+            await message.nack(requeue=True)
+            return
+
+        # The copy is safe in the broker, the original can go
+        await message.ack()
+
+    async def _publish_confirmed(
+        self,
+        routing_key: str,
+        original: Any,
+        headers: dict[str, Any],
+        expiration: Optional[float] = None,
+        default_exchange: bool = False,
+    ):
+        message = self.driver.Message(
+            original.body,
+            content_type=original.content_type,
+            headers=headers,
+            delivery_mode=self.driver.DeliveryMode.PERSISTENT,
+            expiration=expiration,
+        )
+        async with self.channel_pool.acquire() as (channel, exchange):
+            target = channel.default_exchange if default_exchange else exchange
+            confirmation = await target.publish(message, routing_key=routing_key)
+        if getattr(confirmation, "name", None) == "Basic.Nack":
+            raise PublishError(f"Broker rejected message for {routing_key}")
+
+    async def publish(
+        self, event: str, payload: Any, idempotency_key: Optional[str] = None
+    ) -> None:
+        encoded = self.encode(payload, idempotency_key)
+        message = self.driver.Message(
+            encoded.body,
+            content_type=encoded.content_type,
+            headers=encoded.headers,
+            delivery_mode=self.driver.DeliveryMode.PERSISTENT,
+        )
+        async with self.channel_pool.acquire() as (_, exchange):
+            # Do not wait for the broker confirmation here, it gets
+            # collected with the rest of the batch on flush()
+            confirmation = asyncio.ensure_future(
+                exchange.publish(message, routing_key=event)
+            )
+        self._unconfirmed.append(confirmation)
+
+        if len(self._unconfirmed) >= self.settings.publish_batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Wait for the broker to confirm every pending published message.
+
+        Raises:
+            PublishError: If any message of the batch was rejected or lost.
+        """
+        if not self._unconfirmed:
+            return
+
+        pending, self._unconfirmed = self._unconfirmed, []
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        failures = [
+            r
+            for r in results
+            if isinstance(r, BaseException) or getattr(r, "name", None) == "Basic.Nack"
+        ]
+        if failures:
+            error = PublishError(
+                f"{len(failures)} of {len(pending)} messages were not confirmed "
+                "by the broker"
+            )
+            if isinstance(failures[0], BaseException):
+                raise error from failures[0]
+            raise error
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.settings.publish_flush_interval)
+            try:
+                await self.flush()
+            except PublishError:
+                self.logger.exception("Could not confirm published messages")
+
+    async def close(self) -> None:
+        for queue, consumer_tag in self._consumers:
+            await queue.cancel(consumer_tag)
+        self._consumers.clear()
+
+        # Drain messages that are already being handled
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        try:
+            await self.flush()
+        finally:
+            # Unconfirmed messages must not leak the connections
+            if self._consumer_channel is not None:
+                await self._consumer_channel.close()
+                self._consumer_channel = None
+            await self.channel_pool.close()
+            await self.connection_pool.close()
+            self._closing.set()
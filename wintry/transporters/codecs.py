@@ -0,0 +1,238 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from enum import Enum
+from inspect import isclass
+from typing import Any, Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+SCHEMA_HEADER = "x-wintry-schema"
+
+
+class CodecError(Exception):
+    pass
+
+
+@dataclass
+class EncodedMessage(object):
+    body: bytes
+    content_type: str
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+def _is_model(payload_type: Any) -> bool:
+    return isclass(payload_type) and issubclass(payload_type, BaseModel)
+
+
+def _to_primitive(value: Any) -> Any:
+    # msgpack only knows about builtin containers and scalars
+    if isinstance(value, BaseModel):
+        return {k: _to_primitive(v) for k, v in value.dict().items()}
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, dict):
+        return {k: _to_primitive(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_to_primitive(v) for v in value]
+    return value
+
+
+def _import_msgpack():
+    try:
+        import msgpack
+    except ImportError as e:  # pragma: no cover
+        raise CodecError(
+            "msgpack codecs require `msgpack`. "
+            "Install it with `pip install wintry[msgpack]`"
+        ) from e
+    return msgpack
+
+
+class Codec(ABC):
+    """Serialization format of the messages sent through a transporter.
+
+    The `content_type` travels with each message, so consumers always
+    decode with the same codec the producer used.
+    """
+
+    name: str
+    content_type: str
+
+    @abstractmethod
+    def encode(self, payload: Any) -> EncodedMessage:
+        ...
+
+    @abstractmethod
+    def decode(self, body: bytes, payload_type: Any, headers: dict[str, Any]) -> Any:
+        """Decode `body` into an instance of `payload_type` when it is a
+        model, or into plain python objects otherwise"""
+        ...
+
+
+class JsonCodec(Codec):
+    name = "json"
+    content_type = "application/json"
+
+    def encode(self, payload: Any) -> EncodedMessage:
+        if isinstance(payload, BaseModel):
+            body = payload.json()
+        else:
+            body = json.dumps(_to_primitive(payload))
+        return EncodedMessage(body.encode(), self.content_type)
+
+    def decode(self, body: bytes, payload_type: Any, headers: dict[str, Any]) -> Any:
+        if _is_model(payload_type):
+            return payload_type.parse_raw(body)
+        return json.loads(body)
+
+
+class MsgPackCodec(Codec):
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    def __init__(self) -> None:
+        self.msgpack = _import_msgpack()
+
+    def encode(self, payload: Any) -> EncodedMessage:
+        body = self.msgpack.packb(_to_primitive(payload), use_bin_type=True)
+        return EncodedMessage(body, self.content_type)
+
+    def decode(self, body: bytes, payload_type: Any, headers: dict[str, Any]) -> Any:
+        data = self.msgpack.unpackb(body, raw=False)
+        if _is_model(payload_type):
+            return payload_type.parse_obj(data)
+        return data
+
+
+# Field types that msgpack round trips exactly, models made only of these
+# can be instantiated without validation once the schema is verified
+_NATIVE_TYPES = (int, float, str, bool, bytes)
+
+
+@dataclass
+class CompactSchema(object):
+    names: tuple[str, ...]
+    fingerprint: str
+    native: bool
+
+    @classmethod
+    def of(cls, model: type[BaseModel]) -> "CompactSchema":
+        model_fields = model.__fields__
+        signature = ";".join(f"{n}:{f.outer_type_!r}" for n, f in model_fields.items())
+        return cls(
+            names=tuple(model_fields),
+            fingerprint=hashlib.sha1(signature.encode()).hexdigest()[:16],
+            native=all(f.outer_type_ in _NATIVE_TYPES for f in model_fields.values()),
+        )
+
+
+class CompactCodec(Codec):
+    """Schema aware msgpack codec.
+
+    Models are sent as an array of their field values in declaration order,
+    so field names never hit the wire. A fingerprint of the model fields is
+    sent in the `x-wintry-schema` header, and a consumer with a different
+    version of the model refuses the message instead of misreading it.
+
+    Payloads that are not models are sent as regular msgpack.
+    """
+
+    name = "compact"
+    content_type = "application/x-wintry-compact"
+
+    def __init__(self) -> None:
+        self.fallback = MsgPackCodec()
+        self.msgpack = self.fallback.msgpack
+        self._schemas: dict[type, CompactSchema] = {}
+
+    def schema(self, model: type[BaseModel]) -> CompactSchema:
+        if (schema := self._schemas.get(model)) is None:
+            schema = self._schemas[model] = CompactSchema.of(model)
+        return schema
+
+    def encode(self, payload: Any) -> EncodedMessage:
+        if not isinstance(payload, BaseModel):
+            return self.fallback.encode(payload)
+
+        schema = self.schema(type(payload))
+        values = [_to_primitive(getattr(payload, name)) for name in schema.names]
+        return EncodedMessage(
+            self.msgpack.packb(values, use_bin_type=True),
+            self.content_type,
+            {SCHEMA_HEADER: schema.fingerprint},
+        )
+
+    def decode(self, body: bytes, payload_type: Any, headers: dict[str, Any]) -> Any:
+        if not _is_model(payload_type):
+            raise CodecError(f"{payload_type} is not a model, it cannot be decoded")
+
+        schema = self.schema(payload_type)
+        if headers.get(SCHEMA_HEADER) != schema.fingerprint:
+            raise CodecError(
+                f"Message schema {headers.get(SCHEMA_HEADER)} does not match "
+                f"{payload_type.__name__} schema {schema.fingerprint}"
+            )
+
+        values = self.msgpack.unpackb(body, raw=False)
+        if schema.native:
+            # Same schema and only builtin scalars: the values are already
+            # valid, so skip pydantic validation altogether
+            return payload_type.construct(**dict(zip(schema.names, values)))
+        return payload_type.parse_obj(dict(zip(schema.names, values)))
+
+
+__codecs__: dict[str, type[Codec]] = {
+    JsonCodec.name: JsonCodec,
+    MsgPackCodec.name: MsgPackCodec,
+    CompactCodec.name: CompactCodec,
+}
+
+
+class CodecRegistry(object):
+    """Codecs instantiated for a transporter, indexed by name and content type"""
+
+    def __init__(self, default: str = JsonCodec.name) -> None:
+        self._by_content_type: dict[str, Codec] = {}
+        self.default = self.get(default)
+
+    def get(self, name: str) -> Codec:
+        try:
+            codec_cls = __codecs__[name]
+        except KeyError:
+            raise CodecError(
+                f"Unknown codec {name}. Available codecs: {', '.join(__codecs__)}"
+            )
+        return self.for_content_type(codec_cls.content_type, codec_cls)
+
+    def for_content_type(
+        self, content_type: Optional[str], codec_cls: Optional[type[Codec]] = None
+    ) -> Codec:
+        # Messages without content type come from producers that predate
+        # codecs, and those always sent json
+        content_type = content_type or JsonCodec.content_type
+        if (codec := self._by_content_type.get(content_type)) is not None:
+            return codec
+
+        if codec_cls is None:
+            codec_cls = next(
+                (c for c in __codecs__.values() if c.content_type == content_type), None
+            )
+            if codec_cls is None:
+                raise CodecError(f"No codec for content type {content_type}")
+
+        codec = self._by_content_type[content_type] = codec_cls()
+        return codec
+
+
+def register_codec(codec_cls: type[Codec]) -> type[Codec]:
+    """Make a custom codec available to `TransporterSettings.codec`"""
+    __codecs__[codec_cls.name] = codec_cls
+    return codec_cls
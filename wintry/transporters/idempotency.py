@@ -0,0 +1,73 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any
+
+from wintry.settings import TransporterSettings
+
+
+class IdempotencyStore(ABC):
+    """Remembers the idempotency keys of successfully handled messages"""
+
+    @abstractmethod
+    async def seen(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def add(self, key: str) -> None:
+        ...
+
+
+class LRUIdempotencyStore(IdempotencyStore):
+    """In process store, bounded to the `max_size` most recent keys.
+
+    Duplicates are only detected by the process that handled the original
+    message, which covers redeliveries after a failed ack, but not messages
+    redelivered to another worker.
+    """
+
+    def __init__(self, max_size: int = 10000) -> None:
+        self.max_size = max_size
+        self.keys: OrderedDict[str, None] = OrderedDict()
+
+    async def seen(self, key: str) -> bool:
+        if key in self.keys:
+            self.keys.move_to_end(key)
+            return True
+        return False
+
+    async def add(self, key: str) -> None:
+        self.keys[key] = None
+        self.keys.move_to_end(key)
+        if len(self.keys) > self.max_size:
+            self.keys.popitem(last=False)
+
+
+class RedisIdempotencyStore(IdempotencyStore):
+    """Store shared by every worker, keys expire after `ttl` seconds"""
+
+    def __init__(
+        self, redis: Any, ttl: int = 86400, prefix: str = "wintry:idem:"
+    ) -> None:
+        self.redis = redis
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisIdempotencyStore":
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url), **kwargs)
+
+    async def seen(self, key: str) -> bool:
+        return bool(await self.redis.exists(self.prefix + key))
+
+    async def add(self, key: str) -> None:
+        await self.redis.set(self.prefix + key, 1, ex=self.ttl)
+
+
+def make_idempotency_store(settings: TransporterSettings) -> IdempotencyStore:
+    if settings.idempotency_url is not None:
+        return RedisIdempotencyStore.from_url(
+            settings.idempotency_url, ttl=settings.idempotency_ttl
+        )
+    return LRUIdempotencyStore(settings.idempotency_cache_size)
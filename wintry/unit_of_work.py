@@ -0,0 +1,333 @@
+import dataclasses
+import json
+import logging
+import sqlite3
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Iterable
+
+from wintry.ioc import scoped
+from wintry.threadpools import get_threadpool
+from wintry.tracking import diff, is_tracked, mark_clean
+from wintry.utils.keys import (
+    __winter_backend_identifier_key__,
+    __winter_model_collection_name__,
+    __winter_model_primary_keys__,
+)
+
+logger = logging.getLogger("logger")
+
+THREADPOOL = "unit_of_work"
+"""Pool running the blocking flushes of the SQLite backend"""
+
+
+class UnitOfWorkError(Exception):
+    pass
+
+
+@dataclass
+class TableChanges(object):
+    """Changes of a single table, flushed as bulk operations"""
+
+    table: str
+    keys: tuple[str, ...]
+    inserts: list[dict[str, Any]] = field(default_factory=list)
+    updates: list[tuple[tuple[Any, ...], dict[str, Any]]] = field(default_factory=list)
+    """(primary key values, changed columns) for each updated row"""
+    deletes: list[tuple[Any, ...]] = field(default_factory=list)
+    """Primary key values of each deleted row"""
+
+    def __bool__(self) -> bool:
+        return bool(self.inserts or self.updates or self.deletes)
+
+
+class UnitOfWorkBackend(ABC):
+    """Applies the changes collected by a `UnitOfWork`.
+
+    `flush()` gets every table changed in the unit of work, in the order
+    they were first touched, and must apply them atomically: either all of
+    them are written, or none.
+    """
+
+    @abstractmethod
+    async def flush(self, changes: list[TableChanges]) -> None:
+        ...
+
+
+__backends__: dict[str, UnitOfWorkBackend] = {}
+
+
+def register_backend(name: str, backend: UnitOfWorkBackend):
+    """Make `backend` flush the models whose `__winter_backend_identifier_key__`
+    is `name`"""
+    __backends__[name] = backend
+
+
+def table_of(model: type) -> str:
+    return getattr(model, __winter_model_collection_name__, model.__name__.lower())
+
+
+def primary_keys_of(model: type) -> tuple[str, ...]:
+    return tuple(getattr(model, __winter_model_primary_keys__, ("id",)))
+
+
+def backend_of(model: type) -> str:
+    return getattr(model, __winter_backend_identifier_key__, "default")
+
+
+def _row(obj: Any) -> dict[str, Any]:
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    return dataclasses.asdict(obj)
+
+
+def _column(value: Any) -> Any:
+    # Related models are written whole, as the column holds all their fields
+    if dataclasses.is_dataclass(value):
+        return _row(value)
+    if isinstance(value, list):
+        return [_row(v) if dataclasses.is_dataclass(v) else v for v in value]
+    return value
+
+
+@scoped
+class UnitOfWork:
+    """Collects new, dirty and deleted models during a scope (a request or
+    an event message) and writes them together on `commit()`.
+
+    Changes are grouped per backend and table, so each table gets one bulk
+    insert, one bulk update per set of changed columns and one bulk delete,
+    instead of a round-trip per model. Models map to tables with these
+    class attributes, read with `getattr` and these defaults:
+
+        * `__winter_model_collection_name__`: the lowercased class name
+        * `__winter_model_primary_keys__`: `("id",)`
+        * `__winter_backend_identifier_key__`: `"default"`
+
+    Models decorated with `@track` only write the fields that changed after
+    being `attach()`ed. Other models are written whole when passed to `update()`.
+
+    Changes that were not committed when the scope ends are discarded.
+    """
+
+    def __init__(self) -> None:
+        self.backends = __backends__
+        self.new: dict[int, Any] = {}
+        self.dirty: dict[int, Any] = {}
+        self.deleted: dict[int, Any] = {}
+        self.attached: dict[int, Any] = {}
+
+    def add(self, obj: Any):
+        """Insert `obj` on commit"""
+        self.deleted.pop(id(obj), None)
+        self.new[id(obj)] = obj
+
+    def add_all(self, objs: Iterable[Any]):
+        for obj in objs:
+            self.add(obj)
+
+    def attach(self, obj: Any):
+        """Watch a loaded `@track` model, and write its changes on commit"""
+        if not is_tracked(obj):
+            raise UnitOfWorkError(
+                f"{type(obj).__name__} is not tracked, use update() to write it"
+            )
+        self.attached[id(obj)] = obj
+
+    def update(self, obj: Any):
+        """Write `obj` on commit, just its changes for tracked models"""
+        if id(obj) not in self.new:
+            self.dirty[id(obj)] = obj
+
+    def delete(self, obj: Any):
+        """Delete `obj` on commit. Deleting a new model just forgets it"""
+        if self.new.pop(id(obj), None) is not None:
+            return
+        self.dirty.pop(id(obj), None)
+        self.attached.pop(id(obj), None)
+        self.deleted[id(obj)] = obj
+
+    def _changes_for(
+        self, obj: Any, groups: dict[tuple[str, str], TableChanges]
+    ) -> TableChanges:
+        model = type(obj)
+        key = (backend_of(model), table_of(model))
+        if (changes := groups.get(key)) is None:
+            changes = groups[key] = TableChanges(
+                table=key[1], keys=primary_keys_of(model)
+            )
+        return changes
+
+    def _collect(self) -> dict[tuple[str, str], TableChanges]:
+        groups: dict[tuple[str, str], TableChanges] = {}
+        for obj in self.new.values():
+            self._changes_for(obj, groups).inserts.append(_row(obj))
+
+        updated = dict(self.attached)
+        updated.update(self.dirty)
+        for obj in updated.values():
+            if is_tracked(obj):
+                # The diff of a related model is partial, write its current value
+                columns = {name: _column(getattr(obj, name)) for name in diff(obj)}
+                if not columns:
+                    continue
+            else:
+                columns = _row(obj)
+            changes = self._changes_for(obj, groups)
+            key = tuple(getattr(obj, name) for name in changes.keys)
+            for name in changes.keys:
+                columns.pop(name, None)
+            if columns:
+                changes.updates.append((key, columns))
+
+        for obj in self.deleted.values():
+            changes = self._changes_for(obj, groups)
+            changes.deletes.append(tuple(getattr(obj, name) for name in changes.keys))
+        return groups
+
+    @property
+    def has_changes(self) -> bool:
+        return any(self._collect().values())
+
+    async def commit(self):
+        """Flush every change, one `flush()` call per backend"""
+        per_backend: dict[str, list[TableChanges]] = {}
+        for (backend, _), changes in self._collect().items():
+            if changes:
+                per_backend.setdefault(backend, []).append(changes)
+
+        for backend, changes in per_backend.items():
+            if backend not in self.backends:
+                raise UnitOfWorkError(f"There is no backend registered as {backend}")
+            await self.backends[backend].flush(changes)
+
+        for obj in [*self.new.values(), *self.dirty.values(), *self.attached.values()]:
+            if is_tracked(obj):
+                mark_clean(obj)
+                self.attached[id(obj)] = obj
+        self.new.clear()
+        self.dirty.clear()
+        self.deleted.clear()
+
+    def rollback(self):
+        """Forget every change that was not committed"""
+        self.new.clear()
+        self.dirty.clear()
+        self.deleted.clear()
+        self.attached.clear()
+
+    async def dispose(self):
+        if self.new or self.dirty or self.deleted:
+            logger.warning("Discarding uncommitted changes of the unit of work")
+        self.rollback()
+
+
+class InMemoryBackend(UnitOfWorkBackend):
+    """Keeps rows in dicts, keyed by table and primary key. Meant for tests."""
+
+    def __init__(self) -> None:
+        self.tables: dict[str, dict[tuple[Any, ...], dict[str, Any]]] = {}
+        self.flushes = 0
+
+    async def flush(self, changes: list[TableChanges]) -> None:
+        # Apply on copies, so a failure leaves every table untouched
+        staged = {c.table: dict(self.tables.get(c.table, {})) for c in changes}
+        for table_changes in changes:
+            rows = staged[table_changes.table]
+            for row in table_changes.inserts:
+                key = tuple(row[name] for name in table_changes.keys)
+                if key in rows:
+                    raise UnitOfWorkError(
+                        f"Duplicated key {key} in {table_changes.table}"
+                    )
+                rows[key] = dict(row)
+            for key, columns in table_changes.updates:
+                if key not in rows:
+                    raise UnitOfWorkError(f"Missing key {key} in {table_changes.table}")
+                rows[key] = {**rows[key], **columns}
+            for key in table_changes.deletes:
+                rows.pop(key, None)
+        self.tables.update(staged)
+        self.flushes += 1
+
+
+class SQLiteBackend(UnitOfWorkBackend):
+    """Reference SQL backend, writing each flush in a single transaction.
+    Flushes share the connection, so they run one at a time.
+
+    Inserts and updates sharing the same columns go through one
+    `executemany()`, deletes through `DELETE ... WHERE key IN (...)`.
+    Dicts and lists are stored as JSON text. Tables must already exist.
+    """
+
+    # SQLite default limit of host parameters per statement
+    max_parameters = 999
+
+    def __init__(self, database: str = ":memory:") -> None:
+        self.connection = sqlite3.connect(database, check_same_thread=False)
+        self.statements = 0
+        # A transaction belongs to the connection, not to the thread
+        # running it, so concurrent flushes would commit each other
+        self._lock = Lock()
+
+    @staticmethod
+    def _value(value: Any) -> Any:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+
+    def _execute_many(self, sql: str, parameters: list[tuple[Any, ...]]):
+        self.connection.executemany(sql, parameters)
+        self.statements += 1
+
+    def _flush(self, changes: list[TableChanges]):
+        with self._lock, self.connection:
+            for table_changes in changes:
+                table = table_changes.table
+                inserts: dict[tuple[str, ...], list[tuple[Any, ...]]] = {}
+                for row in table_changes.inserts:
+                    inserts.setdefault(tuple(row), []).append(
+                        tuple(self._value(v) for v in row.values())
+                    )
+                for columns, values in inserts.items():
+                    self._execute_many(
+                        f"INSERT INTO {table} ({', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' * len(columns))})",
+                        values,
+                    )
+
+                where = " AND ".join(f"{name} = ?" for name in table_changes.keys)
+                updates: dict[tuple[str, ...], list[tuple[Any, ...]]] = {}
+                for key, changed in table_changes.updates:
+                    updates.setdefault(tuple(changed), []).append(
+                        (*(self._value(v) for v in changed.values()), *key)
+                    )
+                for columns, values in updates.items():
+                    assignments = ", ".join(f"{name} = ?" for name in columns)
+                    self._execute_many(
+                        f"UPDATE {table} SET {assignments} WHERE {where}", values
+                    )
+
+                if len(table_changes.keys) == 1:
+                    keys = [key[0] for key in table_changes.deletes]
+                    size = self.max_parameters
+                    for start in range(0, len(keys), size):
+                        chunk = keys[start : start + size]
+                        self.connection.execute(
+                            f"DELETE FROM {table} WHERE {table_changes.keys[0]} "
+                            f"IN ({', '.join('?' * len(chunk))})",
+                            chunk,
+                        )
+                        self.statements += 1
+                elif table_changes.deletes:
+                    self._execute_many(
+                        f"DELETE FROM {table} WHERE {where}", table_changes.deletes
+                    )
+
+    async def flush(self, changes: list[TableChanges]) -> None:
+        await get_threadpool(THREADPOOL).run(self._flush, changes)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,44 @@
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+
+_line = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)\s*$")
+
+
+@dataclass
+class ImportTime(object):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+    """0 for the modules imported directly, 1 for the ones they import, etc."""
+
+
+def parse_importtime(output: str) -> list[ImportTime]:
+    """Entries of `python -X importtime` output, in the order it prints them"""
+    entries: list[ImportTime] = []
+    for line in output.splitlines():
+        if (match := _line.match(line)) is not None:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append(
+                ImportTime(module, int(self_us), int(cumulative_us), len(indent) // 2)
+            )
+    return entries
+
+
+def profile_import(module: str, python: str = sys.executable) -> list[ImportTime]:
+    """Import `module` in a fresh interpreter and return its import times.
+    Modules already imported by the interpreter startup are not listed."""
+    # Same path as this process, so it finds the same modules
+    path = os.pathsep.join(p for p in sys.path if p)
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": path},
+    )
+    if result.returncode != 0:
+        raise ImportError(f"Could not import {module}:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
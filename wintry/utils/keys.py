@@ -23,10 +23,16 @@ __winter_repository_is_using_sqlalchemy__ = "__winter_repository_is_using_sqlalc
 __winter_model_collection_name__ = "__winter_model_collection_name__"
 __winter_transporter_name__ = "__winter_transporter_name__"
 __winter_microservice_event__ = "__winter_microservice_event__"
+__winter_microservice_event_options__ = "__winter_microservice_event_options__"
 __winter_model_primary_keys__ = "__winter_model_primary_keys__"
 __winter_model_instance_state__ = "__model_instance_state__"
 __winter_model_fields_set__ = "__winter_model_fields_set__"
+__winter_dto__ = "__winter_dto__"
 __wintry_model_instance_phantom_fk__ = "__wintry_model_instance_phantom_fk__"
+__winter_limiter__ = "__winter_limiter__"
+__winter_threadpool__ = "__winter_threadpool__"
+__winter_cacheable__ = "__winter_cacheable__"
+__winter_etag__ = "__winter_etag__"
 
 NO_SQL = "NO_SQL"
 SQL = "SQL"
@@ -1,57 +1,165 @@
 import importlib
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional, Sequence
 
 from wintry.settings import WinterSettings
 
+logger = logging.getLogger("logger")
+
+_defaults = WinterSettings.__fields__
+
 
 class LoaderError(Exception):
     pass
 
 
+@dataclass
+class DiscoveryReport(object):
+    scanned: int = 0
+    """Python files found after applying the include/exclude globs"""
+    import_times: dict[str, float] = field(default_factory=dict)
+    """Seconds each imported module took to import, in import order"""
+    directories: list[Path] = field(default_factory=list)
+    """Directories walked, whose mtimes change when files are added or removed"""
+    files: list[Path] = field(default_factory=list)
+    """Python files read looking for markers, whether they used them or not"""
+    elapsed: float = 0.0
+
+    def slowest(self, n: int = 5) -> list[tuple[str, float]]:
+        return sorted(self.import_times.items(), key=lambda item: -item[1])[:n]
+
+
 def to_package_format(path: Path) -> str:
-    module_fs_path = ".".join(path.parts)
-    # remove module last .py extension
-    module = module_fs_path.replace(".py", "")
+    module = ".".join(path.with_suffix("").parts)
     # if module is like "path.to.module.__init__", then
     # leave it as "path.to.module"
     if module.endswith(".__init__"):
-        return module.replace(".__init__", "")
+        return module[: -len(".__init__")]
 
     return module
 
 
-def discover(path: Path, app_path: str):
-    dirs: list[Path] = [path]
-    while dirs:
-        module = dirs.pop(0)
-        for sub_module in module.iterdir():
-            if sub_module.is_dir():
-                dirs.append(sub_module)
-            else:
-                if sub_module.name.endswith(".py"):
-                    try:
-                        mod = to_package_format(sub_module)
-                        if mod not in app_path:
-                            importlib.import_module(mod)
-                    except ModuleNotFoundError as e:
-                        raise LoaderError(str(e))
-
-
-def autodiscover_modules(modules: List[str], app_path: str):
+def _matches(path: str, patterns: Sequence[str]) -> bool:
+    return any(fnmatchcase(path, pattern) for pattern in patterns)
+
+
+def _walk(
+    root: Path, include: Sequence[str], exclude: Sequence[str], directories: list[Path]
+) -> Iterator[Path]:
+    """Python files under `root`, pruning excluded directories so they are
+    never listed"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        directories.append(Path(dirpath))
+        relative = Path(dirpath).relative_to(root)
+        prefix = "" if relative == Path(".") else f"{relative.as_posix()}/"
+        dirnames[:] = sorted(
+            d
+            for d in dirnames
+            if d != "__pycache__" and not _matches(f"{prefix}{d}/", exclude)
+        )
+        for name in sorted(filenames):
+            path = f"{prefix}{name}"
+            if (
+                name.endswith(".py")
+                and _matches(path, include)
+                and not _matches(path, exclude)
+            ):
+                yield Path(dirpath) / name
+
+
+def _markers_pattern(markers: Sequence[str]) -> "re.Pattern[bytes]":
+    names = "|".join(re.escape(m) for m in markers)
+    # `@controller`, `@ioc.provider(...)`, `@wintry.scoped`, ...
+    return re.compile(rb"^\s*@(?:\w+\.)*(?:" + names.encode() + rb")\b", re.MULTILINE)
+
+
+def _uses_markers(path: Path, pattern: "re.Pattern[bytes]") -> bool:
+    try:
+        return pattern.search(path.read_bytes()) is not None
+    except OSError:
+        return False
+
+
+def discover(
+    path: Path,
+    app_path: str,
+    *,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    markers: Optional[Sequence[str]] = None,
+    max_workers: Optional[int] = None,
+    report: Optional[DiscoveryReport] = None,
+) -> DiscoveryReport:
+    """Import the modules under `path` that register something.
+
+    Files matching `include` and not `exclude` are read in a thread pool
+    and only those using one of the `markers` decorators get imported,
+    sequentially and in path order, as imports run decorators with side
+    effects. The module of `app_path` is never imported here.
+    """
+    include = _defaults["autodiscovery_include"].default if include is None else include
+    exclude = _defaults["autodiscovery_exclude"].default if exclude is None else exclude
+    markers = _defaults["autodiscovery_markers"].default if markers is None else markers
+    report = report if report is not None else DiscoveryReport()
+    app_module = app_path.split(":")[0]
+
+    files = list(_walk(path, include, exclude, report.directories))
+    report.scanned += len(files)
+    report.files.extend(files)
+    if markers:
+        pattern = _markers_pattern(markers)
+        with ThreadPoolExecutor(max_workers) as executor:
+            selected = executor.map(lambda f: _uses_markers(f, pattern), files)
+            files = [f for f, uses_markers in zip(files, list(selected)) if uses_markers]
+
+    for file in files:
+        mod = to_package_format(file)
+        if mod == app_module or mod in report.import_times:
+            continue
+        start = time.perf_counter()
+        try:
+            importlib.import_module(mod)
+        except ModuleNotFoundError as e:
+            raise LoaderError(str(e))
+        report.import_times[mod] = time.perf_counter() - start
+    return report
+
+
+def autodiscover_modules(
+    modules: List[str],
+    app_path: str,
+    *,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    markers: Optional[Sequence[str]] = None,
+    max_workers: Optional[int] = None,
+) -> DiscoveryReport:
     """Utility to automatically import the app's modules so there is
     no need to manual importing controllers, services, etc, to provide
     the necessary registry for DI
 
     Args:
-        modules:
-        app_path:
+        modules: Directories to look into.
+        app_path: Importable path of the app, whose module is skipped.
+        include: Globs of the files to consider, defaults to every `.py`.
+        exclude: Globs of files and directories to skip, defaults to tests,
+            migrations, scripts and hidden directories.
+        markers: Decorators a file must use to be imported.
+        max_workers: Threads used to scan files.
 
     Returns:
-        None
+        A report with the time taken to import each module.
 
     """
-
+    start = time.perf_counter()
+    report = DiscoveryReport()
     for module in modules:
         app_root = Path(module)
 
@@ -60,4 +168,21 @@ def autodiscover_modules(modules: List[str], app_path: str):
                 f"{app_root.resolve()} is not a dir. Autodiscovery must be called on a dir."
             )
 
-        discover(app_root, app_path)
+        discover(
+            app_root,
+            app_path,
+            include=include,
+            exclude=exclude,
+            markers=markers,
+            max_workers=max_workers,
+            report=report,
+        )
+
+    report.elapsed = time.perf_counter() - start
+    logger.debug(
+        f"Autodiscovery imported {len(report.import_times)} of {report.scanned} "
+        f"modules in {report.elapsed * 1000:.1f}ms"
+    )
+    for mod, seconds in report.slowest():
+        logger.debug(f"  {mod}: {seconds * 1000:.1f}ms")
+    return report
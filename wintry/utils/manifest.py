@@ -0,0 +1,268 @@
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from wintry.settings import WinterSettings
+from wintry.utils.loaders import DiscoveryReport, LoaderError, autodiscover_modules
+
+logger = logging.getLogger("logger")
+
+MANIFEST_VERSION = 2
+
+
+class ManifestError(Exception):
+    pass
+
+
+@dataclass
+class ManifestModule(object):
+    name: str
+    path: str
+    mtime_ns: int
+    registrations: dict[str, list[str]] = field(default_factory=dict)
+    """Controllers, providers and microservices the module registers"""
+
+
+@dataclass
+class Manifest(object):
+    """Modules found by autodiscovery, so workers can import them without
+    scanning the filesystem again.
+
+    Besides the modules, it records how they were discovered, to scan again
+    when the manifest is stale, and the mtimes of the walked directories, as
+    those change when a file is added or removed, and of every file scanned
+    for markers, as adding a marker to one makes it a module to import.
+    """
+
+    app_path: str
+    roots: list[str]
+    include: list[str]
+    exclude: list[str]
+    markers: list[str]
+    modules: list[ManifestModule] = field(default_factory=list)
+    directories: dict[str, int] = field(default_factory=dict)
+    files: dict[str, int] = field(default_factory=dict)
+    """Files scanned for markers, imported or not"""
+    version: int = MANIFEST_VERSION
+
+    def stale(self) -> list[str]:
+        """Paths changed since the manifest was built, empty when it is
+        up to date"""
+        expected = {m.path: m.mtime_ns for m in self.modules}
+        expected.update(self.files)
+        expected.update(self.directories)
+        changed: list[str] = []
+        for path, mtime_ns in expected.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    changed.append(path)
+            except OSError:
+                changed.append(path)
+        return changed
+
+    def dump(self, path: Union[str, Path]):
+        Path(path).write_text(json.dumps(asdict(self), indent=2))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Manifest":
+        try:
+            data: dict[str, Any] = json.loads(Path(path).read_text())
+        except (OSError, ValueError) as e:
+            raise ManifestError(f"Could not read manifest {path}: {e}") from e
+
+        if data.get("version") != MANIFEST_VERSION:
+            raise ManifestError(
+                f"Manifest {path} has version {data.get('version')}, "
+                f"expected {MANIFEST_VERSION}. Run `wintry build-manifest` again"
+            )
+        modules = [ManifestModule(**module) for module in data.pop("modules")]
+        return cls(modules=modules, **data)
+
+
+def _qualname(obj: Any) -> Optional[tuple[str, str]]:
+    module = getattr(obj, "__module__", None)
+    qualname = getattr(obj, "__qualname__", None)
+    if module is None or qualname is None:
+        return None
+    return module, qualname
+
+
+def _router_origin(router: Any) -> Optional[tuple[str, str]]:
+    # Routers do not keep their controller class, but their endpoints are
+    # the methods of it
+    for route in router.routes:
+        if (origin := _qualname(getattr(route, "endpoint", None))) is not None:
+            module, qualname = origin
+            return module, qualname.rpartition(".")[0] or qualname
+    return None
+
+
+def _registrations() -> dict[str, dict[str, list[str]]]:
+    from wintry.controllers import TransportControllerRegistry, __controllers__
+    from wintry.ioc.container import igloo
+
+    found: dict[str, dict[str, list[str]]] = {}
+
+    def add(kind: str, origin: Optional[tuple[str, str]]):
+        if origin is not None:
+            names = found.setdefault(origin[0], {}).setdefault(kind, [])
+            if origin[1] not in names:
+                names.append(origin[1])
+
+    for router in __controllers__:
+        add("controllers", _router_origin(router))
+    for factory in (*igloo.factories.values(), *igloo.request_dependencies.values()):
+        add("providers", _qualname(factory.cls))
+    for singleton in igloo.singletons.values():
+        add("providers", _qualname(singleton))
+    for service in TransportControllerRegistry.controllers.values():
+        add("microservices", _qualname(service))
+    return found
+
+
+def build_manifest(settings: WinterSettings) -> Manifest:
+    """Run autodiscovery as configured in `settings` and record the
+    modules it imports"""
+    report = autodiscover_modules(
+        settings.modules,
+        settings.app_path,
+        include=settings.autodiscovery_include,
+        exclude=settings.autodiscovery_exclude,
+        markers=settings.autodiscovery_markers,
+    )
+    registrations = _registrations()
+    manifest = Manifest(
+        app_path=settings.app_path,
+        roots=list(settings.modules),
+        include=list(settings.autodiscovery_include),
+        exclude=list(settings.autodiscovery_exclude),
+        markers=list(settings.autodiscovery_markers),
+        directories={
+            str(directory): directory.stat().st_mtime_ns
+            for directory in report.directories
+        },
+    )
+    for file in report.files:
+        manifest.files[os.path.relpath(file)] = file.stat().st_mtime_ns
+    for name in report.import_times:
+        path = os.path.relpath(sys.modules[name].__file__ or "")
+        manifest.modules.append(
+            ManifestModule(
+                name=name,
+                path=path,
+                mtime_ns=os.stat(path).st_mtime_ns,
+                registrations=registrations.get(name, {}),
+            )
+        )
+    return manifest
+
+
+def _timed_import(name: str) -> float:
+    start = time.perf_counter()
+    try:
+        importlib.import_module(name)
+    except ModuleNotFoundError as e:
+        raise LoaderError(str(e))
+    return time.perf_counter() - start
+
+
+def _controllers() -> Optional[list[Any]]:
+    # Consumer only apps never import the controllers, nor the HTTP stack
+    # with them, so do not import them here either
+    module = sys.modules.get("wintry.controllers")
+    return module.__controllers__ if module is not None else None
+
+
+def _import_in_threads(names: list[str], threads: int) -> dict[str, float]:
+    controllers = _controllers()
+    first = len(controllers) if controllers is not None else 0
+    with ThreadPoolExecutor(threads) as executor:
+        futures = [executor.submit(_timed_import, name) for name in names]
+
+    import_times: dict[str, float] = {}
+    for name, future in zip(names, futures):
+        try:
+            import_times[name] = future.result()
+        except RuntimeError:
+            # Modules importing each other from different threads can hit
+            # importlib's deadlock detection, import those ones again now
+            # that everything else is in place
+            import_times[name] = _timed_import(name)
+
+    controllers = _controllers()
+    if controllers is None:
+        return import_times
+
+    # Routes match in the order controllers got registered, keep the
+    # order of a sequential import
+    order = {name: index for index, name in enumerate(names)}
+
+    def position(router: Any) -> int:
+        origin = _router_origin(router)
+        return order.get(origin[0], len(order)) if origin else len(order)
+
+    controllers[first:] = sorted(controllers[first:], key=position)
+    return import_times
+
+
+def import_manifest(
+    manifest: Union[Manifest, str, Path], *, threads: int = 0
+) -> DiscoveryReport:
+    """Import the modules recorded in `manifest`, in `threads` threads if
+    greater than 0. A stale manifest is ignored in favour of scanning the
+    filesystem again as it was when the manifest was built."""
+    if not isinstance(manifest, Manifest):
+        manifest = Manifest.load(manifest)
+
+    if changed := manifest.stale():
+        logger.warning(
+            f"Manifest is stale ({len(changed)} changed paths, e.g. {changed[0]}), "
+            "falling back to autodiscovery. Run `wintry build-manifest` again"
+        )
+        return autodiscover_modules(
+            manifest.roots,
+            manifest.app_path,
+            include=manifest.include,
+            exclude=manifest.exclude,
+            markers=manifest.markers,
+        )
+
+    start = time.perf_counter()
+    names = [module.name for module in manifest.modules]
+    report = DiscoveryReport(scanned=len(names))
+    if threads > 0:
+        report.import_times = _import_in_threads(names, threads)
+    else:
+        report.import_times = {name: _timed_import(name) for name in names}
+    report.elapsed = time.perf_counter() - start
+    logger.debug(
+        f"Imported {len(names)} modules from manifest in {report.elapsed * 1000:.1f}ms"
+    )
+    return report
+
+
+def autodiscover_from_settings(settings: WinterSettings) -> DiscoveryReport:
+    """Import the app modules from `settings.manifest_path`, if configured,
+    or by scanning `settings.modules`"""
+    if settings.manifest_path is not None:
+        try:
+            return import_manifest(
+                settings.manifest_path, threads=settings.manifest_import_threads
+            )
+        except ManifestError as e:
+            logger.warning(f"{e}, falling back to autodiscovery")
+
+    return autodiscover_modules(
+        settings.modules,
+        settings.app_path,
+        include=settings.autodiscovery_include,
+        exclude=settings.autodiscovery_exclude,
+        markers=settings.autodiscovery_markers,
+    )
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger("logger")
+
+
+class PoolClosedError(Exception):
+    pass
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+@dataclass
+class PoolStats(object):
+    max_size: int
+    size: int
+    """Items alive, idle or in use"""
+    idle: int
+    in_use: int
+    waiting: int
+    """Callers currently waiting for an item"""
+    acquired: int = 0
+    waited: int = 0
+    """Acquisitions that had to wait for an item to be released"""
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+    timeouts: int = 0
+    expired: int = 0
+    """Items disposed after being idle longer than the idle timeout"""
+    health_check_failures: int = 0
+
+    @property
+    def saturation(self) -> float:
+        """Fraction of `max_size` in use, 1.0 means callers have to wait"""
+        return self.in_use / self.max_size
+
+    @property
+    def wait_time_avg(self) -> float:
+        return self.wait_time_total / self.waited if self.waited else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            **asdict(self),
+            "saturation": self.saturation,
+            "wait_time_avg": self.wait_time_avg,
+        }
+
+
+class Pool(Generic[T]):
+    """A bounded async pool of reusable resources (connections, channels, ...).
+
+    Items are created on demand by `factory` until `max_size` is reached,
+    after that, callers wait for an item to be released (at most
+    `acquire_timeout` seconds, when set). Idle items are reused in LIFO order,
+    so the most recently used (and most likely alive) resource is handed
+    out first.
+
+    Optionally:
+        * `min_size` items are created by `open()` and kept around.
+        * Items idle for more than `idle_timeout` seconds are disposed, by
+          the reaper started with `open()` or when they are next acquired.
+        * `health_check(item)` is awaited before handing out an item that
+          has been idle for at least `health_check_after` seconds. Items
+          failing it are disposed and replaced.
+
+    `stats()` reports the pool usage, including how saturated it is and how
+    long callers waited for an item.
+
+    Example
+    =======
+
+    >>> pool = Pool(connect, max_size=4, dispose=lambda c: c.close())
+    >>> async with pool.acquire() as connection:
+    >>>     await connection.execute(...)
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Awaitable[T]],
+        *,
+        max_size: int,
+        min_size: int = 0,
+        dispose: Optional[Callable[[T], Awaitable[Any]]] = None,
+        idle_timeout: Optional[float] = None,
+        health_check: Optional[Callable[[T], Awaitable[bool]]] = None,
+        health_check_after: float = 0.0,
+        acquire_timeout: Optional[float] = None,
+    ) -> None:
+        assert max_size > 0, "max_size must be a positive number"
+        assert 0 <= min_size <= max_size, "min_size must be between 0 and max_size"
+        self.factory = factory
+        self.max_size = max_size
+        self.min_size = min_size
+        self.dispose = dispose
+        self.idle_timeout = idle_timeout
+        self.health_check = health_check
+        self.health_check_after = health_check_after
+        self.acquire_timeout = acquire_timeout
+        self.size = 0
+        # (item, monotonic time it was released)
+        self._idle: list[tuple[T, float]] = []
+        self._slots = asyncio.Semaphore(max_size)
+        self._closed = False
+        self._reaper: Optional[asyncio.Task] = None
+        self._in_use = 0
+        self._waiting = 0
+        self._stats = PoolStats(max_size=max_size, size=0, idle=0, in_use=0, waiting=0)
+
+    async def open(self):
+        """Create the `min_size` items and start reaping idle ones"""
+        while self.size < self.min_size:
+            self._idle.append((await self.factory(), time.monotonic()))
+            self.size += 1
+        if self.idle_timeout is not None and self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_periodically())
+
+    async def _discard(self, item: T):
+        self.size -= 1
+        if self.dispose is None:
+            return
+        try:
+            await self.dispose(item)
+        except Exception:
+            logger.exception("Could not dispose pool item")
+
+    async def reap(self):
+        """Dispose items idle for longer than `idle_timeout`, keeping `min_size`"""
+        if self.idle_timeout is None:
+            return
+        deadline = time.monotonic() - self.idle_timeout
+        # The least recently used items are at the bottom
+        while self._idle and self._idle[0][1] < deadline and self.size > self.min_size:
+            item, _ = self._idle.pop(0)
+            self._stats.expired += 1
+            await self._discard(item)
+
+    async def _reap_periodically(self):
+        assert self.idle_timeout is not None
+        while True:
+            await asyncio.sleep(self.idle_timeout / 2)
+            await self.reap()
+
+    async def _get(self) -> T:
+        while self._idle:
+            item, released_at = self._idle.pop()
+            idle_for = time.monotonic() - released_at
+            if self.idle_timeout is not None and idle_for > self.idle_timeout:
+                self._stats.expired += 1
+                await self._discard(item)
+                continue
+            if self.health_check is not None and idle_for >= self.health_check_after:
+                try:
+                    healthy = await self.health_check(item)
+                except Exception:
+                    healthy = False
+                if not healthy:
+                    self._stats.health_check_failures += 1
+                    await self._discard(item)
+                    continue
+            return item
+        item = await self.factory()
+        self.size += 1
+        return item
+
+    async def _acquire_slot(self):
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return
+
+        start = time.monotonic()
+        self._waiting += 1
+        try:
+            if self.acquire_timeout is None:
+                await self._slots.acquire()
+            else:
+                await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._stats.timeouts += 1
+            raise PoolTimeoutError(
+                f"No item was released in {self.acquire_timeout} seconds"
+            ) from None
+        finally:
+            self._waiting -= 1
+        waited = time.monotonic() - start
+        self._stats.waited += 1
+        self._stats.wait_time_total += waited
+        self._stats.wait_time_max = max(self._stats.wait_time_max, waited)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[T]:
+        if self._closed:
+            raise PoolClosedError("Cannot acquire from a closed pool")
+        await self._acquire_slot()
+        try:
+            item = await self._get()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        self._stats.acquired += 1
+        self._in_use += 1
+        try:
+            yield item
+        finally:
+            self._in_use -= 1
+            if self._closed:
+                await self._discard(item)
+            else:
+                self._idle.append((item, time.monotonic()))
+            self._slots.release()
+
+    def stats(self) -> PoolStats:
+        stats = self._stats
+        stats.size = self.size
+        stats.idle = len(self._idle)
+        stats.in_use = self._in_use
+        stats.waiting = self._waiting
+        return PoolStats(**asdict(stats))
+
+    async def close(self):
+        self._closed = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        idle, self._idle = self._idle, []
+        for item, _ in idle:
+            await self._discard(item)
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import time
+from dataclasses import dataclass, field
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+from typing import Any, Optional
+
+from wintry.settings import TransporterSettings, WinterSettings
+from wintry.transporters import EventStats, load_microservice
+from wintry.utils.manifest import autodiscover_from_settings
+
+logger = logging.getLogger("logger")
+
+
+def _get_context() -> BaseContext:
+    # Forking lets workers inherit the modules imported by the supervisor
+    # instead of importing the whole app again
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+async def _consume(
+    transporter: TransporterSettings,
+    consumer_name: str,
+    index: int,
+    reports: Any,
+    report_interval: float,
+):
+    service = load_microservice(transporter)
+    service.consumer_name = consumer_name
+    loop = asyncio.get_running_loop()
+    closing: list[asyncio.Task] = []
+
+    def drain():
+        if not closing:
+            closing.append(loop.create_task(service.close()))
+
+    loop.add_signal_handler(signal.SIGTERM, drain)
+
+    async def report():
+        while True:
+            await asyncio.sleep(report_interval)
+            reports.put((index, service.collect_stats()))
+
+    await service.init()
+    reporter = loop.create_task(report())
+    try:
+        await service.run()
+    finally:
+        reporter.cancel()
+        if closing:
+            await closing[0]
+        reports.put((index, service.collect_stats()))
+
+
+def _worker_main(
+    settings: WinterSettings,
+    transporter: TransporterSettings,
+    consumer_name: str,
+    index: int,
+    reports: Any,
+    report_interval: float,
+):
+    # Ctrl-C reaches the whole process group, let the supervisor decide
+    # when workers stop, which is always through SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if settings.auto_discovery_enabled:
+        autodiscover_from_settings(settings)
+    asyncio.run(_consume(transporter, consumer_name, index, reports, report_interval))
+
+
+@dataclass
+class WorkerSlot(object):
+    index: int
+    transporter: TransporterSettings
+    consumer_name: str
+    process: Optional[BaseProcess] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    restart_at: Optional[float] = None
+
+
+@dataclass
+class Report(object):
+    started_at: float = field(default_factory=time.monotonic)
+    events: dict[str, EventStats] = field(default_factory=dict)
+
+    def add(self, stats: dict[str, EventStats]):
+        for event, event_stats in stats.items():
+            self.events.setdefault(event, EventStats()).merge(event_stats)
+
+
+class Supervisor(object):
+    """Runs `workers` consumer processes for each configured transporter.
+
+    Workers of the same transporter share the service queues (its consumer
+    group), so the broker balances events between them. The supervisor:
+
+        * Drains workers on SIGTERM/SIGINT: each one stops consuming, finishes
+          its in-flight messages and exits. Workers still alive after
+          `drain_timeout` seconds are killed.
+        * Restarts crashed workers, waiting `backoff * 2 ** restarts` seconds
+          (at most `max_backoff`). A worker that survives `max_backoff` seconds
+          is considered healthy again.
+        * Logs per event throughput, failures and lag aggregated over all
+          workers every `report_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        settings: WinterSettings,
+        *,
+        workers: int = os.cpu_count() or 1,
+        transporters: Optional[list[TransporterSettings]] = None,
+        report_interval: float = 10.0,
+        drain_timeout: float = 30.0,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.settings = settings
+        self.report_interval = report_interval
+        self.drain_timeout = drain_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.context = _get_context()
+        self.reports = self.context.Queue()
+        self.report = Report()
+        self.draining = False
+
+        transporters = transporters if transporters is not None else settings.transporters
+        hostname = socket.gethostname()
+        self.slots = [
+            WorkerSlot(
+                index=i * workers + n,
+                transporter=transporter,
+                consumer_name=f"{hostname}-{transporter.service}-{n}",
+            )
+            for i, transporter in enumerate(transporters)
+            for n in range(workers)
+        ]
+
+    def start_worker(self, slot: WorkerSlot):
+        slot.process = self.context.Process(
+            target=_worker_main,
+            args=(
+                self.settings,
+                slot.transporter,
+                slot.consumer_name,
+                slot.index,
+                self.reports,
+                self.report_interval,
+            ),
+            name=slot.consumer_name,
+            daemon=False,
+        )
+        slot.process.start()
+        slot.started_at = time.monotonic()
+        slot.restart_at = None
+        logger.info(f"Started worker {slot.consumer_name} (pid {slot.process.pid})")
+
+    def check_worker(self, slot: WorkerSlot):
+        now = time.monotonic()
+        if slot.restart_at is not None:
+            if now >= slot.restart_at:
+                self.start_worker(slot)
+            return
+
+        assert slot.process is not None
+        if slot.process.is_alive():
+            if slot.restarts and now - slot.started_at > self.max_backoff:
+                slot.restarts = 0
+            return
+
+        if slot.process.exitcode == 0:
+            # Clean exits are final, restarting would exit again
+            return
+
+        delay = min(self.max_backoff, self.backoff * 2**slot.restarts)
+        slot.restarts += 1
+        slot.restart_at = now + delay
+        logger.warning(
+            f"Worker {slot.consumer_name} exited with code {slot.process.exitcode}, "
+            f"restarting in {delay:.1f}s"
+        )
+
+    def collect_reports(self, timeout: float):
+        try:
+            _, stats = self.reports.get(timeout=timeout)
+            self.report.add(stats)
+            while True:
+                _, stats = self.reports.get_nowait()
+                self.report.add(stats)
+        except queue.Empty:
+            pass
+
+    def log_report(self):
+        elapsed = time.monotonic() - self.report.started_at
+        for event, stats in sorted(self.report.events.items()):
+            logger.info(
+                f"{event}: {stats.processed / elapsed:.1f} msg/s, "
+                f"{stats.failed} failed, {stats.duplicates} duplicates, "
+                f"lag avg {stats.lag_avg * 1000:.1f}ms max {stats.lag_max * 1000:.1f}ms"
+            )
+        self.report = Report()
+
+    def drain(self, *_: Any):
+        if self.draining:
+            return
+        self.draining = True
+        logger.info("Draining workers")
+        for slot in self.slots:
+            if slot.process is not None and slot.process.is_alive():
+                slot.process.terminate()
+
+    def alive(self) -> list[WorkerSlot]:
+        return [s for s in self.slots if s.process is not None and s.process.is_alive()]
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.drain)
+        signal.signal(signal.SIGINT, self.drain)
+
+        for slot in self.slots:
+            self.start_worker(slot)
+
+        while not self.draining:
+            self.collect_reports(timeout=0.5)
+            for slot in self.slots:
+                self.check_worker(slot)
+            if not self.alive() and all(s.restart_at is None for s in self.slots):
+                break
+            if time.monotonic() - self.report.started_at >= self.report_interval:
+                self.log_report()
+
+        deadline = time.monotonic() + self.drain_timeout
+        while self.alive() and time.monotonic() < deadline:
+            self.collect_reports(timeout=0.1)
+
+        for slot in self.alive():
+            logger.warning(
+                f"Worker {slot.consumer_name} did not drain in time, killing it"
+            )
+            slot.process.kill()  # type: ignore
+
+        for slot in self.slots:
+            if slot.process is not None:
+                slot.process.join()
+
+        self.collect_reports(timeout=0)
+        self.log_report()